@@ -1,9 +1,15 @@
+import os
+import uuid
 import logging
 import json
 from typing import Dict, List, Optional, Any
 
-from utils.llm_client import LLMClient
-from prompts.analyst_prompt import ANALYST_SYSTEM_PROMPT
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.context_window import ContextWindow, build_context
+from utils.json_patch import JsonPatchError, apply_patch
+from utils.prompt_state import PromptState, dumps_compact, render_state
+from utils.retry import Deadline
+from prompts.analyst_prompt import ANALYST_SYSTEM_PROMPT, ANALYST_PATCH_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 
@@ -34,22 +40,78 @@ INITIAL_STATE = {
   "decision_log": []
 }
 
+# 输出模式：patch = 只输出本轮变化（失败时回退 full），full = 每轮重写完整状态
+ANALYST_OUTPUT_MODES = ("patch", "full")
+
+
+def validate_state(state: Any) -> None:
+    """
+    按 INITIAL_STATE 的结构校验状态：顶层字段齐全且 JSON 类型一致，
+    interview_session 的字段为字符串。允许出现额外字段（如 needs_judge_review）。
+
+    Raises:
+        ValueError: 状态结构不合法
+    """
+    if not isinstance(state, dict):
+        raise ValueError("State must be a JSON object")
+    for key, template in INITIAL_STATE.items():
+        if key not in state:
+            raise ValueError(f"State is missing '{key}'")
+        value = state[key]
+        if isinstance(template, bool) or not isinstance(template, (int, float)):
+            if not isinstance(value, type(template)):
+                raise ValueError(f"'{key}' must be {type(template).__name__}")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"'{key}' must be a number")
+    for key in INITIAL_STATE["interview_session"]:
+        if not isinstance(state["interview_session"].get(key), str):
+            raise ValueError(f"'interview_session.{key}' must be a string")
+
+
 class AnalystAgent:
     """
     Analyst Agent (Backend Data Analyst)
     负责监听对话，更新 JSON 状态，并生成 System Notice 指导 Interviewer。
     """
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
-        self.llm = llm_client if llm_client else LLMClient()
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        output_mode: Optional[str] = None,
+        context_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        # 会话 ID，用于服务端前缀缓存（System Prompt）的作用域
+        self.session_id = session_id or uuid.uuid4().hex
+        # 对话上下文的 token 预算（从最新消息往前填充）
+        self.context_tokens = context_tokens or int(os.getenv("ANALYST_CONTEXT_TOKENS", "3000"))
+        self.output_mode = output_mode or os.getenv("ANALYST_OUTPUT_MODE", "patch")
+        # 单次 LLM 调用的截止时间（秒，含重试）；后台任务，比 Interviewer 宽松
+        self.deadline = deadline or float(os.getenv("ANALYST_DEADLINE_S", "60"))
+        if self.output_mode not in ANALYST_OUTPUT_MODES:
+            raise ValueError(f"Unknown Analyst output mode: {self.output_mode}")
+        # patch: 增量成功次数；fallback: 增量失败后回退完整重写的次数；full: 完整重写次数
+        self.stats = {"patch": 0, "fallback": 0, "full": 0}
+        self.last_state_tokens: Optional[PromptState] = None
+        self.last_context: Optional[ContextWindow] = None
 
-    async def analyze_turn(self, history: List[Dict[str, str]], current_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze_turn(
+        self,
+        history: List[Dict[str, str]],
+        current_state: Optional[Dict[str, Any]] = None,
+        summary: Optional[str] = None,
+        summary_covers: int = 0
+    ) -> Dict[str, Any]:
         """
         分析最新一轮对话并更新状态。
         
         Args:
             history: 完整的对话历史 [{"role": "user", "content": "..."}, ...]
             current_state: 上一轮的 JSON 状态。如果为 None，使用 INITIAL_STATE。
+            summary: 历史摘要，超出 token 预算的旧消息由它代替
+            summary_covers: 摘要已覆盖的 history 前缀长度（压缩模式，这部分不再原文传入）
             
         Returns:
             New JSON state.
@@ -57,17 +119,21 @@ class AnalystAgent:
         if current_state is None:
             current_state = INITIAL_STATE
 
-        state_str = json.dumps(current_state, ensure_ascii=False, indent=2)
+        # 最小化并删除空字段，减少每轮输入 token
+        rendered = render_state(current_state)
+        self.last_state_tokens = rendered
+        logger.debug(f"Analyst state tokens: {rendered.tokens_before} -> {rendered.tokens_after}")
         
-        # 截取最近的对话上下文（避免 Token 溢出，但要保留足够信息）
-        # 假设 Summary Agent 还没实现，我们先传最近 10 条
-        recent_history = history[-10:] if len(history) > 10 else history
-        history_str = json.dumps(recent_history, ensure_ascii=False, indent=2)
+        # 按 token 预算截取最近的对话上下文，被淘汰的部分由摘要代替
+        window = build_context(history, self.context_tokens, summary=summary, summary_covers=summary_covers)
+        self.last_context = window
+        history_str = dumps_compact(window.messages)
+        summary_section = f"\n### Conversation Summary (Earlier Turns)\n{window.summary}\n" if window.summary else ""
 
         user_input = f"""
-### Previous JSON State (Must Increment based on this)
-{state_str}
-
+### Previous JSON State (Must Increment based on this; empty fields are omitted)
+{rendered.text}
+{summary_section}
 ### Conversation History (Recent)
 {history_str}
 
@@ -76,6 +142,66 @@ Analyze the latest turn and update the JSON state according to the System Prompt
 Ensure you generate a helpful `system_notice` in `interview_session` for the Interviewer.
 """
 
+        # Patch 尝试与完整重写共用一个截止时间，回退不会让一轮分析的耗时翻倍
+        deadline = Deadline(self.deadline)
+        if self.output_mode == "patch":
+            new_state = await self._analyze_patch(user_input, current_state, deadline)
+            if new_state is not None:
+                self.stats["patch"] += 1
+                return new_state
+            self.stats["fallback"] += 1
+            remaining = deadline.remaining()
+            if remaining is not None and remaining <= 0:
+                logger.error("Analyst deadline used up by the patch attempt, keeping previous state")
+                return current_state
+            logger.warning("Analyst patch failed, falling back to full state rewrite")
+        else:
+            self.stats["full"] += 1
+
+        return await self._analyze_full(user_input, current_state, deadline)
+
+    async def _analyze_patch(
+        self, user_input: str, current_state: Dict[str, Any], deadline: Deadline
+    ) -> Optional[Dict[str, Any]]:
+        """
+        增量模式：模型只输出 JSON Patch，本地应用并校验。失败返回 None。
+        """
+        messages = [
+            {"role": "system", "content": ANALYST_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{user_input}\n{ANALYST_PATCH_INSTRUCTION}"}
+        ]
+
+        try:
+            response = await self.llm.chat_completion(
+                messages=messages,
+                temperature=0.1,
+                max_tokens=1024,
+                top_p=0.1,
+                reasoning_effort="minimal",
+                json_mode=True,
+                cache_scope=f"analyst:{self.session_id}",
+                deadline=deadline.remaining()
+            )
+            if isinstance(response, str):
+                response = json.loads(response)
+            operations = response.get("patch") if isinstance(response, dict) else None
+            new_state = apply_patch(current_state, operations)
+            validate_state(new_state)
+            logger.info(f"Analyst applied {len(operations)} patch operations")
+            return new_state
+        except (JsonPatchError, ValueError, AttributeError, TypeError) as e:
+            logger.error(f"Invalid Analyst patch: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Analyst patch analysis failed: {e}")
+            return None
+
+    async def _analyze_full(
+        self, user_input: str, current_state: Dict[str, Any], deadline: Deadline
+    ) -> Dict[str, Any]:
+        """
+        完整模式：模型重写整个状态。
+        """
         messages = [
             {"role": "system", "content": ANALYST_SYSTEM_PROMPT},
             {"role": "user", "content": user_input}
@@ -89,15 +215,17 @@ Ensure you generate a helpful `system_notice` in `interview_session` for the Int
                 max_tokens=4096,
                 top_p=0.1,
                 reasoning_effort="minimal",
-                json_mode=True
+                json_mode=True,
+                cache_scope=f"analyst:{self.session_id}",
+                deadline=deadline.remaining()
             )
             
             if isinstance(response, dict):
-                return response
+                return self._restore_sections(response, current_state)
             elif isinstance(response, str):
                 try:
                     new_state = json.loads(response)
-                    return new_state
+                    return self._restore_sections(new_state, current_state)
                 except json.JSONDecodeError:
                     logger.error("Failed to parse Analyst JSON response")
                     return current_state
@@ -107,3 +235,15 @@ Ensure you generate a helpful `system_notice` in `interview_session` for the Int
         except Exception as e:
             logger.error(f"Analyst analysis failed: {e}")
             return current_state
+
+    @staticmethod
+    def _restore_sections(new_state: Any, current_state: Dict[str, Any]) -> Any:
+        """
+        Prompt 中省略了空字段，模型重写时可能漏掉整段；从上一轮状态补回缺失的顶层字段。
+        """
+        if not isinstance(new_state, dict):
+            return new_state
+        for key in INITIAL_STATE:
+            if key not in new_state and key in current_state:
+                new_state[key] = current_state[key]
+        return new_state
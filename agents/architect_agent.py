@@ -1,12 +1,15 @@
 import logging
-import json
 from typing import Dict, Any, Optional
 
-from utils.llm_client import LLMClient
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.prompt_state import PromptState, render_state
 from prompts.architect_prompt import ARCHITECT_SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# 访谈过程字段（给 Interviewer 的指引）与方案无关
+ARCHITECT_EXCLUDED_SECTIONS = ("interview_session",)
+
 class ArchitectAgent:
     """
     Architect Agent (Solution Architect)
@@ -16,9 +19,10 @@ class ArchitectAgent:
     def __init__(self, llm_client: Optional[LLMClient] = None):
         """
         Args:
-            llm_client: LLM 客户端实例
+            llm_client: LLM 客户端实例，默认使用进程内共享实例
         """
-        self.llm = llm_client if llm_client else LLMClient()
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        self.last_state_tokens: Optional[PromptState] = None
 
     async def generate_proposal(self, final_state: Dict[str, Any]) -> str:
         """
@@ -30,11 +34,13 @@ class ArchitectAgent:
         Returns:
             str: 包含多个文件边界的完整 Markdown 响应
         """
-        state_str = json.dumps(final_state, ensure_ascii=False, indent=2)
+        rendered = render_state(final_state, exclude=ARCHITECT_EXCLUDED_SECTIONS)
+        self.last_state_tokens = rendered
+        logger.info(f"Architect state tokens: {rendered.tokens_before} -> {rendered.tokens_after}")
         
         user_input = f"""
-### Final JSON State
-{state_str}
+### Final JSON State (empty fields are omitted)
+{rendered.text}
 
 ### Instruction
 Based on the provided Final JSON State, generate the complete solution proposal files according to the System Prompt.
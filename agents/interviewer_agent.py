@@ -1,29 +1,58 @@
+import asyncio
+import os
+import uuid
 import logging
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 
-from utils.llm_client import LLMClient
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.context_window import ContextWindow, build_context
+from utils.rate_limiter import PRIORITY_INTERACTIVE
 from prompts.interviewer_prompt import INTERVIEWER_CORE_PROMPT, INTERVIEWER_INIT_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 
+# 被用户打断的回复在历史中以此结尾，让模型知道这句话没有说完
+INTERRUPTED_MARK = "……"
+
 class InterviewerAgent:
     """
     Interviewer Agent 负责执行访谈计划。
     它维护对话上下文，并根据 Analyst 生成的动态指令 (System Notice) 进行提问。
     """
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        context_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
         """
         Args:
-            llm_client: LLM 客户端实例
+            llm_client: LLM 客户端实例，默认使用进程内共享实例
+            context_tokens: 对话上下文（不含 System Prompt）的 token 预算
+            session_id: 会话 ID，用于服务端前缀缓存的作用域
+            deadline: 单次回复的截止时间（秒），面向用户，默认较紧
         """
-        self.llm = llm_client if llm_client else LLMClient()
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        self.session_id = session_id or uuid.uuid4().hex
         self.history: List[Dict[str, str]] = []
+        self.context_tokens = context_tokens or int(os.getenv("INTERVIEWER_CONTEXT_TOKENS", "6000"))
+        self.deadline = deadline or float(os.getenv("INTERVIEWER_DEADLINE_S", "15"))
+        # 首 token 超过 p95 时发出对冲请求，压低回复的尾延迟（默认关闭）。
+        # 代价：每次对冲多发一个计费请求；样本不足 20 个时阈值固定为 1.5 秒，长 Prompt 下冷启动进程会频繁对冲
+        self.hedge = os.getenv("INTERVIEWER_HEDGE", "0") == "1"
+        # 历史摘要：超出预算或已被摘要覆盖的旧消息由它代替
+        self.context_summary: Optional[str] = None
+        self.context_summary_covers = 0
+        self.last_context: Optional[ContextWindow] = None
+        self.interruptions = 0  # 被用户打断的回复数
         
-        # 初始化对话历史，设置基础 System Prompt (Core + Init)
-        full_prompt = f"{INTERVIEWER_CORE_PROMPT}\n\n{INTERVIEWER_INIT_INSTRUCTION}"
-        self.history.append({"role": "system", "content": full_prompt})
+        # 初始化对话历史：Core Prompt 固定在首位（作为可缓存的公共前缀），
+        # 启动指令单独成条，首轮之后移除
+        self.history.append({"role": "system", "content": INTERVIEWER_CORE_PROMPT})
+        self.history.append({"role": "system", "content": INTERVIEWER_INIT_INSTRUCTION})
 
     async def generate_reply(self, user_input: Optional[str] = None, system_notice: Optional[str] = None) -> str:
         """
@@ -36,44 +65,168 @@ class InterviewerAgent:
         Returns:
             AI 的回复
         """
-        # 1. 如果有用户输入，先记录到历史
-        if user_input:
-            self.history.append({"role": "user", "content": user_input})
-        
-        # 2. 构建本次请求的消息列表
-        messages = self.history.copy()
-        
-        # 3. 如果有动态指令，作为临时的 System Message 插入到最后
-        # 这能确保模型在生成当前回复时优先考虑该指令
-        if system_notice:
-            messages.append({
-                "role": "system", 
-                "content": f"### SYSTEM NOTICE (Dynamic Instruction from Analyst)\n{system_notice}"
-            })
+        messages = self._build_messages(user_input, system_notice)
             
-        # 4. 调用 LLM
+        # 4. 调用 LLM（走流式通道，以便按首 token 时延对冲）
         response = await self.llm.chat_completion(
             messages=messages,
             temperature=0.7,
             max_tokens=1024,
             top_p=0.9,
-            reasoning_effort="minimal"
+            reasoning_effort="minimal",
+            stream=True,
+            cache_scope=f"interviewer:{self.session_id}",
+            priority=PRIORITY_INTERACTIVE,
+            deadline=self.deadline,
+            hedge=self.hedge
         )
         
         # 5. 记录 AI 的回复到历史
         if isinstance(response, str):
-            self.history.append({"role": "assistant", "content": response})
-            
-            # 动态 Prompt 管理: 如果是第一轮回复，移除启动指令
-            assistant_msgs = [m for m in self.history if m["role"] == "assistant"]
-            if len(assistant_msgs) == 1 and self.history[0]["role"] == "system":
-                self.history[0]["content"] = INTERVIEWER_CORE_PROMPT
-                logger.info("System prompt updated: Initialization instructions removed after first turn.")
-                
+            self._commit_reply(response)
             return response
         else:
             return "Error: Unexpected response format."
+
+    async def generate_reply_stream(self, user_input: Optional[str] = None, system_notice: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        流式生成回复，逐段产出文本增量。
+        
+        参数同 generate_reply。流结束后完整回复会写入历史；
+        若中途被取消（用户插话），已生成的部分以 INTERRUPTED_MARK 结尾写入历史。
+        
+        Yields:
+            AI 回复的文本增量
+        """
+        messages = self._build_messages(user_input, system_notice)
+
+        parts: List[str] = []
+        try:
+            async for delta in self.llm.chat_completion_stream(
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024,
+                top_p=0.9,
+                reasoning_effort="minimal",
+                cache_scope=f"interviewer:{self.session_id}",
+                priority=PRIORITY_INTERACTIVE,
+                deadline=self.deadline,
+                hedge=self.hedge
+            ):
+                parts.append(delta)
+                yield delta
+        except (GeneratorExit, asyncio.CancelledError):
+            # 取消会关闭 LLM 流，不再为剩余 token 付费
+            if parts:
+                self.interruptions += 1
+                self._commit_reply("".join(parts).rstrip() + INTERRUPTED_MARK)
+            raise
+
+        self._commit_reply("".join(parts))
+
+    def truncate_last_reply(self, heard: str) -> bool:
+        """
+        把最后一条 AI 回复截断为用户实际听到的部分（语音被打断时调用）。
+        生成往往领先于播放，未播出的句子不应出现在历史里。
+
+        Args:
+            heard: 已播放的文本（按句拼接，可能缺少句间空白）
+
+        Returns:
+            bool: 是否修改了历史
+        """
+        if not self.history or self.history[-1]["role"] != "assistant":
+            return False
+        content = self.history[-1]["content"]
+        already_marked = content.endswith(INTERRUPTED_MARK)
+        if already_marked:
+            content = content[:-len(INTERRUPTED_MARK)]
+
+        # 忽略空白逐字对齐，找出 content 中与 heard 对应的前缀
+        target = "".join(heard.split())
+        matched = 0
+        end = 0
+        for index, char in enumerate(content):
+            if matched == len(target):
+                break
+            if char.isspace():
+                continue
+            if char != target[matched]:
+                return False
+            matched += 1
+            end = index + 1
+        if matched < len(target):
+            return False
+
+        if end == 0:
+            # 一句都没播出：只留打断标记占位，不删除消息，摘要高水位等按下标记录的位置保持有效
+            if already_marked and not content.strip():
+                return False
+            self.history[-1] = {"role": "assistant", "content": INTERRUPTED_MARK}
+        elif end < len(content.rstrip()):
+            self.history[-1] = {"role": "assistant", "content": content[:end] + INTERRUPTED_MARK}
+        else:
+            return False
+        if not already_marked:
+            self.interruptions += 1
+        return True
+
+    def _build_messages(self, user_input: Optional[str], system_notice: Optional[str]) -> List[Dict[str, str]]:
+        """
+        记录用户输入并构建本次请求的消息列表。
+        """
+        # 1. 如果有用户输入，先记录到历史
+        if user_input:
+            self.history.append({"role": "user", "content": user_input})
+        
+        # 2. 构建本次请求的消息列表：System Prompt + token 预算内的最近对话
+        # 顺序保持前缀稳定：Core Prompt 在最前，摘要、历史、动态指令依次在后
+        leading = 0
+        while leading < len(self.history) and self.history[leading]["role"] == "system":
+            leading += 1
+        system_msgs = self.history[:leading]
+        window = build_context(
+            self.history[leading:],
+            self.context_tokens,
+            summary=self.context_summary,
+            summary_covers=self.context_summary_covers
+        )
+        self.last_context = window
+        messages = system_msgs + window.as_messages()
+        
+        # 3. 如果有动态指令，作为临时的 System Message 插入到最后
+        # 这能确保模型在生成当前回复时优先考虑该指令
+        if system_notice:
+            messages.append({
+                "role": "system", 
+                "content": f"### SYSTEM NOTICE (Dynamic Instruction from Analyst)\n{system_notice}"
+            })
+        return messages
+
+    def _commit_reply(self, response: str) -> None:
+        """
+        将 AI 回复写入历史，并在首轮之后移除启动指令。
+        """
+        self.history.append({"role": "assistant", "content": response})
+        
+        # 动态 Prompt 管理: 如果是第一轮回复，移除启动指令
+        init_msg = {"role": "system", "content": INTERVIEWER_INIT_INSTRUCTION}
+        if init_msg in self.history:
+            self.history.remove(init_msg)
+            logger.info("System prompt updated: Initialization instructions removed after first turn.")
             
+    def set_summary(self, summary: Optional[str], covered_messages: int = 0) -> None:
+        """
+        设置历史摘要（压缩模式）。
+        
+        Args:
+            summary: SummaryAgent 的最新摘要
+            covered_messages: 摘要已覆盖的可见消息数（get_visible_history 的前缀长度），
+                这部分在 Prompt 中由摘要代替；为 0 时只在超出预算时才代替
+        """
+        self.context_summary = summary or None
+        self.context_summary_covers = covered_messages
+
     def get_history(self) -> List[Dict[str, str]]:
         """
         获取完整对话历史
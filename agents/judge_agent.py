@@ -1,46 +1,73 @@
+import os
+import uuid
 import logging
 import json
 from typing import Dict, List, Optional, Any
 
-from utils.llm_client import LLMClient
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.context_window import ContextWindow, build_context
+from utils.prompt_state import PromptState, dumps_compact, render_state
 from prompts.judge_prompt import JUDGE_SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# Judge 只需要需求分析与缺失信息
+JUDGE_STATE_SECTIONS = ("needs_analysis", "missing_info")
+
 class JudgeAgent:
     """
     Judge Agent (The Evaluator)
     负责评估对话质量，识别风险，并为 Interviewer 提供纠偏建议。
     """
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
-        self.llm = llm_client if llm_client else LLMClient()
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        context_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        # 会话 ID，用于服务端前缀缓存（System Prompt）的作用域
+        self.session_id = session_id or uuid.uuid4().hex
+        # 对话上下文的 token 预算（Judge 只关注最近几轮）
+        self.context_tokens = context_tokens or int(os.getenv("JUDGE_CONTEXT_TOKENS", "1500"))
+        # 单次 LLM 调用的截止时间（秒，含重试）
+        self.deadline = deadline or float(os.getenv("JUDGE_DEADLINE_S", "45"))
+        self.last_state_tokens: Optional[PromptState] = None
+        self.last_context: Optional[ContextWindow] = None
 
-    async def evaluate_turn(self, history: List[Dict[str, str]], current_state: Dict[str, Any]) -> Dict[str, Any]:
+    async def evaluate_turn(
+        self,
+        history: List[Dict[str, str]],
+        current_state: Dict[str, Any],
+        summary: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         评估当前对话轮次。
         
         Args:
             history: 最近的对话历史
             current_state: Analyst 生成的当前状态
+            summary: 历史摘要，超出 token 预算的旧消息由它代替
             
         Returns:
             Dict: 包含风险评估和建议的 JSON 对象
         """
         
         # 提取关键信息用于 Prompt
-        state_snippet = {
-            "needs_analysis": current_state.get("needs_analysis", {}),
-            "missing_info": current_state.get("missing_info", [])
-        }
-        
-        state_str = json.dumps(state_snippet, ensure_ascii=False, indent=2)
-        history_str = json.dumps(history[-5:], ensure_ascii=False, indent=2) # 只看最近 5 轮
+        rendered = render_state(current_state, sections=JUDGE_STATE_SECTIONS)
+        self.last_state_tokens = rendered
+        logger.debug(f"Judge state tokens: {rendered.tokens_before} -> {rendered.tokens_after}")
+        window = build_context(history, self.context_tokens, summary=summary)
+        self.last_context = window
+        history_str = dumps_compact(window.messages)
+        summary_section = f"\n### Conversation Summary (Earlier Turns)\n{window.summary}\n" if window.summary else ""
 
         user_input = f"""
-### Current Analyst State Snippet
-{state_str}
-
+### Current Analyst State Snippet (empty fields are omitted)
+{rendered.text}
+{summary_section}
 ### Recent Conversation
 {history_str}
 
@@ -62,7 +89,9 @@ Generate a JSON evaluation report.
                 max_tokens=2048,
                 top_p=0.1,
                 reasoning_effort="medium",
-                json_mode=True
+                json_mode=True,
+                cache_scope=f"judge:{self.session_id}",
+                deadline=self.deadline
             )
             
             if isinstance(response, dict):
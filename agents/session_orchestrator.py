@@ -0,0 +1,420 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import unicodedata
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from agents.analyst_agent import AnalystAgent
+from agents.architect_agent import ArchitectAgent
+from agents.interviewer_agent import InterviewerAgent
+from agents.judge_agent import JudgeAgent
+from agents.summary_agent import SummaryAgent
+from utils.context_window import message_tokens
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 用户开始讨论技术细节的关键词（Correction Gate）
+JUDGE_TRIGGER_KEYWORDS = [
+    "cursor", "trae", "github", "gitlab", "supabase", "vercel", "aws", "docker",
+    "python", "js", "react", "vue", "nextjs", "fastapi", "数据库", "部署", "代码",
+    "支付", "订阅", "api", "key", "token"
+]
+
+# "summary": 已摘要的轮次在 Prompt 中由摘要代替（Prompt 规模恒定）
+# "budget": 摘要只代替被 token 预算挤出的轮次
+CONTEXT_COMPACTION_MODES = ("summary", "budget")
+
+# 事件回调：on_event(event_type, payload)，事件类型见 SessionOrchestrator
+EventListener = Callable[[str, Dict[str, Any]], None]
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    比较识别结果用的规范化：忽略标点、空白与大小写。
+    """
+    return "".join(
+        ch for ch in text.lower()
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+class SpeculativeReply:
+    """
+    基于 ASR 稳定中间结果提前生成的回复（推测执行）。
+
+    生成在后台任务中进行，增量先缓存在队列里。最终识别结果一致（仅标点不同也算）
+    时由 stream() 接管：先产出缓存的增量再继续，回复结束后才启动这一轮的后台分析；
+    不一致时 cancel() 取消生成，并把会话回滚到推测之前，就像这一轮从未开始。
+    从开始生成到采纳结束或取消，推测一直持有会话的轮次锁。
+    """
+
+    def __init__(self, session: "SessionOrchestrator", text: str):
+        self.session = session
+        self.text = text
+        self.adopted = False
+        self._checkpoint: Optional[Tuple[int, List[Dict[str, str]], int]] = None
+        self._locked = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._produce())
+
+    def matches(self, text: str) -> bool:
+        return normalize_utterance(text) == normalize_utterance(self.text)
+
+    async def _produce(self) -> None:
+        await self.session._turn_lock.acquire()
+        self._locked = True
+        self._checkpoint = self.session._checkpoint()
+        try:
+            # 后台分析等采纳后再启动：被丢弃的推测不能影响门控计数与摘要
+            async for delta in self.session._stream_reply(self.text):
+                self._queue.put_nowait(delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._queue.put_nowait(e)
+            return
+        self._queue.put_nowait(None)
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        采纳推测结果，产出回复增量（与 stream_user_turn 相同）。
+        """
+        self.adopted = True
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    self.session._schedule_analysis(self.text)
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        except (GeneratorExit, asyncio.CancelledError):
+            # 已采纳的回复被打断：按正常回复处理（历史记录打断），不回滚
+            await self._stop()
+            raise
+        finally:
+            self._unlock()
+
+    async def cancel(self) -> None:
+        """
+        放弃推测：取消生成并回滚会话。
+        """
+        if self.adopted:
+            raise RuntimeError("Speculative reply was already adopted")
+        await self._stop()
+        if self._checkpoint is not None:
+            self.session._rollback(self._checkpoint)
+        self._unlock()
+
+    async def _stop(self) -> None:
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    def _unlock(self) -> None:
+        if self._locked:
+            self._locked = False
+            self.session._turn_lock.release()
+
+
+class SessionOrchestrator:
+    """
+    单个访谈会话的 Response-First 编排（原 main.py 中的流程）。
+
+    每个用户轮次：
+      1. 同步屏障：等待上一轮的后台分析，更新状态、摘要与 System Notice；
+      2. Interviewer 立即用当前 Notice 回复；
+      3. 后台启动 Analyst → (按门控) Judge → (按间隔) Summary，与用户输入下一轮并行。
+
+    会话只持有自身状态，不绑定 stdin 或连接；多个会话共享同一个事件循环
+    和进程内的 LLMClient / 连接池 / 调度器。
+
+    事件（on_event）："analysis"、"judge"、"summary"、"notice"、"completed"。
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        llm_client: Optional[LLMClient] = None,
+        compaction: Optional[str] = None,
+        summary_interval: Optional[int] = None,
+        on_event: Optional[EventListener] = None
+    ):
+        """
+        Args:
+            session_id: 会话 ID（同时作为服务端前缀缓存的作用域），默认随机生成
+            llm_client: LLM 客户端，默认使用进程内共享实例
+            compaction: 上下文压缩方式，summary / budget (CONTEXT_COMPACTION)
+            summary_interval: 每隔多少轮更新一次摘要 (SUMMARY_INTERVAL)
+            on_event: 后台进度回调
+        """
+        self.session_id = session_id or uuid.uuid4().hex
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        self.compaction = compaction or os.getenv("CONTEXT_COMPACTION", "summary")
+        if self.compaction not in CONTEXT_COMPACTION_MODES:
+            raise ValueError(f"Unknown context compaction mode: {self.compaction}")
+        self.summary_interval = summary_interval or int(os.getenv("SUMMARY_INTERVAL", "3"))
+        self.on_event = on_event
+
+        self.analyst = AnalystAgent(llm_client=self.llm, session_id=self.session_id)
+        self.interviewer = InterviewerAgent(llm_client=self.llm, session_id=self.session_id)
+        self.judge = JudgeAgent(llm_client=self.llm, session_id=self.session_id)
+        self.summary_agent = SummaryAgent(llm_client=self.llm, session_id=self.session_id)
+
+        self.current_state: Optional[Dict[str, Any]] = None
+        self.system_notice = "Start the interview."
+        self.turn_count = 0
+        # 各 Agent 共享的长期记忆：摘要文本 + 摘要覆盖的可见消息数
+        self.memory = {"summary": "", "covers": 0}
+        self.judge_gate_counts = {"initial": 0, "correction": 0, "pre_completion": 0}
+        self._analysis_task: Optional[asyncio.Task] = None
+        # 同一会话的轮次串行执行（REST 与 WebSocket 可能同时提交）
+        self._turn_lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+
+    @property
+    def analysis_pending(self) -> bool:
+        return self._analysis_task is not None and not self._analysis_task.done()
+
+    @property
+    def completed(self) -> bool:
+        return bool(self.current_state) and self.current_state.get("status") == "Completed"
+
+    async def start(self) -> str:
+        """
+        初始化状态并生成开场白。
+        """
+        self.last_active = time.monotonic()
+        async with self._turn_lock:
+            # 空历史触发初始状态生成
+            self.current_state = await self.analyst.analyze_turn([], None)
+            self.system_notice = self.current_state["interview_session"].get("system_notice", "Start the interview.")
+            self._emit("notice", {"system_notice": self.system_notice})
+            return await self.interviewer.generate_reply(user_input=None, system_notice=self.system_notice)
+
+    async def handle_user_turn(self, user_input: str) -> str:
+        """
+        处理一个用户轮次：同步上一轮分析 → 立即回复 → 启动本轮后台分析。
+        同一会话上并发提交的轮次按到达顺序依次执行。
+        """
+        async with self._turn_lock:
+            await self.sync()
+            self.turn_count += 1
+            reply = await self.interviewer.generate_reply(user_input=user_input, system_notice=self.system_notice)
+            self._schedule_analysis(user_input)
+            return reply
+
+    async def stream_user_turn(self, user_input: str) -> AsyncIterator[str]:
+        """
+        handle_user_turn 的流式版本，逐段产出回复；回复结束后启动后台分析。
+        中途被取消（用户插话）时不启动分析，下一轮的分析会覆盖这段历史。
+        """
+        async with self._turn_lock:
+            async for delta in self._stream_reply(user_input):
+                yield delta
+            self._schedule_analysis(user_input)
+
+    async def _stream_reply(self, user_input: str) -> AsyncIterator[str]:
+        await self.sync()
+        self.turn_count += 1
+        async for delta in self.interviewer.generate_reply_stream(
+            user_input=user_input, system_notice=self.system_notice
+        ):
+            yield delta
+
+    def speculate_user_turn(self, user_input: str) -> SpeculativeReply:
+        """
+        用尚未确定的用户输入提前开始 stream_user_turn，见 SpeculativeReply。
+        调用方需保证上一轮回复已结束。
+        """
+        return SpeculativeReply(self, user_input)
+
+    async def sync(self) -> Optional[Dict[str, Any]]:
+        """
+        同步屏障：等待进行中的后台分析并应用结果，返回最新状态。
+        分析失败时保留上一轮状态。调用方被取消时分析继续进行，留给下一次 sync。
+        """
+        self.last_active = time.monotonic()
+        task = self._analysis_task
+        if task is None:
+            return self.current_state
+
+        try:
+            new_state, judge_report = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            new_state = None
+        except Exception as e:
+            if self._analysis_task is task:
+                self._analysis_task = None
+            logger.error(f"[{self.session_id}] Background analysis failed, keeping previous state: {e}")
+            return self.current_state
+        # 并发的 sync 只应用一次
+        if self._analysis_task is not task:
+            return self.current_state
+        self._analysis_task = None
+        if new_state is None:
+            return self.current_state
+
+        self.current_state = new_state
+        # 把最新的长期记忆交给 Interviewer
+        self.interviewer.set_summary(self.memory["summary"], self._summary_covers())
+
+        system_notice = new_state.get("interview_session", {}).get("system_notice", "Continue interview.")
+        if judge_report:
+            judge_notice = judge_report.get("judge_notice", "")
+            next_questions = judge_report.get("next_questions", [])
+            if judge_notice:
+                system_notice = f"{system_notice}\n\n[JUDGE WARNING]: {judge_notice}\n[SUGGESTED QUESTIONS]: {next_questions}"
+        self.system_notice = system_notice
+        self._emit("notice", {"system_notice": system_notice})
+        if self.completed:
+            self._emit("completed", {"completion_readiness": new_state.get("completion_readiness", 0)})
+        return self.current_state
+
+    def truncate_reply(self, heard: str) -> bool:
+        """
+        语音被打断时，把最后一条回复截断为用户实际听到的部分。
+        """
+        return self.interviewer.truncate_last_reply(heard)
+
+    async def generate_proposal(self) -> str:
+        """
+        等待最后一轮分析后，由 Architect 基于最终状态生成方案。
+        """
+        await self.sync()
+        if not self.current_state:
+            raise ValueError("Session has no state yet; call start() first.")
+        architect = ArchitectAgent(llm_client=self.llm)
+        return await architect.generate_proposal(self.current_state)
+
+    async def close(self) -> None:
+        """
+        取消进行中的后台分析。
+        """
+        task, self._analysis_task = self._analysis_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        会话占用的内存与 token 规模（用于 /metrics 与容量规划）。
+        """
+        history = self.interviewer.get_history()
+        state_bytes = 0
+        if self.current_state:
+            state_bytes = len(json.dumps(self.current_state, ensure_ascii=False).encode("utf-8"))
+        return {
+            "turns": self.turn_count,
+            "history_messages": len(history),
+            "history_bytes": sum(len(m.get("content", "").encode("utf-8")) for m in history),
+            "history_tokens": sum(message_tokens.count(m) for m in history),
+            "summary_tokens": estimate_tokens(self.memory["summary"]),
+            "state_bytes": state_bytes,
+            "interruptions": self.interviewer.interruptions,
+            "analysis_pending": self.analysis_pending,
+        }
+
+    def _checkpoint(self) -> Tuple[int, List[Dict[str, str]], int]:
+        interviewer = self.interviewer
+        return self.turn_count, list(interviewer.history), interviewer.interruptions
+
+    def _rollback(self, checkpoint: Tuple[int, List[Dict[str, str]], int]) -> None:
+        """
+        撤销 checkpoint 之后的轮次：对话历史与轮次计数。
+        推测轮次在采纳前不启动后台分析，期间应用的上一轮分析结果保留。
+        """
+        turn_count, history, interruptions = checkpoint
+        self.turn_count = turn_count
+        self.interviewer.history = history
+        self.interviewer.interruptions = interruptions
+
+    def _summary_covers(self) -> int:
+        return self.memory["covers"] if self.compaction == "summary" else 0
+
+    def _schedule_analysis(self, user_input: str) -> None:
+        history = self.interviewer.get_visible_history()
+        self._analysis_task = asyncio.create_task(
+            self._run_background_analysis(history, self.current_state, user_input, self.turn_count)
+        )
+
+    async def _run_background_analysis(
+        self,
+        history: List[Dict[str, str]],
+        state: Optional[Dict[str, Any]],
+        user_input: str,
+        turn: int
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        后台分析：Analyst → Judge（按门控）→ Summary（按间隔）。
+        """
+        summary = self.memory["summary"] or None
+        new_state = await self.analyst.analyze_turn(
+            history, state, summary=summary, summary_covers=self._summary_covers()
+        )
+        self._emit("analysis", {"turn": turn, "state": new_state})
+
+        judge_report = None
+        reasons = self._judge_triggers(new_state, user_input, turn)
+        if reasons:
+            logger.info(f"[{self.session_id}] Judge running ({', '.join(reasons)})")
+            judge_report = await self.judge.evaluate_turn(history, new_state, summary=summary)
+            self._emit("judge", {"turn": turn, "reasons": reasons, "report": judge_report})
+
+        if turn % self.summary_interval == 0:
+            # 只发送摘要高水位之后的新轮次
+            self.memory["summary"] = await self.summary_agent.update_from_history(history)
+            self.memory["covers"] = self.summary_agent.summarized_upto
+            self._emit("summary", {"turn": turn, "covers": self.memory["covers"]})
+
+        return new_state, judge_report
+
+    def _judge_triggers(self, new_state: Dict[str, Any], user_input: str, turn: int) -> List[str]:
+        """
+        Judge 门控，返回触发原因（为空表示本轮不运行 Judge）。每个门在会话内只触发一次。
+        """
+        reasons = []
+        if new_state.get("needs_judge_review", False):
+            reasons.append("Analyst Request")
+
+        if turn == 2 and self.judge_gate_counts["initial"] == 0:
+            reasons.append("Initial Gate")
+            self.judge_gate_counts["initial"] += 1
+
+        readiness = new_state.get("completion_readiness", 0)
+        status = new_state.get("status")
+        if (status == "Completed" or readiness >= 80) and self.judge_gate_counts["pre_completion"] == 0:
+            reasons.append("Pre-completion Gate")
+            self.judge_gate_counts["pre_completion"] += 1
+
+        user_hits_keyword = any(k in user_input.lower() for k in JUDGE_TRIGGER_KEYWORDS)
+        missing_info_str = str(new_state.get("missing_info", [])).lower()
+        has_critical_gaps = "scenario" in missing_info_str or "loss" in missing_info_str or "pain" in missing_info_str
+        if turn >= 4 and user_hits_keyword and has_critical_gaps and self.judge_gate_counts["correction"] == 0:
+            reasons.append("Correction Gate")
+            self.judge_gate_counts["correction"] += 1
+
+        return reasons
+
+    def _emit(self, event_type: str, payload: Dict[str, Any]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event_type, payload)
+        except Exception as e:
+            logger.error(f"[{self.session_id}] Event listener failed on '{event_type}': {e}")
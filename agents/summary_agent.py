@@ -1,8 +1,11 @@
+import os
+import uuid
 import logging
 from typing import Dict, List, Optional
 
-from utils.llm_client import LLMClient
-from prompts.summary_prompt import SUMMARY_SYSTEM_PROMPT
+from utils.llm_client import LLMClient, get_default_llm_client
+from utils.tokens import estimate_tokens
+from prompts.summary_prompt import SUMMARY_SYSTEM_PROMPT, SUMMARY_ROLLUP_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 
@@ -10,30 +13,70 @@ class SummaryAgent:
     """
     Summary Agent (Cognitive Compressor)
     负责压缩对话历史，提取长期记忆。
+
+    摘要分两层：current_summary 滚动合并新消息；当它超出 token 预算时，
+    被归并压缩进 rollup_summary 并清空，保证每次更新的输入规模有上限。
     """
-    
-    def __init__(self, llm_client: Optional[LLMClient] = None):
-        self.llm = llm_client if llm_client else LLMClient()
-        self.current_summary = ""
+
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        max_summary_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
+        self.llm = llm_client if llm_client else get_default_llm_client()
+        # 会话 ID，用于服务端前缀缓存（System Prompt）的作用域
+        self.session_id = session_id or uuid.uuid4().hex
+        self.current_summary = ""  # 最近内容的摘要
+        self.rollup_summary = ""  # 更早内容的归并摘要
+        # 高水位：已摘要的消息数（update_from_history 的 history 前缀长度）
+        self.summarized_upto = 0
+        self.max_summary_tokens = max_summary_tokens or int(os.getenv("SUMMARY_MAX_TOKENS", "600"))
+        self.rollups = 0
+        # 单次 LLM 调用的截止时间（秒，含重试）；失败时保留旧摘要，下轮重试
+        self.deadline = deadline or float(os.getenv("SUMMARY_DEADLINE_S", "60"))
 
     async def update_summary(self, new_chunk: List[Dict[str, str]]) -> str:
         """
         更新摘要。
-        
+
         Args:
             new_chunk: 新增的对话片段
-            
+
         Returns:
             str: 更新后的摘要文本
         """
-        if not new_chunk:
-            return self.current_summary
+        if new_chunk:
+            await self._merge(new_chunk)
+        return self.get_summary()
+
+    async def update_from_history(self, history: List[Dict[str, str]]) -> str:
+        """
+        增量更新：只摘要高水位之后的新消息，成功后推进高水位。
 
-        chunk_str = ""
-        for msg in new_chunk:
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            chunk_str += f"{role}: {content}\n"
+        Args:
+            history: 完整的可见对话历史（消息只追加、不删除）
+
+        Returns:
+            str: 更新后的摘要文本
+        """
+        if self.summarized_upto > len(history):
+            logger.warning("History is shorter than the summary high-water mark; resetting it")
+            self.summarized_upto = 0
+
+        new_chunk = history[self.summarized_upto:]
+        if new_chunk and await self._merge(new_chunk):
+            self.summarized_upto = len(history)
+        return self.get_summary()
+
+    async def _merge(self, new_chunk: List[Dict[str, str]]) -> bool:
+        """
+        将新片段合并进 current_summary，必要时触发归并。成功返回 True。
+        """
+        chunk_str = "".join(
+            f"{msg.get('role', 'unknown')}: {msg.get('content', '')}\n" for msg in new_chunk
+        )
 
         user_input = f"""
 ### Old Summary
@@ -46,11 +89,41 @@ class SummaryAgent:
 Synthesize the Old Summary and New Dialogue Chunk into a single updated summary paragraph.
 """
 
+        response = await self._complete(user_input)
+        if response is None:
+            return False
+        self.current_summary = response
+
+        if estimate_tokens(self.current_summary) > self.max_summary_tokens:
+            await self._roll_up()
+        return True
+
+    async def _roll_up(self) -> None:
+        """
+        层级归并：把 current_summary 压缩并入 rollup_summary。
+        """
+        user_input = f"""
+### Long-Term Summary
+{self.rollup_summary}
+
+### Recent Summary
+{self.current_summary}
+{SUMMARY_ROLLUP_INSTRUCTION.format(max_chars=self.max_summary_tokens)}"""
+
+        response = await self._complete(user_input)
+        if response is None:
+            return
+        self.rollup_summary = response
+        self.current_summary = ""
+        self.rollups += 1
+        logger.info(f"Summary rolled up (#{self.rollups}, {estimate_tokens(response)} tokens)")
+
+    async def _complete(self, user_input: str) -> Optional[str]:
         messages = [
             {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
             {"role": "user", "content": user_input}
         ]
-        
+
         try:
             # Summary Agent 返回纯文本，不需要 JSON Mode
             response = await self.llm.chat_completion(
@@ -59,19 +132,20 @@ Synthesize the Old Summary and New Dialogue Chunk into a single updated summary
                 max_tokens=2048,
                 top_p=0.5,
                 reasoning_effort="low",
-                json_mode=False
+                json_mode=False,
+                cache_scope=f"summary:{self.session_id}",
+                deadline=self.deadline
             )
-            
+
             if isinstance(response, str):
-                self.current_summary = response.strip()
-                return self.current_summary
+                return response.strip()
             else:
                 logger.error("Summary Agent received non-string response")
-                return self.current_summary
-                
+                return None
+
         except Exception as e:
             logger.error(f"Summary update failed: {e}")
-            return self.current_summary
+            return None
 
     def get_summary(self) -> str:
-        return self.current_summary
+        return "\n".join(part for part in (self.rollup_summary, self.current_summary) if part)
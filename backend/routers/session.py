@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+
+from agents.session_orchestrator import SessionOrchestrator
+from backend.services.session_manager import SessionLimitError, session_manager
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+class TurnRequest(BaseModel):
+    text: str
+
+
+def _get_session(session_id: str) -> SessionOrchestrator:
+    session = session_manager.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return session
+
+
+@router.post("/sessions")
+async def create_session():
+    """Start a session: initial analysis plus the interviewer's opening line."""
+    try:
+        session = await session_manager.create()
+    except (SessionLimitError, ValueError) as e:
+        # ValueError: missing LLM configuration
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        reply = await session.start()
+    except Exception as e:
+        logger.error(f"Failed to start session {session.session_id}: {e}")
+        await session_manager.close(session.session_id)
+        raise HTTPException(status_code=502, detail=f"Failed to start session: {e}")
+    return {"session_id": session.session_id, "reply": reply}
+
+
+@router.post("/sessions/{session_id}/turns")
+async def post_turn(session_id: str, request: TurnRequest):
+    """Reply immediately; analysis for this turn continues in the background."""
+    session = _get_session(session_id)
+    reply = await session.handle_user_turn(request.text)
+    return {"session_id": session_id, "turn": session.turn_count, "reply": reply}
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = _get_session(session_id)
+    return {
+        "session_id": session_id,
+        "state": session.current_state,
+        "completed": session.completed,
+        "memory": session.memory_stats(),
+    }
+
+
+@router.post("/sessions/{session_id}/proposal")
+async def generate_proposal(session_id: str):
+    session = _get_session(session_id)
+    proposal = await session.generate_proposal()
+    return {"session_id": session_id, "proposal": proposal}
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await session_manager.close(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return {"session_id": session_id, "closed": True}
+
+
+def _event(event_type: str, **fields) -> str:
+    return json.dumps({"type": event_type, **fields}, ensure_ascii=False)
+
+
+@router.websocket("/ws/session")
+async def websocket_session_endpoint(websocket: WebSocket):
+    """
+    Orchestrated interview over one multiplexed socket.
+
+    Connect with `?session_id=<id>` to resume a session, otherwise a new one is
+    started. Client messages are JSON: {"type": "turn", "text": "..."},
+    {"type": "proposal"} or {"type": "ping"}. Server events are JSON with a
+    `type` field: session, token, reply, state, judge, notice, summary,
+    completed, proposal, pong and error. Interviewer tokens and background
+    analysis events share the socket and are written by a single sender task.
+    """
+    session_id = websocket.query_params.get("session_id")
+    session = session_manager.get(session_id) if session_id else None
+    if session_id and session is None:
+        await websocket.close(code=1008, reason=f"Unknown session: {session_id}")
+        return
+    await websocket.accept()
+
+    outbound: asyncio.Queue = asyncio.Queue()
+
+    def on_event(event_type: str, payload: Dict[str, Any]) -> None:
+        if event_type == "analysis":
+            outbound.put_nowait(_event("state", turn=payload["turn"], state=payload["state"]))
+        elif event_type == "judge":
+            report = payload["report"] or {}
+            outbound.put_nowait(_event(
+                "judge",
+                turn=payload["turn"],
+                reasons=payload["reasons"],
+                notice=report.get("judge_notice", ""),
+                next_questions=report.get("next_questions", []),
+            ))
+        else:
+            outbound.put_nowait(_event(event_type, **payload))
+
+    async def send_events():
+        while True:
+            message = await outbound.get()
+            if message is None:
+                return
+            await websocket.send_text(message)
+
+    sender = asyncio.create_task(send_events())
+    try:
+        if session is None:
+            try:
+                session = await session_manager.create(on_event=on_event)
+            except (SessionLimitError, ValueError) as e:
+                await websocket.send_text(_event("error", content=str(e)))
+                await websocket.close(code=1013)
+                return
+            outbound.put_nowait(_event("session", session_id=session.session_id, resumed=False))
+            try:
+                reply = await session.start()
+            except Exception as e:
+                logger.error(f"Failed to start session {session.session_id}: {e}")
+                await session_manager.close(session.session_id)
+                session = None
+                outbound.put_nowait(_event("error", content=f"Failed to start session: {e}"))
+                return
+            outbound.put_nowait(_event("reply", turn=0, content=reply))
+        else:
+            session.on_event = on_event
+            outbound.put_nowait(_event("session", session_id=session.session_id, resumed=True))
+        logger.info(f"Client attached to session {session.session_id}")
+
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                message = {"type": "turn", "text": data}
+
+            message_type = message.get("type")
+            try:
+                if message_type == "turn":
+                    text = (message.get("text") or "").strip()
+                    if not text:
+                        continue
+                    parts = []
+                    turn = session.turn_count + 1
+                    async for delta in session.stream_user_turn(text):
+                        parts.append(delta)
+                        outbound.put_nowait(_event("token", turn=turn, content=delta))
+                    outbound.put_nowait(_event("reply", turn=turn, content="".join(parts)))
+                elif message_type == "proposal":
+                    proposal = await session.generate_proposal()
+                    outbound.put_nowait(_event("proposal", content=proposal))
+                elif message_type == "ping":
+                    outbound.put_nowait(_event("pong"))
+                else:
+                    outbound.put_nowait(_event("error", content=f"Unknown message type: {message_type}"))
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling {message_type} in session {session.session_id}: {e}")
+                outbound.put_nowait(_event("error", content=str(e)))
+
+    except WebSocketDisconnect:
+        logger.info(f"Client detached from session {session.session_id if session else '-'}")
+    finally:
+        if session is not None and session.on_event is on_event:
+            session.on_event = None
+        # Flush what is already queued, then stop the sender
+        outbound.put_nowait(None)
+        try:
+            await asyncio.wait_for(sender, 5)
+        except (asyncio.TimeoutError, Exception):
+            pass
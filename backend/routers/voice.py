@@ -1,13 +1,20 @@
 import asyncio
 import json
 import logging
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 
+from agents.interviewer_agent import InterviewerAgent
 from backend.services.tts_service import VolcTTSService
 from backend.services.asr_service import VolcASRService
+from backend.services.session_manager import SessionLimitError, session_manager
+from backend.services.speech_pipeline import SentenceSpeechPipeline, SpeechEvent
+from backend.services.voice_loop import TurnTimeline, VoiceLoop
+from backend.utils.asr_delta import ASR_ENCODINGS, ASRDeltaEncoder
+from backend.utils.audio_buffer import AudioQueueOverflow, BoundedAudioQueue
+from backend.utils.vad import VoiceActivityDetector
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,11 +23,23 @@ asr_service = VolcASRService()
 
 @router.websocket("/ws/asr")
 async def websocket_asr_endpoint(websocket: WebSocket):
+    """
+    Streaming ASR. Result encoding is negotiated per connection with
+    `?encoding=full` (default, vendor JSON as-is) or `?encoding=delta`
+    (compact text deltas, see backend/utils/asr_delta.py).
+    """
+    encoding = websocket.query_params.get("encoding", "full")
+    if encoding not in ASR_ENCODINGS:
+        await websocket.close(code=1003, reason=f"Unsupported encoding: {encoding}")
+        return
     await websocket.accept()
-    logger.info("Client connected to ASR WebSocket")
+    logger.info(f"Client connected to ASR WebSocket (encoding={encoding})")
     
-    # Queue to buffer audio chunks from client
-    audio_queue = asyncio.Queue()
+    # Bounded buffer between the client and ASR upstream, so a stalled
+    # upstream cannot grow memory without limit
+    audio_queue = BoundedAudioQueue(
+        max_bytes=asr_service.queue_max_bytes, policy=asr_service.queue_policy
+    )
     
     async def audio_generator():
         while True:
@@ -41,19 +60,45 @@ async def websocket_asr_endpoint(websocket: WebSocket):
                 elif "text" in message:
                     text = message["text"]
                     if text == "STOP":
-                        await audio_queue.put(None)
+                        await audio_queue.close()
                         break
+                elif message.get("type") == "websocket.disconnect":
+                    await audio_queue.close()
+                    break
+        except AudioQueueOverflow as e:
+            logger.warning(f"Aborting ASR session: {e}")
+            await audio_queue.close(discard=True)
+            try:
+                await websocket.send_text(json.dumps({"error": str(e)}))
+                await websocket.close(code=1013)
+            except Exception:
+                pass
         except WebSocketDisconnect:
-            await audio_queue.put(None)
+            await audio_queue.close()
         except Exception as e:
             logger.error(f"Error receiving audio from client: {e}")
-            await audio_queue.put(None)
+            await audio_queue.close()
+
+    # Silence is gated before it reaches the (metered) ASR upstream
+    vad = VoiceActivityDetector(asr_service.vad_config)
+
+    async def notify_end_of_utterance():
+        await websocket.send_text(json.dumps({"type": "vad", "event": "end_of_utterance"}))
+
+    delta_encoder = ASRDeltaEncoder() if encoding == "delta" else None
 
     # Task to stream ASR results back to client
     async def stream_results():
         try:
-            async for result in asr_service.stream_asr(audio_generator()):
-                await websocket.send_text(result)
+            async for resp, is_last in asr_service.stream_asr_results(
+                vad.filter(audio_generator(), on_end_of_utterance=notify_end_of_utterance)
+            ):
+                if delta_encoder is None:
+                    await websocket.send_text(json.dumps(resp))
+                    continue
+                delta = delta_encoder.encode(resp, final=is_last)
+                if delta is not None:
+                    await websocket.send_text(json.dumps(delta, ensure_ascii=False))
         except Exception as e:
             logger.error(f"Error streaming ASR results: {e}")
             # Try to send error to client
@@ -61,62 +106,327 @@ async def websocket_asr_endpoint(websocket: WebSocket):
                 await websocket.send_text(json.dumps({"error": str(e)}))
             except:
                 pass
+        finally:
+            # Upstream is done; release a reader blocked on a full queue
+            await audio_queue.close(discard=True)
 
     # Run tasks
     receiver = asyncio.create_task(receive_audio_from_client())
     sender = asyncio.create_task(stream_results())
     
     await asyncio.gather(receiver, sender)
-    logger.info("ASR Session Ended")
+    logger.info(
+        f"ASR Session Ended (VAD forwarded {vad.stats['bytes_out']}/{vad.stats['bytes_in']} bytes, "
+        f"queue high-water {audio_queue.high_water_bytes} bytes, dropped {audio_queue.dropped_bytes} bytes)"
+    )
 
 
 @router.websocket("/ws/tts")
 async def websocket_tts_endpoint(websocket: WebSocket):
+    """
+    Text to speech. Client sends {"text": "...", "format": "pcm"} (or raw
+    text); server streams audio bytes then {"type": "status", "content": "done"}.
+    Requests are synthesized in order. {"type": "cancel"} (or "CANCEL") stops
+    the current and queued requests; each stopped one is answered with
+    {"type": "status", "content": "cancelled"}.
+    """
     await websocket.accept()
     logger.info("Client connected to TTS WebSocket")
-    
+
+    jobs = set()
+    last_job: Optional[asyncio.Task] = None
+
+    async def synthesize(text: str, audio_format: str, previous: Optional[asyncio.Task]):
+        try:
+            if previous is not None:
+                await asyncio.wait({previous})
+            logger.info(f"Received TTS request: {text[:20]}...")
+            async for chunk in tts_service.stream_tts(text, format=audio_format):
+                await websocket.send_bytes(chunk)
+            await websocket.send_text(json.dumps({"type": "status", "content": "done"}))
+        except asyncio.CancelledError:
+            # The upstream TTS session was cancelled by stream_tts
+            try:
+                await websocket.send_text(json.dumps({"type": "status", "content": "cancelled"}))
+            except Exception:
+                pass
+            raise
+        except Exception as e:
+            logger.error(f"Error processing TTS request: {e}")
+            try:
+                await websocket.send_text(json.dumps({"type": "error", "content": str(e)}))
+            except Exception:
+                pass
+
+    async def cancel_jobs():
+        pending = list(jobs)
+        for job in pending:
+            job.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
     try:
         while True:
-            # Expecting text input from client
-            # Format: {"text": "Hello world", "format": "mp3"} or just raw text string?
-            # Let's support JSON for extensibility
             data = await websocket.receive_text()
-            
             try:
-                payload = None
-                try:
-                    payload = websocket.client_state.json_loads(data) # Use internal json loads or standard json
-                    import json
-                    payload = json.loads(data)
-                except:
-                    # If not JSON, treat as raw text
-                    payload = {"text": data}
-                
-                text = payload.get("text")
-                audio_format = payload.get("format", "pcm")
-                
-                if not text:
-                    continue
-                
-                logger.info(f"Received TTS request: {text[:20]}...")
-                
-                # Stream audio back
-                async for chunk in tts_service.stream_tts(text, format=audio_format):
-                    await websocket.send_bytes(chunk)
-                
-                # Send a text message to indicate completion? 
-                # Or just let the client know by silence?
-                # Better to send a control message if possible, but for raw audio stream, 
-                # client usually just plays what it gets.
-                # We can send a special JSON message to indicate end of sentence if needed.
-                # For now, let's just stream audio.
-                
-                # Optional: Send a "done" message
-                await websocket.send_text(json.dumps({"type": "status", "content": "done"}))
-                
+                payload = json.loads(data)
+            except json.JSONDecodeError:
+                payload = {"text": data}
+            if not isinstance(payload, dict):
+                payload = {"text": data}
+
+            if data == "CANCEL" or payload.get("type") == "cancel":
+                await cancel_jobs()
+                continue
+
+            text = payload.get("text")
+            if not text:
+                continue
+            last_job = asyncio.create_task(
+                synthesize(text, payload.get("format", "pcm"), last_job)
+            )
+            jobs.add(last_job)
+            last_job.add_done_callback(jobs.discard)
+
+    except WebSocketDisconnect:
+        logger.info("Client disconnected from TTS WebSocket")
+    finally:
+        await cancel_jobs()
+
+
+@router.websocket("/ws/interview")
+async def websocket_interview_endpoint(websocket: WebSocket):
+    """
+    Interviewer reply spoken sentence by sentence.
+    Client sends {"text": "<user turn>", "system_notice": "...", "format": "pcm"};
+    server streams {"type": "sentence"} JSON, raw audio bytes, then a
+    {"type": "status", "content": "done", "timings": {...}} message.
+    """
+    await websocket.accept()
+    logger.info("Client connected to Interview WebSocket")
+
+    try:
+        interviewer = InterviewerAgent()
+    except ValueError as e:
+        await websocket.send_text(json.dumps({"type": "error", "content": str(e)}))
+        await websocket.close()
+        return
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                payload = json.loads(data)
+            except json.JSONDecodeError:
+                payload = {"text": data}
+
+            pipeline = SentenceSpeechPipeline(
+                tts_service, audio_format=payload.get("format", "pcm")
+            )
+            reply_stream = interviewer.generate_reply_stream(
+                user_input=payload.get("text"),
+                system_notice=payload.get("system_notice"),
+            )
+
+            try:
+                async for event in pipeline.run(reply_stream):
+                    if event.type == "audio":
+                        await websocket.send_bytes(event.data)
+                    elif event.type == "sentence":
+                        await websocket.send_text(
+                            json.dumps({"type": "sentence", "content": event.data}, ensure_ascii=False)
+                        )
+                    elif event.type == "done":
+                        await websocket.send_text(
+                            json.dumps({"type": "status", "content": "done", "timings": event.timings})
+                        )
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
-                logger.error(f"Error processing TTS request: {e}")
+                logger.error(f"Error processing interview turn: {e}")
                 await websocket.send_text(json.dumps({"type": "error", "content": str(e)}))
-                
+
     except WebSocketDisconnect:
-        logger.info("Client disconnected from TTS WebSocket")
+        logger.info("Client disconnected from Interview WebSocket")
+
+
+def _voice_message(event: SpeechEvent):
+    if event.type == "audio":
+        return event.data
+    if event.type == "done":
+        return json.dumps({"type": "status", "content": "done", "timings": event.timings})
+    return json.dumps({"type": event.type, "content": event.data}, ensure_ascii=False)
+
+
+@router.websocket("/ws/voice")
+async def websocket_voice_endpoint(websocket: WebSocket):
+    """
+    Full-duplex voice loop on one socket: client streams PCM (16k, 16bit,
+    mono); each utterance (ended by VAD or a "STOP" text frame) goes through
+    ASR, the orchestrated agents and TTS on the server.
+
+    Server sends {"type": "asr"} partials, {"type": "transcript"},
+    {"type": "sentence"} JSON, raw audio bytes and a
+    {"type": "status", "content": "done", "timings": {...}} message per turn
+    with end-to-end stage timestamps. Query: `session_id` (resume) and
+    `format` (TTS audio format, default pcm).
+
+    Barge-in: once ASR recognizes speech while a reply is being spoken, the
+    reply's LLM stream and TTS session are cancelled, its audio still queued
+    for the client is dropped and {"type": "barge_in"} is sent; the client
+    should stop local playback. The interviewer history keeps only the
+    sentences that were sent.
+    """
+    session_id = websocket.query_params.get("session_id")
+    session = session_manager.get(session_id) if session_id else None
+    if session_id and session is None:
+        await websocket.close(code=1008, reason=f"Unknown session: {session_id}")
+        return
+    await websocket.accept()
+    logger.info("Client connected to Voice WebSocket")
+
+    outbound: asyncio.Queue = asyncio.Queue()
+
+    async def send_messages():
+        while True:
+            message = await outbound.get()
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
+
+    async def play(events, queue: Optional[BoundedAudioQueue] = None):
+        try:
+            async for event in events:
+                outbound.put_nowait(_voice_message(event))
+        except Exception as e:
+            logger.error(f"Error processing voice turn: {e}")
+            outbound.put_nowait(json.dumps({"type": "error", "content": str(e)}))
+        finally:
+            if queue is not None:
+                await queue.close(discard=True)
+
+    sender = asyncio.create_task(send_messages())
+    # Running turns -> their timeline (None for the opening line)
+    turns: Dict[asyncio.Task, Optional[TurnTimeline]] = {}
+
+    def spawn(
+        events,
+        queue: Optional[BoundedAudioQueue] = None,
+        timeline: Optional[TurnTimeline] = None,
+    ) -> asyncio.Task:
+        task = asyncio.create_task(play(events, queue))
+        turns[task] = timeline
+        task.add_done_callback(lambda done: turns.pop(done, None))
+        return task
+
+    async def barge_in(current: TurnTimeline):
+        # Only replies already under way; a turn still waiting for its
+        # reply keeps its place so no user utterance is dropped
+        speaking = [
+            task for task, timeline in turns.items()
+            if timeline is not current and (timeline is None or "reply_start" in timeline.marks)
+        ]
+        if not speaking:
+            return
+        for task in speaking:
+            task.cancel()
+        await asyncio.gather(*speaking, return_exceptions=True)
+        # Drop audio not yet written to the socket; keep control messages
+        kept = []
+        while not outbound.empty():
+            message = outbound.get_nowait()
+            if not isinstance(message, bytes):
+                kept.append(message)
+        for message in kept:
+            outbound.put_nowait(message)
+        outbound.put_nowait(json.dumps({"type": "barge_in"}))
+        logger.info(f"Barge-in: cancelled {len(speaking)} reply(s)")
+
+    current_queue: Optional[BoundedAudioQueue] = None
+    last_turn: Optional[asyncio.Task] = None
+
+    def start_turn() -> BoundedAudioQueue:
+        nonlocal current_queue, last_turn
+        queue = BoundedAudioQueue(
+            max_bytes=asr_service.queue_max_bytes, policy=asr_service.queue_policy
+        )
+        timeline = TurnTimeline()
+
+        async def audio():
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+
+        async def end_of_utterance():
+            nonlocal current_queue
+            # Later audio belongs to the next turn
+            if current_queue is queue:
+                current_queue = None
+            outbound.put_nowait(json.dumps({"type": "vad", "event": "end_of_utterance"}))
+
+        async def speech_detected():
+            await barge_in(timeline)
+
+        events = voice_loop.run_turn(
+            audio(),
+            timeline,
+            on_end_of_utterance=end_of_utterance,
+            before_reply=last_turn,
+            on_speech=speech_detected,
+        )
+        last_turn = spawn(events, queue, timeline)
+        current_queue = queue
+        return queue
+
+    try:
+        resumed = session is not None
+        if not resumed:
+            try:
+                session = await session_manager.create()
+            except (SessionLimitError, ValueError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "content": str(e)}))
+                await websocket.close(code=1013)
+                return
+        outbound.put_nowait(
+            json.dumps({"type": "session", "session_id": session.session_id, "resumed": resumed})
+        )
+        voice_loop = VoiceLoop(
+            asr_service, tts_service, session, audio_format=websocket.query_params.get("format", "pcm")
+        )
+        if not resumed:
+            opening = await session.start()
+            last_turn = spawn(voice_loop.speak(opening))
+
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                queue = current_queue or start_turn()
+                try:
+                    await queue.put(message["bytes"])
+                except AudioQueueOverflow as e:
+                    logger.warning(f"Dropping voice turn: {e}")
+                    current_queue = None
+                    await queue.close(discard=True)
+                    outbound.put_nowait(json.dumps({"type": "error", "content": str(e)}))
+            elif message.get("text") == "STOP" and current_queue is not None:
+                await current_queue.close()
+                current_queue = None
+    except WebSocketDisconnect:
+        pass
+    finally:
+        logger.info("Client disconnected from Voice WebSocket")
+        if current_queue is not None:
+            await current_queue.close(discard=True)
+        pending = list(turns)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        sender.cancel()
+        try:
+            await sender
+        except (asyncio.CancelledError, Exception):
+            pass
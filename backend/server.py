@@ -1,4 +1,7 @@
+import asyncio
 import logging
+import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 import sys
 
@@ -8,11 +11,44 @@ import uvicorn
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from backend.routers import voice
+from backend.routers import session, voice
+from backend.services.session_manager import session_manager
+from backend.services.voice_loop import voice_totals
+from backend.utils.audio_buffer import audio_queue_totals
+from backend.utils.metrics import registry as metrics_registry
+from backend.utils.vad import vad_totals
+from backend.utils.volc_protocol import protocol_metrics
+from utils.client_registry import get_client_registry
+from utils.context_cache import get_default_context_cache
+from utils.llm_client import get_default_llm_client
+from utils.rate_limiter import get_default_limiter
+from utils.response_cache import get_default_cache
+from utils.retry import retry_snapshot
 
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool = voice.tts_service.pool
+    warm_count = int(os.getenv("VOLC_TTS_POOL_WARM", "0"))
+    if pool is not None and warm_count > 0:
+        try:
+            await pool.warm(voice.tts_service.resource_id, voice.tts_service.voice_type, warm_count)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"TTS pool pre-warm failed: {e}")
+    if os.getenv("LLM_PREWARM", "1") == "1" and os.getenv("ARK_API_KEY") and os.getenv("LLM_MODEL_ID"):
+        await get_default_llm_client().prewarm()
+    reaper = asyncio.create_task(session_manager.reap_forever())
+    yield
+    reaper.cancel()
+    await session_manager.close_all()
+    if pool is not None:
+        await pool.close()
+    await get_client_registry().aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,10 +59,33 @@ app.add_middleware(
 )
 
 app.include_router(voice.router)
+app.include_router(session.router)
+
+metrics_registry.register("volc_protocol", protocol_metrics.snapshot)
+metrics_registry.register("asr_vad", lambda: dict(vad_totals))
+metrics_registry.register("asr_queue", lambda: dict(audio_queue_totals))
+if voice.tts_service.pool is not None:
+    metrics_registry.register(
+        "tts_pool",
+        lambda: {**voice.tts_service.pool.stats, "idle": voice.tts_service.pool.idle_count()},
+    )
+if get_default_cache() is not None:
+    metrics_registry.register("llm_cache", lambda: get_default_cache().snapshot())
+metrics_registry.register("llm_scheduler", lambda: get_default_limiter().snapshot())
+metrics_registry.register("llm_resilience", retry_snapshot)
+metrics_registry.register("sessions", session_manager.snapshot)
+metrics_registry.register("voice_loop", lambda: dict(voice_totals))
+metrics_registry.register("llm_http_pool", lambda: get_client_registry().snapshot())
+if get_default_context_cache() is not None:
+    metrics_registry.register("llm_context_cache", lambda: get_default_context_cache().snapshot())
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "service": "Maia Backend"}
 
+@app.get("/metrics")
+def read_metrics():
+    return metrics_registry.snapshot()
+
 if __name__ == "__main__":
     uvicorn.run("backend.server:app", host="0.0.0.0", port=8000, reload=True)
@@ -3,17 +3,21 @@ import json
 import logging
 import os
 import uuid
-from typing import AsyncGenerator, Optional
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
 
 import websockets
 from dotenv import load_dotenv
 
+from backend.utils.audio_frames import PCMFrameAggregator
+from backend.utils.vad import VADConfig
 from backend.utils.volc_protocol import (
+    CompressionBits,
     EventType,
     MsgType,
     MsgTypeFlagBits,
     full_client_request,
     audio_only_client,
+    protocol_metrics,
     receive_message,
 )
 
@@ -31,6 +35,26 @@ class VolcASRService:
             "VOLC_ASR_ENDPOINT",
             "wss://openspeech.bytedance.com/api/v3/sauc/bigmodel_async",
         )
+        # Uplink audio is coalesced into fixed-duration segments (0 disables)
+        self.segment_ms = int(os.getenv("VOLC_ASR_SEGMENT_MS", "100"))
+        self.max_latency_ms = int(os.getenv("VOLC_ASR_SEGMENT_MAX_LATENCY_MS", "150"))
+        # Per-session cap on buffered client audio (default ~10 s of PCM)
+        self.queue_max_bytes = int(os.getenv("VOLC_ASR_QUEUE_MAX_BYTES", "320000"))
+        self.queue_policy = os.getenv("VOLC_ASR_QUEUE_POLICY", "drop_oldest")
+        # Silence handling in front of the uplink (see backend/utils/vad.py)
+        self.vad_config = VADConfig(
+            mode=os.getenv("VOLC_ASR_VAD_MODE", "compress"),
+            energy_threshold_db=float(os.getenv("VOLC_ASR_VAD_THRESHOLD_DB", "-45")),
+            hangover_ms=int(os.getenv("VOLC_ASR_VAD_HANGOVER_MS", "300")),
+            end_of_utterance_ms=int(os.getenv("VOLC_ASR_VAD_EOU_MS", "0")),
+            pause_ms=int(os.getenv("VOLC_ASR_VAD_PAUSE_MS", "250")),
+        )
+        # Gzip the request JSON; the server then answers with gzipped results
+        self.compression = (
+            CompressionBits.Gzip
+            if os.getenv("VOLC_ASR_GZIP", "1") == "1"
+            else CompressionBits.None_
+        )
 
         if not all([self.appid, self.token]):
             logger.warning(
@@ -42,8 +66,25 @@ class VolcASRService:
     ) -> AsyncGenerator[str, None]:
         """
         Stream audio to Volcengine ASR and yield recognized text.
-        audio_generator: yields PCM bytes (16k, 16bit, mono)
+        Each item is the full vendor JSON (see stream_asr_results).
+        """
+        async for resp, _ in self.stream_asr_results(audio_generator):
+            yield json.dumps(resp) # Send full JSON for frontend to parse (inc. partial)
+
+    async def stream_asr_results(
+        self, audio_generator: AsyncGenerator[bytes, None]
+    ) -> AsyncGenerator[Tuple[Dict[str, Any], bool], None]:
+        """
+        Stream audio to Volcengine ASR and yield (parsed response, is_last).
+        audio_generator: yields PCM bytes (16k, 16bit, mono), any chunk size;
+        chunks are aggregated into `segment_ms` segments before sending.
+        Only responses carrying result.text are yielded.
         """
+        aggregator = None
+        if self.segment_ms > 0:
+            aggregator = PCMFrameAggregator(self.segment_ms, self.max_latency_ms)
+            audio_generator = aggregator.aggregate(audio_generator)
+
         headers = {
             "X-Api-App-Key": self.appid,
             "X-Api-Access-Key": self.token,
@@ -51,6 +92,8 @@ class VolcASRService:
             "X-Api-Connect-Id": str(uuid.uuid4()),
         }
 
+        stats = protocol_metrics.open_session("asr")
+
         try:
             async with websockets.connect(
                 self.endpoint, additional_headers=headers, max_size=10 * 1024 * 1024
@@ -73,7 +116,12 @@ class VolcASRService:
                         "enable_ddc": True,
                     }
                 }
-                await full_client_request(websocket, json.dumps(req_payload).encode("utf-8"))
+                await full_client_request(
+                    websocket,
+                    json.dumps(req_payload).encode("utf-8"),
+                    stats=stats,
+                    compression=self.compression,
+                )
 
                 # 2. Create Tasks for Sending and Receiving
                 
@@ -82,9 +130,13 @@ class VolcASRService:
                     try:
                         async for chunk in audio_generator:
                             if chunk:
-                                await audio_only_client(websocket, chunk, MsgTypeFlagBits.NoSeq)
+                                await audio_only_client(
+                                    websocket, chunk, MsgTypeFlagBits.NoSeq, stats=stats
+                                )
                         # End of stream
-                        await audio_only_client(websocket, b"", MsgTypeFlagBits.LastNoSeq)
+                        await audio_only_client(
+                            websocket, b"", MsgTypeFlagBits.LastNoSeq, stats=stats
+                        )
                         logger.info("Sent all audio data")
                     except Exception as e:
                         logger.error(f"Error sending audio to ASR: {e}")
@@ -94,25 +146,24 @@ class VolcASRService:
                 async def receive_results():
                     try:
                         while True:
-                            msg = await receive_message(websocket)
+                            msg = await receive_message(websocket, stats=stats)
                             if msg.type == MsgType.FullServerResponse:
+                                # Check if sequence indicates end (NegativeSeq)
+                                is_last = (
+                                    msg.flag == MsgTypeFlagBits.NegativeSeq
+                                    or msg.flag == MsgTypeFlagBits.LastNoSeq
+                                )
                                 if msg.payload:
                                     try:
                                         resp = json.loads(msg.payload)
-                                        # Yield full response for now, or just text?
-                                        # The verification demo showed {"result": {"text": "..."}}
-                                        # Let's yield the text if available
-                                        if "result" in resp and "text" in resp["result"]:
-                                            yield json.dumps(resp) # Send full JSON for frontend to parse (inc. partial)
-                                        
-                                        # Check for end of session (sequence < 0 or specific flags)
-                                        # But usually we rely on "is_last_package" in payload if checking manually
-                                        # Or just keep running until connection closes
                                     except Exception as e:
                                         logger.error(f"Failed to parse ASR response: {e}")
-                                
-                                # Check if sequence indicates end (NegativeSeq)
-                                if msg.flag == MsgTypeFlagBits.NegativeSeq or msg.flag == MsgTypeFlagBits.LastNoSeq:
+                                    else:
+                                        # The verification demo showed {"result": {"text": "..."}}
+                                        if "result" in resp and "text" in resp["result"]:
+                                            yield resp, is_last
+
+                                if is_last:
                                     break
                             elif msg.type == MsgType.Error:
                                 logger.error(f"ASR Error: {msg.error_code} - {msg.payload}")
@@ -138,3 +189,9 @@ class VolcASRService:
         except Exception as e:
             logger.error(f"ASR Connection Error: {e}")
             raise
+        finally:
+            protocol_metrics.close_session(stats)
+            if aggregator is not None:
+                logger.debug(
+                    f"ASR uplink aggregated {aggregator.chunks_in} chunks into {aggregator.segments_out} segments"
+                )
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from agents.session_orchestrator import SessionOrchestrator
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when the manager is at capacity and no idle session can be evicted."""
+
+
+class SessionManager:
+    """Registry of live interview sessions for the FastAPI backend.
+
+    All sessions run on the server's event loop and share the process-wide
+    LLMClient, HTTP pool and scheduler; each one only holds its own state.
+    Sessions idle for longer than `idle_timeout` seconds are closed by
+    `reap_idle()`, which `create()` also runs when the manager is full.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_timeout: float = 1800,
+        factory: Callable[..., SessionOrchestrator] = SessionOrchestrator,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        self._sessions: Dict[str, SessionOrchestrator] = {}
+        self.stats = {"created": 0, "closed": 0, "evicted": 0, "rejected": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def create(self, session_id: Optional[str] = None, **kwargs: Any) -> SessionOrchestrator:
+        if session_id is not None and session_id in self._sessions:
+            raise ValueError(f"Session already exists: {session_id}")
+        if len(self._sessions) >= self.max_sessions:
+            await self.reap_idle()
+        if len(self._sessions) >= self.max_sessions:
+            self.stats["rejected"] += 1
+            raise SessionLimitError(f"Session limit reached ({self.max_sessions})")
+
+        session = self.factory(session_id=session_id, **kwargs)
+        self._sessions[session.session_id] = session
+        self.stats["created"] += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[SessionOrchestrator]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+        return session
+
+    async def close(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        await session.close()
+        self.stats["closed"] += 1
+        return True
+
+    async def reap_idle(self) -> int:
+        """Close sessions idle for longer than idle_timeout; returns how many."""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [
+            sid for sid, s in self._sessions.items()
+            if s.last_active < cutoff and not s.analysis_pending
+        ]
+        for sid in idle:
+            await self.close(sid)
+        self.stats["evicted"] += len(idle)
+        if idle:
+            logger.info(f"Evicted {len(idle)} idle session(s)")
+        return len(idle)
+
+    async def reap_forever(self, interval: float = 60) -> None:
+        """Background reaper loop, started from the server lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap_idle()
+            except Exception as e:
+                logger.error(f"Session reaper failed: {e}")
+
+    async def close_all(self) -> None:
+        await asyncio.gather(*(self.close(sid) for sid in list(self._sessions)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        totals: Dict[str, int] = {
+            "history_messages": 0, "history_bytes": 0, "history_tokens": 0,
+            "summary_tokens": 0, "state_bytes": 0, "analysis_pending": 0, "interruptions": 0,
+        }
+        for session in self._sessions.values():
+            for key, value in session.memory_stats().items():
+                if key in totals:
+                    totals[key] += int(value)
+        return {**self.stats, "active": len(self._sessions), "memory": totals}
+
+
+session_manager = SessionManager(
+    max_sessions=int(os.getenv("MAX_SESSIONS", "1000")),
+    idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT_S", "1800")),
+)
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, AsyncIterator, Dict, Optional, Union
+
+from backend.services.tts_service import VolcTTSService
+from backend.utils.sentence_splitter import SentenceSplitter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeechEvent:
+    """Event produced by the speech pipeline.
+
+    type: "sentence" (data is the sentence text), "audio" (data is an audio
+    chunk) or "done" (data is empty, timings holds stage latencies in ms).
+    """
+
+    type: str
+    data: Union[str, bytes] = ""
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class SentenceSpeechPipeline:
+    """Overlap LLM generation with TTS synthesis at sentence granularity.
+
+    Token deltas are split into sentences on a producer task; each finished
+    sentence is synthesized immediately while the LLM keeps generating the
+    next ones. Audio therefore starts one sentence after the first token
+    instead of after the whole reply.
+    """
+
+    def __init__(
+        self,
+        tts_service: VolcTTSService,
+        audio_format: str = "pcm",
+        min_chars: int = 4,
+        max_chars: int = 80,
+    ):
+        self.tts = tts_service
+        self.audio_format = audio_format
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+
+    async def run(
+        self, text_stream: AsyncIterator[str], start: Optional[float] = None
+    ) -> AsyncGenerator[SpeechEvent, None]:
+        """Consume a stream of text deltas and yield sentence/audio events.
+
+        Timings are relative to `start` (a time.perf_counter() value), which
+        defaults to now; callers pass an earlier origin to get end-to-end
+        stage latencies.
+        """
+        if start is None:
+            start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        sentence_queue: asyncio.Queue = asyncio.Queue()
+
+        def mark(stage: str) -> None:
+            if stage not in timings:
+                timings[stage] = (time.perf_counter() - start) * 1000
+
+        async def produce_sentences():
+            splitter = SentenceSplitter(self.min_chars, self.max_chars)
+            try:
+                async for delta in text_stream:
+                    mark("first_token")
+                    for sentence in splitter.feed(delta):
+                        await sentence_queue.put(sentence)
+                rest = splitter.flush()
+                if rest:
+                    await sentence_queue.put(rest)
+                mark("llm_done")
+            finally:
+                await sentence_queue.put(None)
+
+        producer = asyncio.create_task(produce_sentences())
+
+        try:
+            while True:
+                sentence = await sentence_queue.get()
+                if sentence is None:
+                    break
+
+                mark("first_sentence")
+                yield SpeechEvent(type="sentence", data=sentence)
+
+                audio = self.tts.stream_tts(sentence, format=self.audio_format)
+                try:
+                    async for chunk in audio:
+                        mark("first_audio")
+                        yield SpeechEvent(type="audio", data=chunk)
+                finally:
+                    # Close explicitly so an interrupted TTS session is
+                    # cancelled now rather than when garbage-collected
+                    await audio.aclose()
+
+            # Surface LLM errors that ended the stream early
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+        mark("done")
+        logger.info(
+            "Speech pipeline finished: "
+            + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items())
+        )
+        yield SpeechEvent(type="done", timings=timings)
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import websockets
+from websockets.protocol import State
+
+from backend.utils.volc_protocol import (
+    EventType,
+    MsgType,
+    finish_connection,
+    start_connection,
+    wait_for_event,
+)
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str]  # (resource_id, speaker)
+
+
+@dataclass
+class PooledConnection:
+    """A warm websocket that has completed StartConnection."""
+
+    websocket: Any
+    key: PoolKey
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    sessions: int = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.websocket.state == State.OPEN
+
+
+class TTSConnectionPool:
+    """Keep warm Volcengine v3 TTS connections and run sessions over them.
+
+    One connection runs one session at a time; sessions are opened and closed
+    with StartSession/FinishSession while the socket itself stays up, so only
+    the first utterance per (resource_id, speaker) pays the TLS + handshake
+    cost. Idle connections are pinged and evicted by a background janitor.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        appid: Optional[str],
+        token: Optional[str],
+        max_idle_per_key: int = 2,
+        idle_timeout: float = 60.0,
+        max_sessions_per_conn: int = 500,
+        health_check_interval: float = 15.0,
+        ping_timeout: float = 3.0,
+        connect: Optional[Callable[..., Any]] = None,
+    ):
+        self.endpoint = endpoint
+        self.appid = appid
+        self.token = token
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_conn = max_sessions_per_conn
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self._connect = connect or websockets.connect
+
+        self._idle: Dict[PoolKey, List[PooledConnection]] = {}
+        self._lock = asyncio.Lock()
+        self._janitor: Optional[asyncio.Task] = None
+        self.stats = {
+            "connects": 0, "reuses": 0, "evictions": 0, "discards": 0,
+            "cancels": 0, "cancel_reuses": 0,
+        }
+
+    @asynccontextmanager
+    async def connection(
+        self, resource_id: str, speaker: str
+    ) -> AsyncIterator[PooledConnection]:
+        """Borrow a connection for one session.
+
+        If the body raises or is abandoned mid-session the socket state is
+        unknown, so the connection is closed instead of returned to the pool.
+        """
+        conn = await self.acquire(resource_id, speaker)
+        healthy = False
+        try:
+            yield conn
+            healthy = True
+        finally:
+            await self.release(conn, healthy=healthy)
+
+    async def acquire(self, resource_id: str, speaker: str) -> PooledConnection:
+        """Return an idle connection for the key, or open a new one."""
+        self._ensure_janitor()
+        key = (resource_id, speaker)
+
+        async with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn = idle.pop()
+                if conn.is_open:
+                    self.stats["reuses"] += 1
+                    return conn
+                self.stats["discards"] += 1
+
+        return await self._open(key)
+
+    async def release(self, conn: PooledConnection, healthy: bool = True) -> None:
+        """Return a connection after a session, or close it."""
+        conn.last_used = time.monotonic()
+        conn.sessions += 1
+
+        if healthy and conn.is_open and conn.sessions < self.max_sessions_per_conn:
+            if await self._put_idle(conn):
+                return
+
+        self.stats["discards"] += 1
+        await self._close(conn)
+
+    async def warm(self, resource_id: str, speaker: str, count: int = 1) -> None:
+        """Pre-open connections so the first utterance skips the handshake."""
+        key = (resource_id, speaker)
+        conns = await asyncio.gather(*(self._open(key) for _ in range(count)))
+        for conn in conns:
+            if not await self._put_idle(conn):
+                await self._close(conn)
+
+    async def evict_idle(self) -> None:
+        """Close connections idle past idle_timeout or failing a ping."""
+        now = time.monotonic()
+        async with self._lock:
+            candidates = [c for conns in self._idle.values() for c in conns]
+            self._idle = {}
+
+        keep = []
+        for conn in candidates:
+            if now - conn.last_used > self.idle_timeout or not await self._ping(conn):
+                self.stats["evictions"] += 1
+                await self._close(conn)
+            else:
+                keep.append(conn)
+
+        async with self._lock:
+            for conn in keep:
+                self._idle.setdefault(conn.key, []).append(conn)
+
+    async def close(self) -> None:
+        """Stop the janitor and close every idle connection."""
+        if self._janitor and not self._janitor.done():
+            self._janitor.cancel()
+            try:
+                await self._janitor
+            except asyncio.CancelledError:
+                pass
+        self._janitor = None
+
+        async with self._lock:
+            conns = [c for conns in self._idle.values() for c in conns]
+            self._idle = {}
+        for conn in conns:
+            await self._close(conn)
+
+    def idle_count(self) -> int:
+        return sum(len(conns) for conns in self._idle.values())
+
+    async def _open(self, key: PoolKey) -> PooledConnection:
+        resource_id, _ = key
+        headers = {
+            "X-Api-App-Key": self.appid,
+            "X-Api-Access-Key": self.token,
+            "X-Api-Resource-Id": resource_id,
+            "X-Api-Connect-Id": str(uuid.uuid4()),
+        }
+        websocket = await self._connect(
+            self.endpoint, additional_headers=headers, max_size=10 * 1024 * 1024
+        )
+        try:
+            await start_connection(websocket)
+            await wait_for_event(
+                websocket, MsgType.FullServerResponse, EventType.ConnectionStarted
+            )
+        except Exception:
+            await websocket.close()
+            raise
+
+        self.stats["connects"] += 1
+        logger.info(f"Opened pooled TTS connection for {key}")
+        return PooledConnection(websocket=websocket, key=key)
+
+    async def _put_idle(self, conn: PooledConnection) -> bool:
+        async with self._lock:
+            idle = self._idle.setdefault(conn.key, [])
+            if len(idle) >= self.max_idle_per_key:
+                return False
+            idle.append(conn)
+            return True
+
+    async def _ping(self, conn: PooledConnection) -> bool:
+        if not conn.is_open:
+            return False
+        try:
+            pong = await conn.websocket.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _close(self, conn: PooledConnection) -> None:
+        try:
+            if conn.is_open:
+                await finish_connection(conn.websocket)
+            await conn.websocket.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled TTS connection: {e}")
+
+    def _ensure_janitor(self) -> None:
+        if self._janitor is None or self._janitor.done():
+            self._janitor = asyncio.create_task(self._run_janitor())
+
+    async def _run_janitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"TTS pool health check failed: {e}")
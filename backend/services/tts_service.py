@@ -8,11 +8,19 @@ from typing import AsyncGenerator, Optional
 import websockets
 from dotenv import load_dotenv
 
+from backend.services.tts_pool import TTSConnectionPool
 from backend.utils.volc_protocol import (
+    CompressionBits,
     EventType,
     MsgType,
+    cancel_session,
+    finish_session,
     full_client_request,
+    protocol_metrics,
     receive_message,
+    start_session,
+    task_request,
+    wait_for_event,
 )
 
 load_dotenv()
@@ -30,6 +38,24 @@ class VolcTTSService:
             "VOLC_TTS_ENDPOINT",
             "wss://openspeech.bytedance.com/api/v3/tts/unidirectional/stream",
         )
+        # Pooled mode runs many sessions over one bidirectional connection
+        self.bidi_endpoint = os.getenv(
+            "VOLC_TTS_BIDI_ENDPOINT",
+            "wss://openspeech.bytedance.com/api/v3/tts/bidirection",
+        )
+        # Requests at least this large are gzipped (long texts); 0 disables
+        self.gzip_min_bytes = int(os.getenv("VOLC_TTS_GZIP_MIN_BYTES", "1024"))
+        # How long a barge-in waits for the server to confirm CancelSession
+        self.cancel_timeout = float(os.getenv("VOLC_TTS_CANCEL_TIMEOUT_S", "1.0"))
+        self.pool: Optional[TTSConnectionPool] = None
+        if os.getenv("VOLC_TTS_POOL", "1") == "1":
+            self.pool = TTSConnectionPool(
+                self.bidi_endpoint,
+                self.appid,
+                self.token,
+                max_idle_per_key=int(os.getenv("VOLC_TTS_POOL_MAX_IDLE", "2")),
+                idle_timeout=float(os.getenv("VOLC_TTS_POOL_IDLE_TIMEOUT", "60")),
+            )
 
         if not all([self.appid, self.token]):
             logger.warning(
@@ -46,12 +72,22 @@ class VolcTTSService:
         if not text:
             return
 
+        if self.pool is not None:
+            pooled = self._stream_tts_pooled(text, format)
+            try:
+                async for chunk in pooled:
+                    yield chunk
+            finally:
+                await pooled.aclose()
+            return
+
         headers = {
             "X-Api-App-Key": self.appid,
             "X-Api-Access-Key": self.token,
             "X-Api-Resource-Id": self.resource_id,
             "X-Api-Connect-Id": str(uuid.uuid4()),
         }
+        stats = protocol_metrics.open_session("tts")
 
         try:
             async with websockets.connect(
@@ -83,13 +119,17 @@ class VolcTTSService:
                 }
 
                 # Send request
+                payload = json.dumps(request_payload).encode()
                 await full_client_request(
-                    websocket, json.dumps(request_payload).encode()
+                    websocket,
+                    payload,
+                    stats=stats,
+                    compression=self._compression_for(payload),
                 )
 
                 # Receive loop
                 while True:
-                    msg = await receive_message(websocket)
+                    msg = await receive_message(websocket, stats=stats)
 
                     if msg.type == MsgType.FullServerResponse:
                         if msg.event == EventType.SessionFinished:
@@ -113,6 +153,140 @@ class VolcTTSService:
         except Exception as e:
             logger.error(f"TTS Streaming Error: {e}")
             raise
+        finally:
+            protocol_metrics.close_session(stats)
+
+    def _compression_for(self, payload: bytes) -> CompressionBits:
+        if self.gzip_min_bytes and len(payload) >= self.gzip_min_bytes:
+            return CompressionBits.Gzip
+        return CompressionBits.None_
+
+    async def _stream_tts_pooled(
+        self, text: str, format: str
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Synthesize one utterance as a session on a warm pooled connection.
+        """
+        req_params = {
+            "speaker": self.voice_type,
+            "audio_params": {
+                "format": format,
+                "sample_rate": 24000,
+                "enable_timestamp": False,
+            },
+            "additions": json.dumps({"disable_markdown_filter": False}),
+        }
+        session_id = str(uuid.uuid4())
+        stats = protocol_metrics.open_session("tts")
+        conn = None
+        healthy = False
+        started = False
+
+        try:
+            conn = await self.pool.acquire(self.resource_id, self.voice_type)
+            websocket = conn.websocket
+
+            await start_session(
+                websocket,
+                json.dumps(
+                    {
+                        "user": {"uid": session_id},
+                        "event": EventType.StartSession,
+                        "namespace": "BidirectionalTTS",
+                        "req_params": req_params,
+                    }
+                ).encode(),
+                session_id,
+                stats=stats,
+            )
+            started = True
+            await wait_for_event(
+                websocket,
+                MsgType.FullServerResponse,
+                EventType.SessionStarted,
+                stats=stats,
+            )
+
+            payload = json.dumps(
+                {
+                    "user": {"uid": session_id},
+                    "event": EventType.TaskRequest,
+                    "namespace": "BidirectionalTTS",
+                    "req_params": {**req_params, "text": text},
+                }
+            ).encode()
+            await task_request(
+                websocket,
+                payload,
+                session_id,
+                stats=stats,
+                compression=self._compression_for(payload),
+            )
+            await finish_session(websocket, session_id, stats=stats)
+
+            while True:
+                msg = await receive_message(websocket, stats=stats)
+
+                if msg.type == MsgType.AudioOnlyServer:
+                    if msg.payload:
+                        yield msg.payload
+                elif msg.type == MsgType.FullServerResponse:
+                    if msg.event == EventType.SessionFinished:
+                        logger.debug("TTS Session Finished")
+                        break
+                    elif msg.event == EventType.SessionFailed:
+                        raise RuntimeError(f"TTS Session Failed: {msg.payload}")
+                elif msg.type == MsgType.Error:
+                    raise RuntimeError(
+                        f"TTS Error: {msg.error_code} - {msg.payload}"
+                    )
+            healthy = True
+
+        except (GeneratorExit, asyncio.CancelledError):
+            # Abandoned mid-utterance (barge-in): cancel the session so the
+            # server stops synthesizing; a confirmed cancel keeps the
+            # connection reusable.
+            if conn is not None and started:
+                healthy = await self._cancel_session(conn.websocket, session_id, stats)
+            raise
+        except Exception as e:
+            logger.error(f"TTS Streaming Error: {e}")
+            raise
+        finally:
+            if conn is not None:
+                await self.pool.release(conn, healthy=healthy)
+            protocol_metrics.close_session(stats)
+
+    async def _cancel_session(self, websocket, session_id: str, stats) -> bool:
+        """Send CancelSession and wait for the server to confirm it.
+
+        Returns True when the session ended cleanly within cancel_timeout.
+        """
+        self.pool.stats["cancels"] += 1
+
+        async def drain() -> bool:
+            while True:
+                msg = await receive_message(websocket, stats=stats)
+                if msg.type == MsgType.FullServerResponse and msg.event in (
+                    EventType.SessionCanceled,
+                    EventType.SessionFinished,
+                ):
+                    return True
+                if msg.type == MsgType.Error or (
+                    msg.type == MsgType.FullServerResponse
+                    and msg.event == EventType.SessionFailed
+                ):
+                    return False
+
+        try:
+            await cancel_session(websocket, session_id, stats=stats)
+            clean = await asyncio.wait_for(drain(), self.cancel_timeout)
+        except Exception as e:
+            logger.debug(f"TTS session cancel did not complete cleanly: {e}")
+            return False
+        if clean:
+            self.pool.stats["cancel_reuses"] += 1
+        return clean
 
 
 # Simple test block
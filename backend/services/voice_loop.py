@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from agents.session_orchestrator import SessionOrchestrator, SpeculativeReply
+from backend.services.asr_service import VolcASRService
+from backend.services.speech_pipeline import SentenceSpeechPipeline, SpeechEvent
+from backend.services.tts_service import VolcTTSService
+from backend.utils.asr_delta import is_definite
+from backend.utils.vad import VADConfig, VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+# Process-wide voice loop counters (served by GET /metrics)
+voice_totals = {
+    "turns": 0,
+    "empty_turns": 0,
+    "barge_ins": 0,
+    "speculations": 0,
+    "speculation_hits": 0,
+    "speculation_misses": 0,
+}
+
+
+@dataclass
+class TurnTimeline:
+    """Stage timestamps of one voice turn, in ms since its first audio frame.
+
+    Stages: asr_first_partial, speech_detected, speculation_start, speech_end,
+    asr_final, reply_start, first_token, first_sentence, first_audio,
+    llm_done, done.
+    """
+
+    start: float = field(default_factory=time.perf_counter)
+    marks: Dict[str, float] = field(default_factory=dict)
+
+    def mark(self, stage: str) -> None:
+        if stage not in self.marks:
+            self.marks[stage] = (time.perf_counter() - self.start) * 1000
+
+    def merge(self, timings: Dict[str, float]) -> None:
+        for stage, value in timings.items():
+            self.marks.setdefault(stage, value)
+
+    def summary(self) -> Dict[str, float]:
+        result = {stage: round(value, 1) for stage, value in self.marks.items()}
+        # What the user perceives: silence after they stop talking
+        if "speech_end" in self.marks and "first_audio" in self.marks:
+            result["speech_end_to_first_audio"] = round(
+                self.marks["first_audio"] - self.marks["speech_end"], 1
+            )
+        return result
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+class VoiceLoop:
+    """Server-side voice turn: ASR final -> orchestrated reply -> TTS.
+
+    The transcript never leaves the server before the reply starts, so the
+    client round trips of /ws/asr followed by /ws/tts disappear from the turn
+    latency. Events reuse SpeechEvent with extra types: "asr" (partial
+    transcript text) and "transcript" (final text); "done" carries the
+    TurnTimeline summary.
+
+    Speculative mode (VOICE_SPECULATIVE=1): when the VAD reports a pause
+    (VOLC_ASR_VAD_PAUSE_MS) and the latest ASR partial is entirely definite,
+    the reply is started on that partial while the user's trailing silence
+    runs out. It is used if the final transcript matches up to punctuation,
+    otherwise it is cancelled (rolled back) and the reply restarts.
+    """
+
+    def __init__(
+        self,
+        asr_service: VolcASRService,
+        tts_service: VolcTTSService,
+        session: SessionOrchestrator,
+        audio_format: str = "pcm",
+        vad_config: Optional[VADConfig] = None,
+        speculative: Optional[bool] = None,
+    ):
+        self.asr = asr_service
+        self.tts = tts_service
+        self.session = session
+        self.audio_format = audio_format
+        self.vad_config = vad_config or asr_service.vad_config
+        if speculative is None:
+            speculative = os.getenv("VOICE_SPECULATIVE", "0") == "1"
+        self.speculative = speculative
+
+    async def speak(self, text: str) -> AsyncGenerator[SpeechEvent, None]:
+        """Synthesize a fixed text (e.g. the opening line)."""
+        pipeline = SentenceSpeechPipeline(self.tts, audio_format=self.audio_format)
+        played = self._play_reply(pipeline.run(_single(text)))
+        try:
+            async for event in played:
+                yield event
+        finally:
+            await played.aclose()
+
+    async def _play_reply(
+        self, events: AsyncGenerator[SpeechEvent, None]
+    ) -> AsyncGenerator[SpeechEvent, None]:
+        """Pass reply events through, tracking which sentences were heard.
+
+        A sentence counts as heard once its first audio chunk went out. If the
+        reply is abandoned (barge-in cancels the turn), the interviewer
+        history is cut back to the heard text.
+        """
+        heard: List[str] = []
+        pending: Optional[str] = None
+        started = False
+        try:
+            async for event in events:
+                if event.type == "sentence":
+                    started = True
+                    pending = event.data
+                elif event.type == "audio" and pending is not None:
+                    heard.append(pending)
+                    pending = None
+                yield event
+        except (GeneratorExit, asyncio.CancelledError):
+            # Close the pipeline first so the interviewer commits what it
+            # generated, then cut that back to what was played
+            await events.aclose()
+            if started:
+                voice_totals["barge_ins"] += 1
+                self.session.truncate_reply("".join(heard))
+                logger.info(f"Reply interrupted after {len(heard)} sentence(s)")
+            raise
+
+    async def run_turn(
+        self,
+        audio: AsyncIterator[bytes],
+        timeline: Optional[TurnTimeline] = None,
+        on_end_of_utterance: Optional[Callable[[], Awaitable[None]]] = None,
+        before_reply: Optional[asyncio.Task] = None,
+        on_speech: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> AsyncGenerator[SpeechEvent, None]:
+        """Run one user utterance through ASR, the agents and TTS.
+
+        audio: raw PCM for this utterance; it ends on VAD end-of-utterance or
+        when the source is exhausted (client STOP).
+        before_reply: previous turn, awaited before this one talks to the
+        agents so turns stay ordered while ASR for this one already runs.
+        on_speech: called once when ASR first recognizes text, i.e. the user
+        is really speaking (not noise); used to trigger barge-in.
+        """
+        timeline = timeline or TurnTimeline()
+        voice_totals["turns"] += 1
+        vad = VoiceActivityDetector(self.vad_config)
+        latest: Dict[str, Any] = {}
+        speculation: Optional[SpeculativeReply] = None
+        speculation_lock = asyncio.Lock()
+
+        async def drop_speculation() -> None:
+            nonlocal speculation
+            stale, speculation = speculation, None
+            if stale is not None:
+                voice_totals["speculation_misses"] += 1
+                await stale.cancel()
+
+        async def maybe_speculate() -> None:
+            # Pause and definite markers must agree, and the previous reply
+            # must be over so the speculative turn is the next one
+            nonlocal speculation
+            if not self.speculative or not vad.paused or not is_definite(latest):
+                return
+            if before_reply is not None and not before_reply.done():
+                return
+            async with speculation_lock:
+                partial = latest["text"].strip()
+                if speculation is not None and speculation.matches(partial):
+                    return
+                await drop_speculation()
+                timeline.mark("speculation_start")
+                voice_totals["speculations"] += 1
+                speculation = self.session.speculate_user_turn(partial)
+
+        async def gated_audio() -> AsyncGenerator[bytes, None]:
+            async for chunk in vad.filter(
+                audio, on_end_of_utterance=on_end_of_utterance, on_pause=maybe_speculate
+            ):
+                yield chunk
+            timeline.mark("speech_end")
+
+        try:
+            text = ""
+            async for resp, _ in self.asr.stream_asr_results(gated_audio()):
+                timeline.mark("asr_first_partial")
+                latest = resp["result"]
+                text = latest["text"]
+                if on_speech is not None and text.strip() and "speech_detected" not in timeline.marks:
+                    timeline.mark("speech_detected")
+                    await on_speech()
+                if speculation is not None and not speculation.matches(text):
+                    # The user kept talking: stop paying for a stale reply
+                    async with speculation_lock:
+                        await drop_speculation()
+                await maybe_speculate()
+                yield SpeechEvent(type="asr", data=text)
+            timeline.mark("speech_end")
+            timeline.mark("asr_final")
+
+            text = text.strip()
+            if not text:
+                logger.info("Voice turn produced no transcript; skipping reply")
+                voice_totals["empty_turns"] += 1
+                timeline.mark("done")
+                yield SpeechEvent(type="done", timings=timeline.summary())
+                return
+            yield SpeechEvent(type="transcript", data=text)
+
+            if before_reply is not None:
+                await asyncio.wait({before_reply})
+            timeline.mark("reply_start")
+
+            async with speculation_lock:
+                if speculation is not None and speculation.matches(text):
+                    voice_totals["speculation_hits"] += 1
+                    deltas = speculation.stream()
+                else:
+                    await drop_speculation()
+                    deltas = self.session.stream_user_turn(text)
+
+            pipeline = SentenceSpeechPipeline(self.tts, audio_format=self.audio_format)
+            reply = pipeline.run(deltas, start=timeline.start)
+            played = self._play_reply(reply)
+            try:
+                async for event in played:
+                    if event.type == "done":
+                        timeline.merge(event.timings)
+                        continue
+                    yield event
+            finally:
+                # Closing this generator does not close the inner ones
+                await played.aclose()
+        finally:
+            # A speculation never consumed by the pipeline is rolled back
+            if speculation is not None and not speculation.adopted:
+                await drop_speculation()
+
+        timeline.mark("done")
+        timings = timeline.summary()
+        logger.info(
+            "Voice turn finished: " + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items())
+        )
+        yield SpeechEvent(type="done", timings=timings)
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional
+
+ASR_ENCODINGS = ("full", "delta")
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    index = 0
+    while index < limit and a[index] == b[index]:
+        index += 1
+    return index
+
+
+def _utf16_len(text: str) -> int:
+    """Length of `text` in UTF-16 code units, the unit JS string offsets use."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _stable_prefix_len(text: str, utterances: List[Dict[str, Any]]) -> int:
+    """Length of `text` covered by the leading definite utterances."""
+    stable = ""
+    for utterance in utterances:
+        if not utterance.get("definite"):
+            break
+        stable += utterance.get("text", "")
+    return len(stable) if text.startswith(stable) else 0
+
+
+def is_definite(result: Dict[str, Any]) -> bool:
+    """Whether the whole transcript of an ASR result is in definite utterances."""
+    text = result.get("text", "")
+    return bool(text) and _stable_prefix_len(text, result.get("utterances") or []) == len(text)
+
+
+class ASRDeltaEncoder:
+    """Turns full vendor ASR results into compact per-connection deltas.
+
+    Each partial from the vendor repeats the whole transcript plus utterance
+    metadata; a delta only carries what the client has not seen yet:
+
+        {"type": "asr", "k": <chars of previous text kept>,
+         "t": <replacement suffix>, "s": <stable prefix length>, "f": true}
+
+    The client rebuilds the transcript as `text.slice(0, k) + t`; characters
+    before `s` belong to definite utterances and will not change again. "f"
+    is only present on the final result. `k` and `s` count UTF-16 code units
+    so they index JS strings correctly past non-BMP characters (emoji, rare
+    CJK); they always fall on a code point boundary.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.stable = 0
+        self.results_in = 0
+        self.deltas_out = 0
+
+    def encode(self, resp: Dict[str, Any], final: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the delta for a vendor response, or None if nothing changed."""
+        result = resp.get("result") or {}
+        text = result.get("text", "")
+        self.results_in += 1
+
+        keep = _common_prefix_len(self.text, text)
+        # The stable prefix never shrinks, even if the vendor re-segments
+        stable = max(self.stable, _stable_prefix_len(text, result.get("utterances") or []))
+        stable = min(stable, len(text))
+
+        if keep == len(self.text) == len(text) and stable == self.stable and not final:
+            return None
+
+        delta: Dict[str, Any] = {
+            "type": "asr",
+            "k": _utf16_len(text[:keep]),
+            "t": text[keep:],
+            "s": _utf16_len(text[:stable]),
+        }
+        if final:
+            delta["f"] = True
+
+        self.text = text
+        self.stable = stable
+        self.deltas_out += 1
+        return delta
@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+QUEUE_POLICIES = ("block", "drop_oldest", "abort")
+
+# Process-wide totals, exposed through GET /metrics
+audio_queue_totals: Dict[str, int] = {
+    "sessions": 0,
+    "high_water_bytes": 0,
+    "dropped_chunks": 0,
+    "dropped_bytes": 0,
+    "aborted_sessions": 0,
+}
+
+
+class AudioQueueOverflow(Exception):
+    """Raised by put() under the "abort" policy when the queue is full."""
+
+
+class BoundedAudioQueue:
+    """Byte-capped FIFO of audio chunks between the client and ASR upstream.
+
+    When `max_bytes` would be exceeded the policy decides:
+      block       -- put() waits for the consumer (backpressure on the client
+                     websocket reader)
+      drop_oldest -- discard the oldest buffered audio (ring buffer)
+      abort       -- raise AudioQueueOverflow so the session can be closed
+    """
+
+    def __init__(self, max_bytes: int = 320_000, policy: str = "drop_oldest"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown audio queue policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+
+        self._chunks: Deque[bytes] = deque()
+        self._bytes = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+        self.high_water_bytes = 0
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        audio_queue_totals["sessions"] += 1
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes
+
+    async def put(self, chunk: bytes) -> None:
+        """Enqueue a chunk, applying the overflow policy."""
+        async with self._cond:
+            if self._closed:
+                return
+
+            # Keep at least the newest chunk even if it alone exceeds the cap
+            while self._chunks and self._bytes + len(chunk) > self.max_bytes:
+                if self.policy == "block":
+                    await self._cond.wait()
+                    if self._closed:
+                        return
+                elif self.policy == "drop_oldest":
+                    dropped = self._chunks.popleft()
+                    self._bytes -= len(dropped)
+                    self.dropped_chunks += 1
+                    self.dropped_bytes += len(dropped)
+                    audio_queue_totals["dropped_chunks"] += 1
+                    audio_queue_totals["dropped_bytes"] += len(dropped)
+                else:
+                    audio_queue_totals["aborted_sessions"] += 1
+                    raise AudioQueueOverflow(
+                        f"Audio queue exceeded {self.max_bytes} bytes"
+                    )
+
+            self._chunks.append(chunk)
+            self._bytes += len(chunk)
+            if self._bytes > self.high_water_bytes:
+                self.high_water_bytes = self._bytes
+                if self._bytes > audio_queue_totals["high_water_bytes"]:
+                    audio_queue_totals["high_water_bytes"] = self._bytes
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[bytes]:
+        """Dequeue the next chunk; returns None once closed and drained."""
+        async with self._cond:
+            while not self._chunks and not self._closed:
+                await self._cond.wait()
+            if not self._chunks:
+                return None
+            chunk = self._chunks.popleft()
+            self._bytes -= len(chunk)
+            self._cond.notify_all()
+            return chunk
+
+    async def close(self, discard: bool = False) -> None:
+        """End the stream; pending chunks are still delivered unless discard."""
+        async with self._cond:
+            self._closed = True
+            if discard:
+                self._chunks.clear()
+                self._bytes = 0
+            self._cond.notify_all()
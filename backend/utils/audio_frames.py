@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+
+class PCMFrameAggregator:
+    """Coalesce small PCM chunks into fixed-duration segments.
+
+    The browser worklet posts one ~3 ms chunk per render quantum; forwarding
+    them 1:1 means hundreds of upstream frames per second. This aggregator
+    emits `segment_ms` segments instead and flushes a partial segment when the
+    oldest buffered byte has waited `max_latency_ms` (e.g. the client paused).
+    Segments are always cut on sample boundaries.
+    """
+
+    def __init__(
+        self,
+        segment_ms: int = 100,
+        max_latency_ms: Optional[int] = None,
+        sample_rate: int = 16000,
+        sample_width: int = 2,
+        channels: int = 1,
+    ):
+        self.frame_size = sample_width * channels
+        bytes_per_ms = sample_rate * self.frame_size / 1000
+        self.segment_bytes = max(
+            self.frame_size, int(bytes_per_ms * segment_ms) // self.frame_size * self.frame_size
+        )
+        self.max_latency = (
+            max_latency_ms if max_latency_ms is not None else segment_ms * 1.5
+        ) / 1000
+        self.chunks_in = 0
+        self.segments_out = 0
+
+    async def aggregate(
+        self, source: AsyncIterator[bytes]
+    ) -> AsyncGenerator[bytes, None]:
+        """Yield aggregated segments from an async iterator of PCM chunks."""
+        # A pump task feeds a queue so the flush timer can wait on queue.get()
+        # without cancelling the source generator itself. maxsize=1 keeps the
+        # pump from running ahead of the consumer, so a bounded source queue
+        # still sees backpressure when the upstream stalls.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async def pump():
+            try:
+                async for chunk in source:
+                    await queue.put(chunk)
+            except asyncio.CancelledError:
+                # The consumer is gone; putting the end marker could block
+                raise
+            except Exception:
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        pump_task = asyncio.create_task(pump())
+        buffer = bytearray()
+        first_byte_at = 0.0
+
+        try:
+            while True:
+                timeout = None
+                if buffer:
+                    timeout = max(0.0, first_byte_at + self.max_latency - time.monotonic())
+
+                try:
+                    chunk = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    segment = self._take(buffer, len(buffer))
+                    if segment:
+                        yield segment
+                    first_byte_at = time.monotonic()
+                    continue
+
+                if chunk is None:
+                    break
+                if not chunk:
+                    continue
+
+                self.chunks_in += 1
+                if not buffer:
+                    first_byte_at = time.monotonic()
+                buffer += chunk
+
+                while len(buffer) >= self.segment_bytes:
+                    yield self._take(buffer, self.segment_bytes)
+                    first_byte_at = time.monotonic()
+
+            if buffer:
+                # Flush the tail, including any odd trailing byte
+                self.segments_out += 1
+                yield bytes(buffer)
+
+            # Surface errors raised by the source
+            await pump_task
+        finally:
+            if not pump_task.done():
+                pump_task.cancel()
+                try:
+                    await pump_task
+                except asyncio.CancelledError:
+                    pass
+
+    def _take(self, buffer: bytearray, size: int) -> bytes:
+        size -= size % self.frame_size
+        if size <= 0:
+            return b""
+        segment = bytes(buffer[:size])
+        del buffer[:size]
+        self.segments_out += 1
+        return segment
@@ -0,0 +1,34 @@
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Process-wide registry of metric providers.
+
+    Components register a zero-argument callable returning a JSON-serializable
+    dict; `snapshot()` collects all of them (served by GET /metrics).
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        self._providers[name] = provider
+
+    def unregister(self, name: str) -> None:
+        self._providers.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        result = {}
+        for name, provider in list(self._providers.items()):
+            try:
+                result[name] = provider()
+            except Exception as e:
+                logger.error(f"Metrics provider '{name}' failed: {e}")
+                result[name] = {"error": str(e)}
+        return result
+
+
+registry = MetricsRegistry()
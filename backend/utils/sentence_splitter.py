@@ -0,0 +1,71 @@
+import re
+from typing import List, Optional
+
+# Sentence terminators. Chinese full-width punctuation always ends a sentence,
+# ASCII terminators only when followed by whitespace (avoids "3.14", "v1.8").
+_HARD_BREAK = re.compile(r"[。！？；!?;…]+[”’」』）)\"']*|\n+|[.](?=\s)")
+# Softer break points used only when a sentence grows past max_chars.
+_SOFT_BREAK = re.compile(r"[，、：,:]")
+
+
+class SentenceSplitter:
+    """Incrementally split streamed LLM text into speakable sentences.
+
+    Feed token deltas with `feed()`; complete sentences are returned as soon as
+    a terminator arrives. Call `flush()` at end of stream for the remainder.
+
+    Sentences shorter than `min_chars` are merged with the next one so that TTS
+    is not invoked for fragments like "好。". Sentences longer than `max_chars`
+    are cut at the last comma-like break point so synthesis can start early.
+    """
+
+    def __init__(self, min_chars: int = 4, max_chars: int = 80):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Append a text delta and return any sentences completed by it."""
+        if not delta:
+            return []
+        self._buffer += delta
+        sentences = []
+
+        while True:
+            sentence = self._next_sentence()
+            if sentence is None:
+                break
+            sentences.append(sentence)
+
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left in the buffer (end of stream)."""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+    def _next_sentence(self) -> Optional[str]:
+        search_from = 0
+        while True:
+            match = _HARD_BREAK.search(self._buffer, search_from)
+            if match is None:
+                break
+            end = match.end()
+            candidate = self._buffer[:end].strip()
+            if len(candidate) >= self.min_chars:
+                self._buffer = self._buffer[end:]
+                return candidate
+            search_from = end
+
+        if len(self._buffer) > self.max_chars:
+            cut = None
+            for match in _SOFT_BREAK.finditer(self._buffer, 0, self.max_chars):
+                cut = match.end()
+            if cut is None:
+                cut = self.max_chars
+            candidate = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            return candidate or None
+
+        return None
@@ -0,0 +1,192 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+VAD_MODES = ("off", "trim", "gate", "compress")
+
+# Process-wide totals, exposed through GET /metrics
+vad_totals: Dict[str, int] = {
+    "sessions": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "speech_frames": 0,
+    "silence_frames": 0,
+    "end_of_utterance": 0,
+}
+
+
+@dataclass
+class VADConfig:
+    """Voice activity detection settings (16 bit mono PCM)"""
+
+    # trim: drop leading silence only; gate: drop all silence outside the
+    # pre-roll/hangover window; compress: like gate, but every silence gap is
+    # replaced by `compressed_silence_ms` of digital silence so ASR still sees
+    # a pause for punctuation/segmentation.
+    mode: str = "compress"
+    sample_rate: int = 16000
+    frame_ms: int = 20
+    # A frame is speech if its RMS level exceeds energy_threshold_db (dBFS),
+    # or exceeds it minus weak_margin_db while having a fricative-like ZCR.
+    energy_threshold_db: float = -45.0
+    weak_margin_db: float = 10.0
+    zcr_threshold: float = 0.25
+    pre_roll_ms: int = 200
+    hangover_ms: int = 300
+    compressed_silence_ms: int = 100
+    # End the utterance after this much silence following speech (0 = off)
+    end_of_utterance_ms: int = 0
+    # Report a pause after this much silence following speech (0 = off);
+    # shorter than end_of_utterance_ms, used to start speculative replies
+    pause_ms: int = 0
+
+
+def classify_frames(samples: np.ndarray, config: VADConfig) -> np.ndarray:
+    """Vectorized speech/silence decision for whole frames of int16 samples.
+
+    `samples` length must be a multiple of the frame length.
+    """
+    frame_len = config.sample_rate * config.frame_ms // 1000
+    frames = samples.reshape(-1, frame_len).astype(np.float32)
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+
+    loud = db > config.energy_threshold_db
+    weak_fricative = (db > config.energy_threshold_db - config.weak_margin_db) & (
+        zcr > config.zcr_threshold
+    )
+    return loud | weak_fricative
+
+
+class VoiceActivityDetector:
+    """Streaming silence gate in front of the ASR uplink.
+
+    Feed raw PCM with `process()`; it returns the audio that should be sent
+    upstream and whether end-of-utterance was detected.
+    """
+
+    def __init__(self, config: Optional[VADConfig] = None):
+        self.config = config or VADConfig()
+        if self.config.mode not in VAD_MODES:
+            raise ValueError(f"Unknown VAD mode: {self.config.mode}")
+
+        cfg = self.config
+        self.frame_bytes = cfg.sample_rate * cfg.frame_ms // 1000 * 2
+        self.pre_roll_frames = cfg.pre_roll_ms // cfg.frame_ms
+        self.hangover_frames = cfg.hangover_ms // cfg.frame_ms
+        self.eou_frames = cfg.end_of_utterance_ms // cfg.frame_ms
+        self.pause_frames = cfg.pause_ms // cfg.frame_ms
+        self.compressed_silence = b"\x00" * (
+            cfg.sample_rate * cfg.compressed_silence_ms // 1000 * 2
+        )
+
+        self._remainder = b""
+        self._pre_roll: deque = deque(maxlen=self.pre_roll_frames)
+        self._silence_run = 0
+        self._gap_marked = False
+        self.heard_speech = False
+        self.paused = False
+        self.end_of_utterance = False
+        self.stats = {
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "speech_frames": 0,
+            "silence_frames": 0,
+        }
+
+    def process(self, chunk: bytes) -> Tuple[bytes, bool]:
+        """Return (audio to forward, end_of_utterance)."""
+        self.stats["bytes_in"] += len(chunk)
+        if self.config.mode == "off" or self.end_of_utterance:
+            out = b"" if self.end_of_utterance else chunk
+            self.stats["bytes_out"] += len(out)
+            return out, self.end_of_utterance
+
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b"", False
+
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        is_speech = classify_frames(samples, self.config)
+
+        out = bytearray()
+        for index, speech in enumerate(is_speech.tolist()):
+            frame = data[index * self.frame_bytes : (index + 1) * self.frame_bytes]
+            self._handle_frame(frame, speech, out)
+            if self.end_of_utterance:
+                break
+
+        self.stats["bytes_out"] += len(out)
+        return bytes(out), self.end_of_utterance
+
+    def _handle_frame(self, frame: bytes, speech: bool, out: bytearray) -> None:
+        mode = self.config.mode
+
+        if speech:
+            self.stats["speech_frames"] += 1
+            if self._pre_roll:
+                out += b"".join(self._pre_roll)
+                self._pre_roll.clear()
+            out += frame
+            self.heard_speech = True
+            self.paused = False
+            self._silence_run = 0
+            self._gap_marked = False
+            return
+
+        self.stats["silence_frames"] += 1
+        self._silence_run += 1
+        if self.heard_speech and self.pause_frames and self._silence_run >= self.pause_frames:
+            self.paused = True
+
+        if self.heard_speech and self.eou_frames and self._silence_run >= self.eou_frames:
+            self.end_of_utterance = True
+            return
+
+        if mode == "trim" and self.heard_speech:
+            out += frame
+        elif self.heard_speech and self._silence_run <= self.hangover_frames:
+            out += frame
+        else:
+            if mode == "compress" and self.heard_speech and not self._gap_marked:
+                out += self.compressed_silence
+                self._gap_marked = True
+            self._pre_roll.append(frame)
+
+    async def filter(
+        self,
+        source: AsyncIterator[bytes],
+        on_end_of_utterance: Optional[Callable[[], Awaitable[None]]] = None,
+        on_pause: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """Gate an async PCM stream.
+
+        On end-of-utterance the stream ends, which makes stream_asr send the
+        LastNoSeq frame and the server return its final result. `on_pause`
+        is awaited each time a pause of `pause_ms` begins.
+        """
+        vad_totals["sessions"] += 1
+        try:
+            async for chunk in source:
+                was_paused = self.paused
+                out, done = self.process(chunk)
+                if out:
+                    yield out
+                if self.paused and not was_paused and not done and on_pause is not None:
+                    await on_pause()
+                if done:
+                    vad_totals["end_of_utterance"] += 1
+                    if on_end_of_utterance is not None:
+                        await on_end_of_utterance()
+                    break
+        finally:
+            for key, value in self.stats.items():
+                vad_totals[key] += value
@@ -1,9 +1,12 @@
+import gzip
 import io
 import logging
+import os
 import struct
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import Callable, List
+from typing import Any, Callable, Dict, List, Optional
 
 import websockets
 
@@ -150,6 +153,58 @@ class EventType(IntEnum):
         return self.name if self.name else f"EventType({self.value})"
 
 
+# --- Payload compression -------------------------------------------------------
+# Message.payload always holds the uncompressed bytes; the codec registered for
+# the message's CompressionBits is applied on marshal and undone on unmarshal.
+
+# Level 1 saves ~as much as 6-9 on JSON at a fraction of the CPU (see
+# benchmarks/bench_volc_gzip.py)
+GZIP_LEVEL = int(os.getenv("VOLC_PROTOCOL_GZIP_LEVEL", "1"))
+
+
+@dataclass(frozen=True)
+class PayloadCodec:
+    """Compress/decompress pair for one CompressionBits value"""
+
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _gzip_compress(data: bytes) -> bytes:
+    # mtime=0 keeps the output deterministic for identical payloads
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+PAYLOAD_CODECS: Dict[CompressionBits, PayloadCodec] = {
+    CompressionBits.Gzip: PayloadCodec(_gzip_compress, gzip.decompress),
+}
+
+
+def register_payload_codec(compression: CompressionBits, codec: PayloadCodec) -> None:
+    """Install a codec, e.g. for the CompressionBits.Custom slot"""
+    if compression == CompressionBits.None_:
+        raise ValueError("CompressionBits.None_ cannot have a codec")
+    PAYLOAD_CODECS[compression] = codec
+
+
+def _compress_payload(compression: CompressionBits, payload: bytes) -> bytes:
+    if compression == CompressionBits.None_ or not payload:
+        return payload
+    codec = PAYLOAD_CODECS.get(compression)
+    if codec is None:
+        raise ValueError(f"No payload codec registered for {compression!r}")
+    return codec.compress(payload)
+
+
+def _decompress_payload(compression: CompressionBits, payload: bytes) -> bytes:
+    if compression == CompressionBits.None_ or not payload:
+        return payload
+    codec = PAYLOAD_CODECS.get(compression)
+    if codec is None:
+        raise ValueError(f"No payload codec registered for {compression!r}")
+    return codec.decompress(payload)
+
+
 @dataclass
 class Message:
     """Message object
@@ -347,12 +402,13 @@ class Message:
 
     def _write_payload(self, buffer: io.BytesIO) -> None:
         """Write payload"""
-        size = len(self.payload)
+        payload = _compress_payload(self.compression, self.payload)
+        size = len(payload)
         if size > 0xFFFFFFFF:
             raise ValueError(f"Payload size ({size}) exceeds max(uint32)")
 
         buffer.write(struct.pack(">I", size))
-        buffer.write(self.payload)
+        buffer.write(payload)
 
     def _read_event(self, buffer: io.BytesIO) -> None:
         """Read event"""
@@ -410,7 +466,7 @@ class Message:
         if size_bytes:
             size = struct.unpack(">I", size_bytes)[0]
             if size > 0:
-                self.payload = buffer.read(size)
+                self.payload = _decompress_payload(self.compression, buffer.read(size))
 
     def __str__(self) -> str:
         """String representation"""
@@ -419,22 +475,355 @@ class Message:
                 return f"MsgType: {self.type}, EventType:{self.event}, Sequence: {self.sequence}, PayloadSize: {len(self.payload)}"
             return f"MsgType: {self.type}, EventType:{self.event}, PayloadSize: {len(self.payload)}"
         elif self.type == MsgType.Error:
-            return f"MsgType: {self.type}, EventType:{self.event}, ErrorCode: {self.error_code}, Payload: {self.payload.decode('utf-8', 'ignore')}"
+            return f"MsgType: {self.type}, EventType:{self.event}, ErrorCode: {self.error_code}, Payload: {bytes(self.payload).decode('utf-8', 'ignore')}"
         else:
             if self.flag in [MsgTypeFlagBits.PositiveSeq, MsgTypeFlagBits.NegativeSeq]:
-                return f"MsgType: {self.type}, EventType:{self.event}, Sequence: {self.sequence}, Payload: {self.payload.decode('utf-8', 'ignore')}"
-            return f"MsgType: {self.type}, EventType:{self.event}, Payload: {self.payload.decode('utf-8', 'ignore')}"
+                return f"MsgType: {self.type}, EventType:{self.event}, Sequence: {self.sequence}, Payload: {bytes(self.payload).decode('utf-8', 'ignore')}"
+            return f"MsgType: {self.type}, EventType:{self.event}, Payload: {bytes(self.payload).decode('utf-8', 'ignore')}"
+
+
+# --- Fast codec -------------------------------------------------------------
+# Same wire format as Message.marshal/unmarshal, but with precompiled Structs,
+# one preallocated buffer per frame and no per-message reader/writer lists.
+
+_I32 = struct.Struct(">i")
+_U32 = struct.Struct(">I")
+
+
+def _enum_table(enum_cls) -> dict:
+    # Dict lookup is several times cheaper than calling the IntEnum
+    return {member.value: member for member in enum_cls}
+
+
+_VERSIONS = _enum_table(VersionBits)
+_HEADER_SIZES = _enum_table(HeaderSizeBits)
+_MSG_TYPES = _enum_table(MsgType)
+_FLAGS = _enum_table(MsgTypeFlagBits)
+_SERIALIZATIONS = _enum_table(SerializationBits)
+_COMPRESSIONS = _enum_table(CompressionBits)
+_EVENTS = _enum_table(EventType)
+
+_DATA_MSG_TYPES = frozenset(
+    [
+        MsgType.FullClientRequest,
+        MsgType.FullServerResponse,
+        MsgType.FrontEndResultServer,
+        MsgType.AudioOnlyClient,
+        MsgType.AudioOnlyServer,
+    ]
+)
+_SEQ_FLAGS = frozenset([MsgTypeFlagBits.PositiveSeq, MsgTypeFlagBits.NegativeSeq])
+# Events whose frames carry no session id (writer and reader sides differ)
+_NO_SESSION_ID_WRITE = frozenset(
+    [
+        EventType.StartConnection,
+        EventType.FinishConnection,
+        EventType.ConnectionStarted,
+        EventType.ConnectionFailed,
+    ]
+)
+_NO_SESSION_ID_READ = _NO_SESSION_ID_WRITE | {EventType.ConnectionFinished}
+_CONNECT_ID_EVENTS = frozenset(
+    [
+        EventType.ConnectionStarted,
+        EventType.ConnectionFailed,
+        EventType.ConnectionFinished,
+    ]
+)
+
+
+def encode_message(msg: Message) -> bytearray:
+    """Serialize a message into a single preallocated buffer.
+
+    Byte-for-byte identical to `msg.marshal()` (including payload
+    compression). The returned bytearray can be passed to `websocket.send`
+    directly.
+    """
+    if msg.type in _DATA_MSG_TYPES:
+        has_seq = msg.flag in _SEQ_FLAGS
+        has_error_code = False
+    elif msg.type == MsgType.Error:
+        has_seq = False
+        has_error_code = True
+    else:
+        raise ValueError(f"Unsupported message type: {msg.type}")
+
+    with_event = msg.flag == MsgTypeFlagBits.WithEvent
+    session_id = b""
+    write_session_id = with_event and msg.event not in _NO_SESSION_ID_WRITE
+    if write_session_id:
+        session_id = msg.session_id.encode("utf-8")
+        if len(session_id) > 0xFFFFFFFF:
+            raise ValueError(f"Session ID size ({len(session_id)}) exceeds max(uint32)")
+
+    payload = _compress_payload(msg.compression, msg.payload)
+    payload_size = len(payload)
+    if payload_size > 0xFFFFFFFF:
+        raise ValueError(f"Payload size ({payload_size}) exceeds max(uint32)")
+
+    header_size = 4 * msg.header_size
+    size = header_size + 4 + payload_size
+    if with_event:
+        size += 4
+        if write_session_id:
+            size += 4 + len(session_id)
+    if has_seq or has_error_code:
+        size += 4
+
+    buffer = bytearray(size)
+    buffer[0] = (msg.version << 4) | msg.header_size
+    buffer[1] = (msg.type << 4) | msg.flag
+    buffer[2] = (msg.serialization << 4) | msg.compression
+    offset = header_size
+
+    if with_event:
+        _I32.pack_into(buffer, offset, msg.event)
+        offset += 4
+        if write_session_id:
+            _U32.pack_into(buffer, offset, len(session_id))
+            offset += 4
+            buffer[offset : offset + len(session_id)] = session_id
+            offset += len(session_id)
+
+    if has_seq:
+        _I32.pack_into(buffer, offset, msg.sequence)
+        offset += 4
+    elif has_error_code:
+        _U32.pack_into(buffer, offset, msg.error_code)
+        offset += 4
+
+    _U32.pack_into(buffer, offset, payload_size)
+    offset += 4
+    buffer[offset:] = payload
+    return buffer
+
+
+def decode_message(data: bytes, zero_copy: bool = True) -> Message:
+    """Deserialize a frame with `unpack_from` over a memoryview.
+
+    With zero_copy=True the payload is a memoryview slice of `data` (valid as
+    long as `data` is alive); pass zero_copy=False to get bytes instead.
+    Compressed payloads are always returned as fresh decompressed bytes.
+    Unlike `Message.unmarshal`, truncated frames always raise ValueError.
+    """
+    view = memoryview(data)
+    total = len(view)
+    if total < 3:
+        raise ValueError(f"Data too short: expected at least 3 bytes, got {total}")
+
+    version_and_header_size = view[0]
+    type_and_flag = view[1]
+    serialization_compression = view[2]
+    try:
+        msg = Message(
+            _VERSIONS[version_and_header_size >> 4],
+            _HEADER_SIZES[version_and_header_size & 0b00001111],
+            _MSG_TYPES[type_and_flag >> 4],
+            _FLAGS[type_and_flag & 0b00001111],
+            _SERIALIZATIONS[serialization_compression >> 4],
+            _COMPRESSIONS[serialization_compression & 0b00001111],
+        )
+    except KeyError as e:
+        raise ValueError(f"Invalid header field value: {e}") from e
+    offset = 4 * msg.header_size
+
+    try:
+        if msg.type in _DATA_MSG_TYPES:
+            if msg.flag in _SEQ_FLAGS:
+                msg.sequence = _I32.unpack_from(view, offset)[0]
+                offset += 4
+        elif msg.type == MsgType.Error:
+            msg.error_code = _U32.unpack_from(view, offset)[0]
+            offset += 4
+        else:
+            raise ValueError(f"Unsupported message type: {msg.type}")
+
+        if msg.flag == MsgTypeFlagBits.WithEvent:
+            event = _I32.unpack_from(view, offset)[0]
+            if event not in _EVENTS:
+                raise ValueError(f"{event} is not a valid EventType")
+            msg.event = _EVENTS[event]
+            offset += 4
+            if msg.event not in _NO_SESSION_ID_READ:
+                size = _U32.unpack_from(view, offset)[0]
+                offset += 4
+                if size:
+                    msg.session_id = str(view[offset : offset + size], "utf-8")
+                    offset += size
+            if msg.event in _CONNECT_ID_EVENTS:
+                size = _U32.unpack_from(view, offset)[0]
+                offset += 4
+                if size:
+                    msg.connect_id = str(view[offset : offset + size], "utf-8")
+                    offset += size
+
+        size = _U32.unpack_from(view, offset)[0]
+        offset += 4
+    except struct.error as e:
+        raise ValueError(f"Truncated message: {e}") from e
+
+    end = offset + size
+    if end > total:
+        raise ValueError(f"Truncated payload: expected {size} bytes, got {total - offset}")
+    if end < total:
+        raise ValueError(f"Unexpected data after message: {bytes(view[end:])}")
+    if size:
+        if msg.compression != CompressionBits.None_:
+            msg.payload = _decompress_payload(msg.compression, view[offset:end])
+        else:
+            msg.payload = view[offset:end] if zero_copy else bytes(view[offset:end])
+    return msg
+
 
+# --- Trace & metrics ----------------------------------------------------------
+# Frames are traced at DEBUG only, and audio frames only every Nth one, so the
+# f-string / payload decode in Message.__str__ never runs on the hot path.
 
-async def receive_message(websocket: websockets.WebSocketClientProtocol) -> Message:
-    """Receive message from websocket"""
+TRACE_SAMPLE_EVERY = int(os.getenv("VOLC_PROTOCOL_TRACE_SAMPLE", "100"))
+
+_AUDIO_MSG_TYPES = frozenset([MsgType.AudioOnlyClient, MsgType.AudioOnlyServer])
+
+
+@dataclass
+class ProtocolStats:
+    """Per-session frame counters"""
+
+    kind: str = "unknown"
+    frames_sent: int = 0
+    bytes_sent: int = 0
+    frames_received: int = 0
+    bytes_received: int = 0
+    encode_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_received": self.frames_received,
+            "bytes_received": self.bytes_received,
+            "encode_ms": round(self.encode_seconds * 1000, 3),
+            "decode_ms": round(self.decode_seconds * 1000, 3),
+            "age_s": round(time.monotonic() - self.started_at, 3),
+        }
+
+
+class ProtocolMetrics:
+    """Aggregates ProtocolStats of active and finished sessions"""
+
+    _COUNTERS = (
+        "frames_sent",
+        "bytes_sent",
+        "frames_received",
+        "bytes_received",
+        "encode_seconds",
+        "decode_seconds",
+    )
+
+    def __init__(self):
+        self._active: Dict[int, ProtocolStats] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._sessions: Dict[str, int] = {}
+        # Fallback counter for trace sampling when no session stats are given
+        self.untracked_frames = 0
+
+    def open_session(self, kind: str) -> ProtocolStats:
+        stats = ProtocolStats(kind=kind)
+        self._active[id(stats)] = stats
+        return stats
+
+    def close_session(self, stats: ProtocolStats) -> None:
+        if self._active.pop(id(stats), None) is None:
+            return
+        totals = self._totals.setdefault(stats.kind, dict.fromkeys(self._COUNTERS, 0))
+        for name in self._COUNTERS:
+            totals[name] += getattr(stats, name)
+        self._sessions[stats.kind] = self._sessions.get(stats.kind, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        totals: Dict[str, Dict[str, float]] = {
+            kind: dict(values) for kind, values in self._totals.items()
+        }
+        active_counts: Dict[str, int] = {}
+        for stats in self._active.values():
+            kind_totals = totals.setdefault(stats.kind, dict.fromkeys(self._COUNTERS, 0))
+            for name in self._COUNTERS:
+                kind_totals[name] += getattr(stats, name)
+            active_counts[stats.kind] = active_counts.get(stats.kind, 0) + 1
+
+        return {
+            kind: {
+                "active_sessions": active_counts.get(kind, 0),
+                "finished_sessions": self._sessions.get(kind, 0),
+                "frames_sent": values["frames_sent"],
+                "bytes_sent": values["bytes_sent"],
+                "frames_received": values["frames_received"],
+                "bytes_received": values["bytes_received"],
+                "encode_ms": round(values["encode_seconds"] * 1000, 3),
+                "decode_ms": round(values["decode_seconds"] * 1000, 3),
+            }
+            for kind, values in totals.items()
+        }
+
+
+protocol_metrics = ProtocolMetrics()
+
+
+def _trace(direction: str, msg: Message, frame_index: int) -> None:
+    """Log a frame at DEBUG; audio frames are sampled."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if msg.type in _AUDIO_MSG_TYPES and frame_index % TRACE_SAMPLE_EVERY:
+        return
+    logger.debug("%s #%d: %s", direction, frame_index, msg)
+
+
+async def _send(
+    websocket: websockets.WebSocketClientProtocol,
+    msg: Message,
+    stats: Optional[ProtocolStats],
+) -> None:
+    if stats is None:
+        protocol_metrics.untracked_frames += 1
+        data = encode_message(msg)
+        _trace("Sending", msg, protocol_metrics.untracked_frames)
+    else:
+        start = time.perf_counter()
+        data = encode_message(msg)
+        stats.encode_seconds += time.perf_counter() - start
+        stats.frames_sent += 1
+        stats.bytes_sent += len(data)
+        _trace("Sending", msg, stats.frames_sent)
+    await websocket.send(data)
+
+
+async def receive_message(
+    websocket: websockets.WebSocketClientProtocol,
+    zero_copy: bool = False,
+    stats: Optional[ProtocolStats] = None,
+) -> Message:
+    """Receive message from websocket
+
+    zero_copy=True returns the payload as a memoryview into the received frame.
+    """
     try:
         data = await websocket.recv()
         if isinstance(data, str):
             raise ValueError(f"Unexpected text message: {data}")
         elif isinstance(data, bytes):
-            msg = Message.from_bytes(data)
-            logger.info(f"Received: {msg}")
+            if stats is None:
+                msg = decode_message(data, zero_copy=zero_copy)
+                protocol_metrics.untracked_frames += 1
+                _trace("Received", msg, protocol_metrics.untracked_frames)
+            else:
+                start = time.perf_counter()
+                msg = decode_message(data, zero_copy=zero_copy)
+                stats.decode_seconds += time.perf_counter() - start
+                stats.frames_received += 1
+                stats.bytes_received += len(data)
+                _trace("Received", msg, stats.frames_received)
             return msg
         else:
             raise ValueError(f"Unexpected message type: {type(data)}")
@@ -447,10 +836,11 @@ async def wait_for_event(
     websocket: websockets.WebSocketClientProtocol,
     msg_type: MsgType,
     event_type: EventType,
+    stats: Optional[ProtocolStats] = None,
 ) -> Message:
     """Wait for specific event"""
     while True:
-        msg = await receive_message(websocket)
+        msg = await receive_message(websocket, stats=stats)
         if msg.type != msg_type or msg.event != event_type:
             raise ValueError(f"Unexpected message: {msg}")
         if msg.type == msg_type and msg.event == event_type:
@@ -458,86 +848,115 @@ async def wait_for_event(
 
 
 async def full_client_request(
-    websocket: websockets.WebSocketClientProtocol, payload: bytes
+    websocket: websockets.WebSocketClientProtocol,
+    payload: bytes,
+    stats: Optional[ProtocolStats] = None,
+    compression: CompressionBits = CompressionBits.None_,
 ) -> None:
     """Send full client message"""
-    msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.NoSeq)
+    msg = Message(
+        type=MsgType.FullClientRequest,
+        flag=MsgTypeFlagBits.NoSeq,
+        compression=compression,
+    )
     msg.payload = payload
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
 async def audio_only_client(
-    websocket: websockets.WebSocketClientProtocol, payload: bytes, flag: MsgTypeFlagBits
+    websocket: websockets.WebSocketClientProtocol,
+    payload: bytes,
+    flag: MsgTypeFlagBits,
+    stats: Optional[ProtocolStats] = None,
+    compression: CompressionBits = CompressionBits.None_,
 ) -> None:
     """Send audio-only client message"""
-    msg = Message(type=MsgType.AudioOnlyClient, flag=flag)
+    msg = Message(type=MsgType.AudioOnlyClient, flag=flag, compression=compression)
     msg.payload = payload
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
-async def start_connection(websocket: websockets.WebSocketClientProtocol) -> None:
+async def start_connection(
+    websocket: websockets.WebSocketClientProtocol,
+    stats: Optional[ProtocolStats] = None,
+) -> None:
     """Start connection"""
     msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
     msg.event = EventType.StartConnection
     msg.payload = b"{}"
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
-async def finish_connection(websocket: websockets.WebSocketClientProtocol) -> None:
+async def finish_connection(
+    websocket: websockets.WebSocketClientProtocol,
+    stats: Optional[ProtocolStats] = None,
+) -> None:
     """Finish connection"""
     msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
     msg.event = EventType.FinishConnection
     msg.payload = b"{}"
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
 async def start_session(
-    websocket: websockets.WebSocketClientProtocol, payload: bytes, session_id: str
+    websocket: websockets.WebSocketClientProtocol,
+    payload: bytes,
+    session_id: str,
+    stats: Optional[ProtocolStats] = None,
+    compression: CompressionBits = CompressionBits.None_,
 ) -> None:
     """Start session"""
-    msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
+    msg = Message(
+        type=MsgType.FullClientRequest,
+        flag=MsgTypeFlagBits.WithEvent,
+        compression=compression,
+    )
     msg.event = EventType.StartSession
     msg.session_id = session_id
     msg.payload = payload
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
 async def finish_session(
-    websocket: websockets.WebSocketClientProtocol, session_id: str
+    websocket: websockets.WebSocketClientProtocol,
+    session_id: str,
+    stats: Optional[ProtocolStats] = None,
 ) -> None:
     """Finish session"""
     msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
     msg.event = EventType.FinishSession
     msg.session_id = session_id
     msg.payload = b"{}"
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
 async def cancel_session(
-    websocket: websockets.WebSocketClientProtocol, session_id: str
+    websocket: websockets.WebSocketClientProtocol,
+    session_id: str,
+    stats: Optional[ProtocolStats] = None,
 ) -> None:
     """Cancel session"""
     msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
     msg.event = EventType.CancelSession
     msg.session_id = session_id
     msg.payload = b"{}"
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
 
 
 async def task_request(
-    websocket: websockets.WebSocketClientProtocol, payload: bytes, session_id: str
+    websocket: websockets.WebSocketClientProtocol,
+    payload: bytes,
+    session_id: str,
+    stats: Optional[ProtocolStats] = None,
+    compression: CompressionBits = CompressionBits.None_,
 ) -> None:
     """Send task request"""
-    msg = Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent)
+    msg = Message(
+        type=MsgType.FullClientRequest,
+        flag=MsgTypeFlagBits.WithEvent,
+        compression=compression,
+    )
     msg.event = EventType.TaskRequest
     msg.session_id = session_id
     msg.payload = payload
-    logger.info(f"Sending: {msg}")
-    await websocket.send(msg.marshal())
+    await _send(websocket, msg, stats)
@@ -0,0 +1,67 @@
+"""
+Benchmark: per-turn Interviewer input tokens over a long interview.
+
+Replays a synthetic 60-turn session through InterviewerAgent (with a fake
+LLM) and prints estimated prompt tokens per turn for three context modes:
+
+  full       -- whole history every turn (behaviour before token windowing)
+  budget     -- token-budgeted window only, summary used for evicted turns
+  summary    -- compaction: summarized turns are replaced by the summary
+
+The summary is refreshed every SUMMARY_INTERVAL turns, as in main.py.
+
+Usage: python benchmarks/bench_context_compaction.py [turns]
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.interviewer_agent import InterviewerAgent
+from utils.llm_client import LLMClient
+from utils.tokens import estimate_tokens
+
+SUMMARY_INTERVAL = 3
+USER_TURN = "我平时主要拍城市夜景和人像，想把作品按主题整理出来，让朋友点开链接就能看到，还希望有一点互动感。"
+ASSISTANT_TURN = "明白了，你希望作品集既能按主题浏览，又有轻量的互动。那你更看重手机上看的效果，还是电脑上？"
+# 约 300 字的摘要，长度基本不随会话增长（由 SummaryAgent 滚动合并）
+SUMMARY = "用户是业余摄影师，主要拍摄城市夜景与人像，希望做一个按主题整理的作品集网站，" * 8
+
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+async def run(mode: str, turns: int):
+    llm = MagicMock(spec=LLMClient)
+    llm.chat_completion = AsyncMock(return_value=ASSISTANT_TURN)
+    budget = 10 ** 9 if mode == "full" else 2000
+    agent = InterviewerAgent(llm_client=llm, context_tokens=budget)
+
+    per_turn = []
+    for turn in range(1, turns + 1):
+        await agent.generate_reply(user_input=f"{USER_TURN}（第{turn}轮）", system_notice="Ask one question.")
+        per_turn.append(prompt_tokens(llm.chat_completion.call_args.kwargs["messages"]))
+
+        if mode != "full" and turn % SUMMARY_INTERVAL == 0:
+            covered = len(agent.get_visible_history())
+            agent.set_summary(SUMMARY, covered if mode == "summary" else 0)
+    return per_turn
+
+
+async def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    results = {mode: await run(mode, turns) for mode in ("full", "budget", "summary")}
+
+    print(f"{'turn':>5} {'full':>8} {'budget':>8} {'summary':>8}")
+    for turn in list(range(0, turns, 5)) + [turns - 1]:
+        row = " ".join(f"{results[mode][turn]:>8}" for mode in results)
+        print(f"{turn + 1:>5} {row}")
+    for mode, per_turn in results.items():
+        print(f"{mode:>8}: total {sum(per_turn)} tokens, last turn {per_turn[-1]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
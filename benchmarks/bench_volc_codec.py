@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: Message.marshal/from_bytes vs encode_message/decode_message.
+
+Usage: python benchmarks/bench_volc_codec.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.volc_protocol import (
+    EventType,
+    Message,
+    MsgType,
+    MsgTypeFlagBits,
+    decode_message,
+    encode_message,
+)
+
+# 100 ms of 16 kHz / 16 bit mono PCM, the typical uplink frame
+AUDIO_FRAME = Message(type=MsgType.AudioOnlyClient, flag=MsgTypeFlagBits.NoSeq, payload=b"\x00\x01" * 1600)
+# TTS downlink audio chunk with event + session id
+TTS_FRAME = Message(
+    type=MsgType.AudioOnlyServer,
+    flag=MsgTypeFlagBits.WithEvent,
+    event=EventType.TTSResponse,
+    session_id="0b5c4a3e-5a6f-4a57-9b0e-6f0c1e7d2a11",
+    payload=b"\x00" * 4800,
+)
+
+
+def bench(name, func, iterations):
+    seconds = timeit.timeit(func, number=iterations)
+    per_op_us = seconds / iterations * 1e6
+    print(f"{name:<40} {per_op_us:8.2f} us/op  {iterations / seconds:12,.0f} ops/s")
+    return per_op_us
+
+
+def main(iterations: int = 200_000):
+    for label, msg in [("audio uplink", AUDIO_FRAME), ("tts downlink", TTS_FRAME)]:
+        data = msg.marshal()
+        assert bytes(encode_message(msg)) == data
+        assert decode_message(data, zero_copy=False) == Message.from_bytes(data)
+
+        print(f"--- {label} ({len(data)} bytes) ---")
+        ref_enc = bench("Message.marshal", msg.marshal, iterations)
+        fast_enc = bench("encode_message", lambda: encode_message(msg), iterations)
+        ref_dec = bench("Message.from_bytes", lambda: Message.from_bytes(data), iterations)
+        fast_dec = bench("decode_message (copy)", lambda: decode_message(data, zero_copy=False), iterations)
+        zc_dec = bench("decode_message (zero-copy)", lambda: decode_message(data), iterations)
+        print(
+            f"speedup: encode x{ref_enc / fast_enc:.2f}, "
+            f"decode x{ref_dec / fast_dec:.2f} (copy) / x{ref_dec / zc_dec:.2f} (zero-copy)\n"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,93 @@
+"""
+Benchmark: gzip payload compression in the Volcengine protocol codec.
+
+Shows bytes saved vs. CPU cost per frame for typical JSON payloads
+(ASR partial results, long TTS requests) and, for reference, raw PCM.
+
+Usage: python benchmarks/bench_volc_gzip.py [iterations]
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils import volc_protocol
+from backend.utils.volc_protocol import (
+    CompressionBits,
+    Message,
+    MsgType,
+    MsgTypeFlagBits,
+    decode_message,
+    encode_message,
+)
+
+
+def asr_result_payload(utterances: int) -> bytes:
+    text = "我想做一个可以拖拽的作品集网站，主要放摄影作品，希望有漂浮的光点效果。"
+    resp = {
+        "audio_info": {"duration": 1000 * utterances},
+        "result": {
+            "text": text * utterances,
+            "utterances": [
+                {
+                    "definite": i < utterances - 1,
+                    "start_time": i * 1000,
+                    "end_time": i * 1000 + 900,
+                    "text": text,
+                    "words": [
+                        {"text": ch, "start_time": i * 1000 + j * 25, "end_time": i * 1000 + j * 25 + 20}
+                        for j, ch in enumerate(text)
+                    ],
+                }
+                for i in range(utterances)
+            ],
+        },
+    }
+    return json.dumps(resp, ensure_ascii=False).encode()
+
+
+def tts_request_payload(chars: int) -> bytes:
+    text = ("你好，我是 Maia。很高兴见到你，我们来聊聊你的想法。" * 50)[:chars]
+    return json.dumps({"req_params": {"speaker": "zh_male_m191_uranus_bigtts", "text": text}}, ensure_ascii=False).encode()
+
+
+def pcm_payload(ms: int) -> bytes:
+    rng = random.Random(0)
+    return bytes(rng.getrandbits(8) for _ in range(32 * ms))
+
+
+CASES = [
+    ("ASR partial (1 utterance)", MsgType.FullServerResponse, asr_result_payload(1)),
+    ("ASR partial (10 utterances)", MsgType.FullServerResponse, asr_result_payload(10)),
+    ("TTS request (200 chars)", MsgType.FullClientRequest, tts_request_payload(200)),
+    ("TTS request (1000 chars)", MsgType.FullClientRequest, tts_request_payload(1000)),
+    ("PCM audio (100 ms)", MsgType.AudioOnlyClient, pcm_payload(100)),
+]
+
+
+def main(iterations: int = 2000):
+    print(f"{'payload':<30}{'level':>6}{'raw B':>9}{'wire B':>9}{'saved':>8}{'enc us':>9}{'dec us':>9}")
+    for label, msg_type, payload in CASES:
+        for level in (None, 1, 6, 9):
+            compression = CompressionBits.None_ if level is None else CompressionBits.Gzip
+            if level is not None:
+                volc_protocol.GZIP_LEVEL = level
+            msg = Message(type=msg_type, flag=MsgTypeFlagBits.NoSeq, compression=compression, payload=payload)
+            data = bytes(encode_message(msg))
+            assert decode_message(data).payload == payload
+
+            enc = timeit.timeit(lambda: encode_message(msg), number=iterations) / iterations * 1e6
+            dec = timeit.timeit(lambda: decode_message(data), number=iterations) / iterations * 1e6
+            saved = 1 - len(data) / (len(payload) + 8)
+            print(
+                f"{label:<30}{'-' if level is None else level:>6}{len(payload):>9}{len(data):>9}"
+                f"{saved:>8.0%}{enc:>9.1f}{dec:>9.1f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -75,7 +75,8 @@ function App() {
         playerRef.current.init()
 
         // Init ASR WebSocket
-        const asrWs = new WebSocket("ws://localhost:8000/ws/asr")
+        const asrWs = new WebSocket("ws://localhost:8000/ws/asr?encoding=delta")
+        let asrTranscript = ""
         asrWsRef.current = asrWs
         asrWs.binaryType = "arraybuffer" // Although we receive text results mostly
 
@@ -98,8 +99,12 @@ function App() {
            // We expect text results (JSON strings)
            try {
                const data = JSON.parse(event.data)
-               // Format: { result: { text: "...", utterances: [...] } }
-               if (data.result && data.result.text) {
+               // Delta format: { type: "asr", k: <kept UTF-16 units>, t: "<suffix>", s: <stable UTF-16 units>, f?: true }
+               if (data.type === "asr") {
+                   asrTranscript = asrTranscript.slice(0, data.k) + data.t
+                   setAsrText(asrTranscript)
+               } else if (data.result && data.result.text) {
+                   // Full format: { result: { text: "...", utterances: [...] } }
                    setAsrText(data.result.text)
                }
            } catch (e) {
@@ -220,3 +220,18 @@ ANALYST_SYSTEM_PROMPT = """
 
 Ready to process conversation history. Waiting for input...
 """
+
+# 增量模式：只输出本轮变化（RFC 6902 JSON Patch），Schema 与推演规则仍以上文为准
+ANALYST_PATCH_INSTRUCTION = """
+### Output Format Override: JSON Patch (Incremental Mode)
+Do NOT re-emit the whole state. Output a single JSON object of the form:
+{"patch": [ {"op": "replace", "path": "/interview_session/system_notice", "value": "..."}, ... ]}
+
+Rules:
+- Operations follow RFC 6902: "add", "remove", "replace" (and rarely "move"/"copy").
+- Paths are JSON Pointers relative to the Previous JSON State, e.g. "/user_profile/skills/-" appends to an array.
+- Only include fields that changed in this turn; never touch fields without new evidence.
+- To fill an empty object section, "add" the whole sub-object (e.g. "/needs_analysis/pain_hooks").
+- Every turn MUST replace "/interview_session/system_notice" and "/interview_session/last_analysis_reasoning".
+- Never remove top-level sections or the fields of "interview_session".
+"""
@@ -43,3 +43,11 @@ User: "No, is that code? I hate coding. I just want a slider."
 **Updated Summary:**
 User is a graphic designer exploring AI image tools but frustrated by lack of control in Midjourney. **Critical:** User has a strong aversion to coding ("hates coding") and prefers GUI controls (sliders) over technical setups. Current topic is exploring ControlNet alternatives that offer precision without code.
 """
+
+# 层级归并：摘要本身超出预算时，将其压缩并入更早的长期摘要
+SUMMARY_ROLLUP_INSTRUCTION = """
+### Instruction (Roll-up)
+The Recent Summary has grown too long. Merge it into the Long-Term Summary and compress the result
+to at most {max_chars} characters. Keep every fact, decision, constraint and user preference that
+still matters for the interview; drop superseded details and repetition. Output a single plain text paragraph.
+"""
@@ -41,7 +41,7 @@ source venv/bin/activate
 
 # Install requirements
 echo "Checking backend dependencies..."
-pip install -q fastapi uvicorn websockets python-dotenv
+pip install -q fastapi uvicorn websockets python-dotenv numpy "httpx[http2]"
 
 # Start Backend in background
 echo -e "${GREEN}>>> Starting Backend Server...${NC}"
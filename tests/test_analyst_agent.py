@@ -2,11 +2,23 @@ import pytest
 import sys
 import os
 import logging
+import copy
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 # 确保路径正确
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.analyst_agent import AnalystAgent
+from agents.analyst_agent import AnalystAgent, INITIAL_STATE, validate_state
+from utils.llm_client import LLMClient
+from utils.retry import DeadlineExceeded
+
+
+@pytest.fixture
+def mock_llm_client():
+    client = MagicMock(spec=LLMClient)
+    client.chat_completion = AsyncMock()
+    return client
 
 # 真实调用测试 (Integration Test)
 @pytest.mark.asyncio
@@ -50,6 +62,85 @@ async def test_analyst_short_input():
     # 即使输入很短，也应该生成引导性 Notice
     assert len(result["interview_session"]["system_notice"]) > 0
 
+# 增量模式：只输出 Patch，本地应用
+@pytest.mark.asyncio
+async def test_analyst_patch_mode_applies_delta(mock_llm_client):
+    mock_llm_client.chat_completion.return_value = {"patch": [
+        {"op": "replace", "path": "/interview_session/system_notice", "value": "Ask about the drag interaction."},
+        {"op": "add", "path": "/user_profile/nickname", "value": "光点"},
+        {"op": "remove", "path": "/missing_info/0"},
+    ]}
+    agent = AnalystAgent(llm_client=mock_llm_client, output_mode="patch")
+
+    result = await agent.analyze_turn([{"role": "user", "content": "hi"}], None)
+
+    assert result["interview_session"]["system_notice"] == "Ask about the drag interaction."
+    assert result["user_profile"] == {"nickname": "光点"}
+    assert result["missing_info"] == []
+    assert INITIAL_STATE["missing_info"] == ["ALL"]  # 原状态不被修改
+    assert mock_llm_client.chat_completion.call_args.kwargs["max_tokens"] == 1024
+    assert agent.stats == {"patch": 1, "fallback": 0, "full": 0}
+
+
+# Patch 破坏 Schema 时回退完整重写
+@pytest.mark.asyncio
+async def test_analyst_patch_failure_falls_back_to_full(mock_llm_client):
+    full_state = copy.deepcopy(INITIAL_STATE)
+    full_state["status"] = "Completed"
+    mock_llm_client.chat_completion.side_effect = [
+        {"patch": [{"op": "remove", "path": "/interview_session"}]},
+        full_state,
+    ]
+    agent = AnalystAgent(llm_client=mock_llm_client, output_mode="patch")
+
+    result = await agent.analyze_turn([{"role": "user", "content": "hi"}], None)
+
+    assert result == full_state
+    assert mock_llm_client.chat_completion.call_count == 2
+    assert mock_llm_client.chat_completion.call_args.kwargs["max_tokens"] == 4096
+    assert agent.stats["fallback"] == 1
+
+
+# Patch 尝试耗尽截止时间后不再回退完整重写，一轮分析不超过 ANALYST_DEADLINE_S
+@pytest.mark.asyncio
+async def test_analyst_fallback_shares_the_deadline(mock_llm_client):
+    async def slow_patch(**kwargs):
+        await asyncio.sleep(0.06)
+        raise DeadlineExceeded("LLM call deadline exceeded")
+    mock_llm_client.chat_completion.side_effect = slow_patch
+    agent = AnalystAgent(llm_client=mock_llm_client, output_mode="patch", deadline=0.05)
+
+    result = await agent.analyze_turn([{"role": "user", "content": "hi"}], None)
+
+    assert result == INITIAL_STATE
+    assert mock_llm_client.chat_completion.call_count == 1
+    assert 0 < mock_llm_client.chat_completion.call_args.kwargs["deadline"] <= 0.05
+
+
+# Prompt 省略了空字段，完整重写漏掉的顶层字段从上一轮补回
+@pytest.mark.asyncio
+async def test_analyst_full_mode_restores_omitted_sections(mock_llm_client):
+    response = copy.deepcopy(INITIAL_STATE)
+    del response["growth"]
+    mock_llm_client.chat_completion.return_value = response
+    agent = AnalystAgent(llm_client=mock_llm_client, output_mode="full")
+
+    result = await agent.analyze_turn([{"role": "user", "content": "hi"}], None)
+
+    assert result["growth"] == {}
+    assert '"growth"' not in mock_llm_client.chat_completion.call_args.kwargs["messages"][1]["content"]
+    assert agent.last_state_tokens.tokens_after < agent.last_state_tokens.tokens_before
+
+
+def test_validate_state_rejects_type_changes():
+    state = copy.deepcopy(INITIAL_STATE)
+    validate_state(state)
+
+    state["blockers"] = "none"
+    with pytest.raises(ValueError):
+        validate_state(state)
+
+
 if __name__ == "__main__":
     import asyncio
     asyncio.run(test_analyst_real_call())
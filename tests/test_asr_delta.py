@@ -0,0 +1,77 @@
+from backend.utils.asr_delta import ASRDeltaEncoder, is_definite
+
+
+def _resp(text, utterances=None):
+    return {"result": {"text": text, "utterances": utterances or []}, "audio_info": {"duration": 1000}}
+
+
+def _apply(text, delta):
+    return text[: delta["k"]] + delta["t"]
+
+
+def test_deltas_rebuild_transcript():
+    encoder = ASRDeltaEncoder()
+    partials = ["你好", "你好我想", "你好，我想做", "你好，我想做一个网站。"]
+    client_text = ""
+    deltas = []
+
+    for partial in partials:
+        delta = encoder.encode(_resp(partial))
+        deltas.append(delta)
+        client_text = _apply(client_text, delta)
+        assert client_text == partial
+
+    # 加标点改写时只回退到分歧处，只发送变化的后缀
+    assert deltas[2] == {"type": "asr", "k": 2, "t": "，我想做", "s": 0}
+    assert deltas[3]["t"] == "一个网站。"
+
+
+# k/s 按 UTF-16 码元计数，与前端 String.slice 一致
+def test_offsets_count_utf16_units_for_non_bmp_text():
+    encoder = ASRDeltaEncoder()
+    encoder.encode(_resp("😀好"))
+    utterances = [{"text": "😀好", "definite": True}, {"text": "𠮷", "definite": False}]
+
+    delta = encoder.encode(_resp("😀好𠮷", utterances))
+
+    assert delta == {"type": "asr", "k": 3, "t": "𠮷", "s": 3}
+    utf16 = "😀好".encode("utf-16-le")
+    rebuilt = utf16[: delta["k"] * 2].decode("utf-16-le") + delta["t"]
+    assert rebuilt == "😀好𠮷"
+
+
+def test_unchanged_partial_is_suppressed():
+    encoder = ASRDeltaEncoder()
+    encoder.encode(_resp("你好"))
+
+    assert encoder.encode(_resp("你好")) is None
+
+
+def test_stable_prefix_and_final_marker():
+    encoder = ASRDeltaEncoder()
+    utterances = [
+        {"text": "你好。", "definite": True},
+        {"text": "我想", "definite": False},
+    ]
+
+    delta = encoder.encode(_resp("你好。我想", utterances))
+    assert delta["s"] == 3
+    assert "f" not in delta
+
+    final = encoder.encode(_resp("你好。我想", utterances), final=True)
+    assert final == {"type": "asr", "k": 5, "t": "", "s": 3, "f": True}
+
+
+def test_stable_prefix_never_shrinks():
+    encoder = ASRDeltaEncoder()
+    encoder.encode(_resp("你好。", [{"text": "你好。", "definite": True}]))
+
+    delta = encoder.encode(_resp("你好。我", [{"text": "你好。我", "definite": False}]))
+
+    assert delta["s"] == 3
+
+
+def test_is_definite_requires_whole_text():
+    assert is_definite(_resp("你好。", [{"text": "你好。", "definite": True}])["result"])
+    assert not is_definite(_resp("你好。我", [{"text": "你好。", "definite": True}, {"text": "我", "definite": False}])["result"])
+    assert not is_definite(_resp("", [])["result"])
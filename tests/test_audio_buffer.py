@@ -0,0 +1,72 @@
+import pytest
+import asyncio
+
+from backend.utils.audio_buffer import AudioQueueOverflow, BoundedAudioQueue
+
+
+async def _drain(queue):
+    chunks = []
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            return chunks
+        chunks.append(chunk)
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_audio():
+    queue = BoundedAudioQueue(max_bytes=300, policy="drop_oldest")
+    for i in range(5):
+        await queue.put(bytes([i]) * 100)
+    await queue.close()
+
+    chunks = await _drain(queue)
+
+    assert chunks == [bytes([2]) * 100, bytes([3]) * 100, bytes([4]) * 100]
+    assert queue.dropped_chunks == 2
+    assert queue.dropped_bytes == 200
+    assert queue.high_water_bytes == 300
+
+
+@pytest.mark.asyncio
+async def test_block_applies_backpressure():
+    queue = BoundedAudioQueue(max_bytes=200, policy="block")
+    await queue.put(b"a" * 100)
+    await queue.put(b"b" * 100)
+
+    blocked = asyncio.create_task(queue.put(b"c" * 100))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    assert await queue.get() == b"a" * 100
+    await asyncio.wait_for(blocked, 1)
+    assert queue.buffered_bytes == 200
+    assert queue.dropped_chunks == 0
+
+
+@pytest.mark.asyncio
+async def test_abort_raises_on_overflow():
+    queue = BoundedAudioQueue(max_bytes=150, policy="abort")
+    await queue.put(b"\x00" * 100)
+
+    with pytest.raises(AudioQueueOverflow):
+        await queue.put(b"\x00" * 100)
+
+
+@pytest.mark.asyncio
+async def test_close_discard_releases_blocked_producer():
+    # 上游结束后，阻塞中的 put 不能让客户端读循环挂死
+    queue = BoundedAudioQueue(max_bytes=100, policy="block")
+    await queue.put(b"\x00" * 100)
+    blocked = asyncio.create_task(queue.put(b"\x00" * 100))
+    await asyncio.sleep(0.01)
+
+    await queue.close(discard=True)
+
+    await asyncio.wait_for(blocked, 1)
+    assert await queue.get() is None
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        BoundedAudioQueue(policy="unbounded")
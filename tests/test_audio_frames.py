@@ -0,0 +1,83 @@
+import pytest
+import asyncio
+
+from backend.utils.audio_buffer import BoundedAudioQueue
+from backend.utils.audio_frames import PCMFrameAggregator
+
+
+async def _chunks(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_coalesces_into_fixed_segments():
+    # 100 ms @ 16 kHz / 16 bit = 3200 bytes; 86 bytes ~ one worklet quantum
+    aggregator = PCMFrameAggregator(segment_ms=100, max_latency_ms=10_000)
+    chunks = [b"\x01\x00" * 43] * 100
+
+    segments = [s async for s in aggregator.aggregate(_chunks(chunks))]
+
+    assert b"".join(segments) == b"".join(chunks)
+    assert [len(s) for s in segments[:-1]] == [3200, 3200]
+    assert aggregator.chunks_in == 100
+    assert aggregator.segments_out == 3
+
+
+@pytest.mark.asyncio
+async def test_flushes_partial_segment_after_max_latency():
+    aggregator = PCMFrameAggregator(segment_ms=100, max_latency_ms=20)
+
+    async def source():
+        yield b"\x00" * 101  # 奇数字节：应按采样点对齐切分
+        await asyncio.sleep(0.1)
+        yield b"\x00" * 99
+
+    segments = [s async for s in aggregator.aggregate(source())]
+
+    assert segments[0] == b"\x00" * 100
+    assert b"".join(segments) == b"\x00" * 200
+
+
+@pytest.mark.asyncio
+async def test_source_errors_propagate():
+    async def source():
+        yield b"\x00" * 10
+        raise RuntimeError("client gone")
+
+    aggregator = PCMFrameAggregator(segment_ms=100)
+    with pytest.raises(RuntimeError):
+        async for _ in aggregator.aggregate(source()):
+            pass
+
+
+# 上游停滞时，聚合器不能把有界队列里的音频全部搬走，字节上限必须生效
+@pytest.mark.asyncio
+async def test_bounded_queue_cap_holds_behind_aggregator():
+    queue = BoundedAudioQueue(max_bytes=3200, policy="drop_oldest")
+
+    async def source():
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            yield chunk
+
+    aggregator = PCMFrameAggregator(segment_ms=100, max_latency_ms=10_000)
+    segments = aggregator.aggregate(source())
+    first = asyncio.create_task(segments.__anext__())
+
+    # 发送端只取了一段就停住，客户端继续推 1.28 MB
+    for _ in range(400):
+        await queue.put(b"\x00" * 3200)
+        await asyncio.sleep(0)
+    assert len(await first) == 3200
+
+    assert queue.buffered_bytes <= 3200
+    assert queue.high_water_bytes <= 3200
+    assert queue.dropped_bytes >= 1_200_000
+
+    await queue.close()
+    await segments.aclose()
@@ -0,0 +1,55 @@
+import os
+import sys
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from openai import APIConnectionError, NotFoundError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import llm_client
+from utils.client_registry import ClientRegistry
+
+BASE_URL = "https://ark.example/api/v3"
+_REQUEST = httpx.Request("GET", f"{BASE_URL}/models")
+
+
+def test_clients_are_shared_per_key():
+    registry = ClientRegistry(http2=False)
+    first = registry.get("key-a", BASE_URL)
+
+    assert registry.get("key-a", BASE_URL) is first
+    assert registry.get("key-b", BASE_URL) is not first
+    assert registry.snapshot()["clients"] == 2
+    # SDK 自带重试关闭，由 RetryPolicy 统一控制
+    assert first.max_retries == 0
+
+
+@pytest.mark.asyncio
+async def test_prewarm_treats_any_http_response_as_warm():
+    registry = ClientRegistry(http2=False)
+    client = registry.get("key", BASE_URL)
+    client.get = AsyncMock(side_effect=NotFoundError("404", response=httpx.Response(404, request=_REQUEST), body=None))
+
+    assert await registry.prewarm("key", BASE_URL, connections=3) is True
+    assert client.get.await_count == 3
+    assert registry.snapshot()["prewarms"] == 3
+
+
+@pytest.mark.asyncio
+async def test_prewarm_failure_is_reported_not_raised():
+    registry = ClientRegistry(http2=False)
+    client = registry.get("key", BASE_URL)
+    client.get = AsyncMock(side_effect=APIConnectionError(request=_REQUEST))
+
+    assert await registry.prewarm("key", BASE_URL) is False
+    assert registry.snapshot()["prewarm_failures"] == 1
+
+
+def test_default_llm_client_is_a_singleton(monkeypatch):
+    monkeypatch.setenv("ARK_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_MODEL_ID", "test-model")
+    monkeypatch.setattr(llm_client, "_default_client", None)
+
+    assert llm_client.get_default_llm_client() is llm_client.get_default_llm_client()
@@ -0,0 +1,76 @@
+from utils.context_window import MESSAGE_OVERHEAD_TOKENS, SUMMARY_HEADER, MessageTokenCache, build_context
+
+
+def _turns(n, text="这是一条十个字的消息"):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{text}{i:02d}"} for i in range(n)]
+
+
+def test_fills_budget_from_newest():
+    history = _turns(20)  # 每条约 11 + 4 = 15 tokens
+    cache = MessageTokenCache()
+
+    window = build_context(history, budget_tokens=50, cache=cache)
+
+    assert window.messages == history[-3:]
+    assert window.evicted == 17
+    assert window.summary is None
+    assert window.tokens <= 50
+
+
+def test_summary_replaces_evicted_part_within_budget():
+    history = _turns(20)
+
+    window = build_context(history, budget_tokens=60, summary="用户想做网站", cache=MessageTokenCache())
+
+    assert window.summary == "用户想做网站"
+    assert window.tokens <= 60
+    assert window.as_messages()[0] == {"role": "system", "content": f"{SUMMARY_HEADER}\n用户想做网站"}
+    assert window.as_messages()[1:] == window.messages
+
+
+def test_summary_omitted_when_nothing_evicted():
+    history = _turns(2)
+
+    window = build_context(history, budget_tokens=1000, summary="摘要", cache=MessageTokenCache())
+
+    assert window.messages == history
+    assert window.as_messages() == history
+
+
+def test_long_monologue_is_truncated_not_dropped():
+    history = _turns(2) + [{"role": "user", "content": "很长" * 2000}]
+
+    window = build_context(history, budget_tokens=500, cache=MessageTokenCache())
+
+    assert len(window.messages) == 1
+    content = window.messages[0]["content"]
+    assert content.startswith("很长") and content.endswith("很长")
+    assert window.tokens <= 500
+    assert history[-1]["content"] == "很长" * 2000
+
+
+def test_token_counts_are_cached_per_message():
+    cache = MessageTokenCache()
+    history = _turns(10)
+    build_context(history, budget_tokens=10_000, cache=cache)
+
+    history.append({"role": "user", "content": "新消息"})
+    build_context(history, budget_tokens=10_000, cache=cache)
+
+    assert cache.misses == 11
+    assert cache.hits == 10
+    assert cache.count({"role": "user", "content": "新消息"}) == 3 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_compaction_replaces_summarized_prefix():
+    history = _turns(20)
+
+    window = build_context(history, budget_tokens=10_000, summary="摘要", summary_covers=18, keep_recent=4, cache=MessageTokenCache())
+
+    # 预算充足，但已被摘要覆盖的旧消息不再原文传入（保留最近 4 条）
+    assert window.messages == history[-4:]
+    assert window.summary == "摘要"
+
+    window = build_context(history, budget_tokens=10_000, summary="摘要", summary_covers=10, keep_recent=4, cache=MessageTokenCache())
+
+    assert window.messages == history[10:]
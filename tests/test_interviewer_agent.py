@@ -2,11 +2,13 @@ import pytest
 import sys
 import os
 import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 # 确保路径正确
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.interviewer_agent import InterviewerAgent
+from agents.interviewer_agent import INTERRUPTED_MARK, InterviewerAgent
+from utils.llm_client import LLMClient
 
 # 模拟 Analyst 的输出
 MOCK_PLAN = {
@@ -60,3 +62,70 @@ async def test_interviewer_flow():
 
 if __name__ == "__main__":
     asyncio.run(test_interviewer_flow())
+
+
+# 上下文按 token 预算截取：System Prompt 始终保留，旧消息由摘要代替
+@pytest.mark.asyncio
+async def test_interviewer_context_budget():
+    llm = MagicMock(spec=LLMClient)
+    llm.chat_completion = AsyncMock(return_value="好的，请继续。")
+    agent = InterviewerAgent(llm_client=llm, context_tokens=100)
+    agent.context_summary = "用户是摄影师，想做作品集网站。"
+
+    for i in range(20):
+        await agent.generate_reply(user_input=f"第 {i} 轮：我想展示更多摄影作品", system_notice="Ask one question.")
+
+    messages = llm.chat_completion.call_args.kwargs["messages"]
+    assert messages[0] == agent.history[0]
+    assert agent.context_summary in messages[1]["content"]
+    assert messages[-2]["content"].startswith("第 19 轮")
+    assert messages[-1]["content"].endswith("Ask one question.")
+    assert len(messages) < len(agent.history)
+    assert agent.last_context.evicted > 0
+
+
+
+def _streaming_llm(deltas):
+    llm = MagicMock(spec=LLMClient)
+
+    async def stream(**kwargs):
+        for delta in deltas:
+            await asyncio.sleep(0)
+            yield delta
+
+    llm.chat_completion_stream = stream
+    return llm
+
+
+# 用户插话：取消流式回复时，已生成的部分带打断标记写入历史
+@pytest.mark.asyncio
+async def test_cancelled_stream_records_partial_reply():
+    agent = InterviewerAgent(llm_client=_streaming_llm(["你的网站", "主要给谁看？", "比如客户"]))
+
+    stream = agent.generate_reply_stream(user_input="我想做作品集")
+    assert await stream.__anext__() == "你的网站"
+    await stream.aclose()
+
+    assert agent.history[-1] == {"role": "assistant", "content": "你的网站" + INTERRUPTED_MARK}
+    assert agent.interruptions == 1
+
+
+# 生成领先于播放：历史截断为用户实际听到的句子
+@pytest.mark.asyncio
+async def test_truncate_last_reply_to_heard_text():
+    agent = InterviewerAgent(llm_client=_streaming_llm(["好的。", "你的网站主要给谁看？ ", "比如客户还是朋友？"]))
+    async for _ in agent.generate_reply_stream(user_input="我想做作品集"):
+        pass
+
+    assert agent.truncate_last_reply("好的。你的网站主要给谁看？")
+    assert agent.history[-1]["content"] == "好的。你的网站主要给谁看？" + INTERRUPTED_MARK
+    # 与历史不一致的文本不修改历史
+    assert not agent.truncate_last_reply("完全不同的话")
+
+    # 一句都没听到：回复只留打断标记，消息条数不变
+    length = len(agent.history)
+    assert agent.truncate_last_reply("")
+    assert agent.history[-1] == {"role": "assistant", "content": INTERRUPTED_MARK}
+    assert len(agent.history) == length
+    assert not agent.truncate_last_reply("")
+    assert agent.interruptions == 1
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.json_patch import JsonPatchError, apply_patch
+
+
+def test_add_replace_remove():
+    doc = {"a": {"b": [1, 2]}, "c": "x"}
+
+    result = apply_patch(doc, [
+        {"op": "add", "path": "/a/b/-", "value": 3},
+        {"op": "add", "path": "/a/b/0", "value": 0},
+        {"op": "replace", "path": "/c", "value": "y"},
+        {"op": "remove", "path": "/a/b/1"},
+    ])
+
+    assert result == {"a": {"b": [0, 2, 3]}, "c": "y"}
+    assert doc == {"a": {"b": [1, 2]}, "c": "x"}
+
+
+def test_move_copy_and_escaped_pointer():
+    doc = {"a/b": 1, "m~n": [], "src": {"k": "v"}}
+
+    result = apply_patch(doc, [
+        {"op": "copy", "from": "/src", "path": "/m~0n/-"},
+        {"op": "move", "from": "/a~1b", "path": "/moved"},
+        {"op": "test", "path": "/moved", "value": 1},
+    ])
+
+    assert result == {"m~n": [{"k": "v"}], "src": {"k": "v"}, "moved": 1}
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "replace", "path": "/missing", "value": 1}],
+    [{"op": "remove", "path": "/list/5"}],
+    [{"op": "add", "path": "/list/01", "value": 1}],
+    [{"op": "test", "path": "/list", "value": []}],
+    [{"op": "explode", "path": "/list"}],
+    [{"op": "add", "path": "/list/-"}],
+    {"op": "add"},
+])
+def test_invalid_operations_raise(operations):
+    with pytest.raises(JsonPatchError):
+        apply_patch({"list": [1]}, operations)
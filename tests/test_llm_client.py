@@ -2,11 +2,20 @@ import pytest
 import asyncio
 import os
 import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
 
 # 将项目根目录加入 path，以便导入 utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.llm_client import LLMClient
+import httpx
+from openai import AsyncOpenAI, BadRequestError, InternalServerError, NotFoundError, RateLimitError
+
+from utils.context_cache import ContextCacheManager
+from utils.rate_limiter import PriorityLimiter
+from utils.response_cache import ResponseCache
+from utils.retry import DeadlineExceeded, LatencyTracker, RetryPolicy
 
 @pytest.mark.asyncio
 async def test_llm_connection():
@@ -46,6 +55,69 @@ async def test_json_mode():
     except Exception as e:
         pytest.fail(f"JSON mode failed: {e}")
 
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+async def _fake_stream(chunks):
+    for c in chunks:
+        yield c
+
+@pytest.fixture
+def offline_client(monkeypatch):
+    monkeypatch.setenv("ARK_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_MODEL_ID", "test-model")
+    client = LLMClient(
+        cache=ResponseCache(),
+        context_cache=ContextCacheManager(),
+        limiter=PriorityLimiter(),
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.01),
+        latency_tracker=LatencyTracker(default=0.05),
+    )
+    # 测试会替换请求方法，不要污染进程内共享的客户端
+    client.client = AsyncOpenAI(api_key="test-key", base_url=client.base_url)
+    return client
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_yields_deltas(offline_client):
+    chunks = [_chunk("你好"), _chunk(None), _chunk("，我是"), SimpleNamespace(choices=[]), _chunk(" Maia")]
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_fake_stream(chunks))
+
+    deltas = [d async for d in offline_client.chat_completion_stream([{"role": "user", "content": "hi"}])]
+
+    assert deltas == ["你好", "，我是", " Maia"]
+    assert offline_client.client.chat.completions.create.call_args.kwargs["stream"] is True
+    metrics = offline_client.last_stream_metrics
+    assert metrics.ttft is not None
+    assert metrics.ttft <= metrics.total_time
+    assert metrics.chunks == 3
+
+# 共享客户端上的并发调用各自读到自己的统计
+@pytest.mark.asyncio
+async def test_stream_metrics_are_per_task(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(
+        side_effect=lambda **kwargs: _fake_stream([_chunk(kwargs["messages"][0]["content"])])
+    )
+
+    async def call(text):
+        deltas = [d async for d in offline_client.chat_completion_stream([{"role": "user", "content": text}])]
+        await asyncio.sleep(0.01)  # 另一个任务在此期间完成调用
+        return deltas, offline_client.last_stream_metrics
+
+    (_, short), (_, long) = await asyncio.gather(call("短"), call("长一些的输入"))
+
+    assert short.chars == 1
+    assert long.chars == 6
+    assert offline_client.last_stream_metrics is None
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_flag_joins_deltas(offline_client):
+    chunks = [_chunk('{"result": '), _chunk('"success"}')]
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_fake_stream(chunks))
+
+    response = await offline_client.chat_completion([{"role": "user", "content": "hi"}], json_mode=True, stream=True)
+
+    assert response == {"result": "success"}
+
 if __name__ == "__main__":
     # 手动运行测试
     async def main():
@@ -66,3 +138,251 @@ if __name__ == "__main__":
         print(f"Result: {res_json}")
         
     asyncio.run(main())
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+@pytest.mark.asyncio
+async def test_deterministic_calls_are_cached(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_completion('{"a": 1}'))
+    messages = [{"role": "user", "content": "分析"}]
+
+    first = await offline_client.chat_completion(messages, temperature=0.1, json_mode=True)
+    first["a"] = 2  # 调用方修改结果不影响缓存
+    second = await offline_client.chat_completion(messages, temperature=0.1, json_mode=True)
+
+    assert second == {"a": 1}
+    assert offline_client.client.chat.completions.create.call_count == 1
+    assert offline_client.cache.snapshot()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_cache_bypass_and_sampling_calls(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_completion("hi"))
+    messages = [{"role": "user", "content": "hello"}]
+
+    await offline_client.chat_completion(messages, temperature=0.7)
+    await offline_client.chat_completion(messages, temperature=0.7)
+    await offline_client.chat_completion(messages, temperature=0.0)
+    await offline_client.chat_completion(messages, temperature=0.0, cache=False)
+    # 不同采样参数是不同的 key
+    await offline_client.chat_completion(messages, temperature=0.0, max_tokens=10)
+
+    assert offline_client.client.chat.completions.create.call_count == 5
+
+def test_sqlite_tier_and_ttl(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    key = ResponseCache.make_key({"model": "m", "messages": [{"role": "user", "content": "x"}]})
+    ResponseCache(sqlite_path=path).set(key, "cached")
+
+    reopened = ResponseCache(sqlite_path=path)
+    assert reopened.get(key) == "cached"
+    assert reopened.stats["disk_hits"] == 1
+
+    reopened.set(key, "stale", ttl=-1)
+    assert reopened.get(key) is None
+    assert ResponseCache(sqlite_path=path).get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_context_cache_reuses_prefix_per_content():
+    manager = ContextCacheManager(ttl=3600)
+    client = SimpleNamespace(post=AsyncMock(return_value={"id": "ctx-1"}))
+    prefix = [{"role": "system", "content": "长系统提示"}]
+
+    first = await manager.get_context_id(client, "m", "analyst:s1", prefix)
+    second = await manager.get_context_id(client, "m", "analyst:s2", prefix)
+
+    assert first == second == "ctx-1"
+    assert client.post.call_count == 1
+    assert client.post.call_args.kwargs["body"]["mode"] == "common_prefix"
+
+    # 过期前 refresh_margin 内重新创建
+    manager._contexts[next(iter(manager._contexts))].expires_at = 0
+    await manager.get_context_id(client, "m", "analyst:s1", prefix)
+    assert manager.stats["refreshes"] == 1
+    assert manager.snapshot()["hit_rate"] == round(1 / 3, 3)
+
+@pytest.mark.asyncio
+async def test_context_cache_failure_enters_cooldown():
+    manager = ContextCacheManager(failure_cooldown=300)
+    client = SimpleNamespace(post=AsyncMock(side_effect=RuntimeError("not enabled")))
+    prefix = [{"role": "system", "content": "p"}]
+
+    assert await manager.get_context_id(client, "m", "a", prefix) is None
+    assert await manager.get_context_id(client, "m", "a", prefix) is None
+    assert client.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_scoped_call_sends_only_suffix(offline_client):
+    manager = ContextCacheManager()
+    offline_client.context_cache = manager
+    usage = SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=900))
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage
+    )
+    offline_client.client.post = AsyncMock(side_effect=[{"id": "ctx-9"}, completion])
+    messages = [{"role": "system", "content": "core"}, {"role": "user", "content": "hi"}]
+
+    result = await offline_client.chat_completion(messages, cache_scope="interviewer:s1")
+
+    assert result == "ok"
+    path, = offline_client.client.post.call_args.args
+    body = offline_client.client.post.call_args.kwargs["body"]
+    assert path == "/context/chat/completions"
+    assert body["context_id"] == "ctx-9"
+    assert body["messages"] == [{"role": "user", "content": "hi"}]
+    assert manager.snapshot()["cached_token_ratio"] == 0.9
+
+
+def _status_error(cls, status):
+    request = httpx.Request("POST", "https://ark.example/chat/completions")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+def _context_client(offline_client, *post_effects):
+    offline_client.client.post = AsyncMock(side_effect=[{"id": "ctx-1"}, *post_effects])
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_completion("plain"))
+    return [{"role": "system", "content": "core"}, {"role": "user", "content": "hi"}]
+
+@pytest.mark.asyncio
+async def test_missing_context_falls_back_to_plain_request(offline_client):
+    messages = _context_client(offline_client, _status_error(NotFoundError, 404))
+
+    result = await offline_client.chat_completion(messages, cache=False, cache_scope="interviewer:s1")
+
+    assert result == "plain"
+    assert offline_client.client.chat.completions.create.await_count == 1
+
+@pytest.mark.asyncio
+async def test_context_rate_limit_is_retried_not_bypassed(offline_client):
+    request = httpx.Request("POST", "https://ark.example/context/chat/completions")
+    limited = RateLimitError(
+        "error", response=httpx.Response(429, headers={"retry-after": "0.01"}, request=request), body=None
+    )
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=None)
+    messages = _context_client(offline_client, limited, completion)
+
+    result = await offline_client.chat_completion(messages, cache=False, cache_scope="interviewer:s1")
+
+    # 429 走重试与调度器退避，不立即改发普通请求，也不丢弃 context
+    assert result == "ok"
+    assert offline_client.client.chat.completions.create.await_count == 0
+    assert offline_client.limiter.rate_limited == 1
+    assert offline_client.client.post.call_args.kwargs["body"]["context_id"] == "ctx-1"
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_then_succeeds(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(side_effect=[
+        _status_error(InternalServerError, 503),
+        _status_error(RateLimitError, 429),
+        _completion("ok"),
+    ])
+
+    result = await offline_client.chat_completion([{"role": "user", "content": "hi"}], cache=False)
+
+    assert result == "ok"
+    assert offline_client.client.chat.completions.create.await_count == 3
+    assert offline_client.limiter.in_flight == 0
+
+# 截止时间与对冲都会在子任务里排队，排队时间仍要回到调用方
+@pytest.mark.asyncio
+async def test_queue_wait_reaches_caller_under_deadline(offline_client):
+    offline_client.limiter = PriorityLimiter(max_concurrency=1, interactive_reserve=0)
+
+    async def slow(**kwargs):
+        await asyncio.sleep(0.05)
+        if kwargs.get("stream"):
+            return _fake_stream([_chunk("ok")])
+        return _completion("ok")
+    offline_client.client.chat.completions.create = slow
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def call():
+        await offline_client.chat_completion(messages, cache=False, deadline=5)
+        return offline_client.last_queue_wait
+
+    async def stream_call():
+        await asyncio.sleep(0.01)
+        _ = [d async for d in offline_client.chat_completion_stream(messages, deadline=5, hedge=True)]
+        return offline_client.last_queue_wait, offline_client.last_stream_metrics.queue_wait
+
+    first, (second, metrics_wait) = await asyncio.gather(call(), stream_call())
+
+    assert first < 0.01
+    assert second >= 0.03
+    assert metrics_wait == second
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(side_effect=_status_error(BadRequestError, 400))
+
+    with pytest.raises(BadRequestError):
+        await offline_client.chat_completion([{"role": "user", "content": "hi"}], cache=False)
+    assert offline_client.client.chat.completions.create.await_count == 1
+
+@pytest.mark.asyncio
+async def test_deadline_cuts_off_slow_call(offline_client):
+    async def slow(**kwargs):
+        await asyncio.sleep(1)
+        return _completion("late")
+    offline_client.client.chat.completions.create = slow
+
+    with pytest.raises(DeadlineExceeded):
+        await offline_client.chat_completion([{"role": "user", "content": "hi"}], cache=False, deadline=0.05)
+    assert offline_client.limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_token(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(side_effect=[
+        _status_error(InternalServerError, 502),
+        _fake_stream([_chunk("你好")]),
+    ])
+
+    deltas = [d async for d in offline_client.chat_completion_stream([{"role": "user", "content": "hi"}])]
+
+    assert deltas == ["你好"]
+    assert offline_client.last_stream_metrics.retries == 1
+    assert offline_client.limiter.in_flight == 0
+
+class _ClosableStream:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    async def _iterate(self):
+        await asyncio.sleep(self.delay)
+        for c in self.chunks:
+            yield c
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def close(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_hedged_stream_takes_faster_request(offline_client):
+    slow = _ClosableStream([_chunk("慢")], delay=1)
+    fast = _ClosableStream([_chunk("快"), _chunk("！")], delay=0)
+    offline_client.client.chat.completions.create = AsyncMock(side_effect=[slow, fast])
+
+    deltas = [d async for d in offline_client.chat_completion_stream(
+        [{"role": "user", "content": "hi"}], hedge=True
+    )]
+
+    assert deltas == ["快", "！"]
+    assert offline_client.last_stream_metrics.hedged is True
+    assert slow.closed
+    assert offline_client.limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_hedge_not_sent_when_first_token_is_fast(offline_client):
+    offline_client.client.chat.completions.create = AsyncMock(return_value=_fake_stream([_chunk("好")]))
+
+    deltas = [d async for d in offline_client.chat_completion_stream(
+        [{"role": "user", "content": "hi"}], hedge=True
+    )]
+
+    assert deltas == ["好"]
+    assert offline_client.last_stream_metrics.hedged is False
+    assert offline_client.client.chat.completions.create.await_count == 1
@@ -0,0 +1,45 @@
+import json
+
+from agents.analyst_agent import INITIAL_STATE
+from utils.prompt_state import prune_empty, render_state
+from utils.tokens import estimate_tokens
+
+
+def test_prune_keeps_falsy_information():
+    state = {"a": {}, "b": [], "c": None, "d": "", "e": 0, "f": False, "g": {"h": {"i": []}}, "j": [{}, "x"]}
+
+    assert prune_empty(state) == {"e": 0, "f": False, "j": [{}, "x"]}
+
+
+# 列表下标必须与原 State 一致，否则 Patch 路径 /.../N 会改错元素
+def test_prune_keeps_list_indices_for_patch_paths():
+    state = {"features": [{"name": "", "note": None}, {"name": "拖拽排版", "tags": []}]}
+
+    pruned = prune_empty(state)
+
+    assert len(pruned["features"]) == 2
+    assert pruned["features"][1] == {"name": "拖拽排版"}
+
+
+def test_render_initial_state_is_minified_and_smaller():
+    rendered = render_state(INITIAL_STATE)
+
+    assert "\n" not in rendered.text
+    assert "growth" not in rendered.text
+    assert json.loads(rendered.text)["interview_session"]["stage"] == "initial"
+    assert rendered.tokens_after < rendered.tokens_before / 2
+    assert 0 < rendered.saved_ratio < 1
+
+
+def test_render_projects_sections():
+    state = {"needs_analysis": {"surface_need": "网站"}, "missing_info": ["I/O"], "user_profile": {"nickname": "A"}}
+
+    rendered = render_state(state, sections=("needs_analysis", "missing_info"))
+
+    assert json.loads(rendered.text) == {"needs_analysis": {"surface_need": "网站"}, "missing_info": ["I/O"]}
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("你好，世界") == 5
+    assert estimate_tokens("abcdefgh") == 2
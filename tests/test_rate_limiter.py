@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+
+from utils.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PriorityLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_interactive_jumps_the_queue():
+    limiter = PriorityLimiter(max_concurrency=1, interactive_reserve=0)
+    running = await limiter.acquire(PRIORITY_BACKGROUND)
+    order = []
+
+    async def request(name, priority):
+        slot = await limiter.acquire(priority)
+        order.append(name)
+        limiter.release(slot)
+
+    tasks = [asyncio.create_task(request(f"bg{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("user", PRIORITY_INTERACTIVE)))
+    await asyncio.sleep(0)
+
+    limiter.release(running)
+    await asyncio.gather(*tasks)
+
+    assert order == ["user", "bg0", "bg1", "bg2"]
+    assert limiter.stats[PRIORITY_BACKGROUND]["queued"] == 3
+    assert limiter.snapshot()["queue_wait"][PRIORITY_INTERACTIVE]["wait_max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_reserved_slots_keep_interactive_unblocked():
+    limiter = PriorityLimiter(max_concurrency=3, interactive_reserve=1)
+    background = [await limiter.acquire(PRIORITY_BACKGROUND) for _ in range(2)]
+
+    blocked = asyncio.create_task(limiter.acquire(PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    slot = await asyncio.wait_for(limiter.acquire(PRIORITY_INTERACTIVE), 0.1)
+    assert slot.queue_wait < 0.01
+    assert limiter.in_flight == 3
+
+    # 后台最多占用 max_concurrency - interactive_reserve 个名额
+    limiter.release(slot)
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    limiter.release(background[0])
+    await asyncio.wait_for(blocked, 0.1)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_throttles_requests():
+    # 600 RPM = 10 个/秒，突发容量 50
+    limiter = PriorityLimiter(rpm=600)
+    limiter.requests.tokens = 1
+    await limiter.acquire()
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await limiter.acquire()
+
+    assert loop.time() - start >= 0.08
+
+
+# 默认配置（RPM/TPM 不限）下，429 同样要暂停发送 Retry-After 秒
+@pytest.mark.asyncio
+async def test_rate_limit_pause_applies_without_buckets():
+    limiter = PriorityLimiter(rpm=0, tpm=0)
+    slot = await limiter.acquire(tokens=1000)
+    limiter.penalize(retry_after=0.1)
+    limiter.release(slot)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    # 快速路径与排队中的请求都要等待暂停结束
+    queued = [asyncio.create_task(limiter.acquire(PRIORITY_INTERACTIVE)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    assert not any(task.done() for task in queued)
+    assert limiter.snapshot()["paused_for"] > 0
+
+    await asyncio.wait_for(asyncio.gather(*queued), 1)
+    assert loop.time() - start >= 0.09
+    assert limiter.rate_limited == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_removed():
+    limiter = PriorityLimiter(max_concurrency=1, interactive_reserve=0)
+    slot = await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release(slot)
+
+    assert limiter.in_flight == 0
+    assert limiter.snapshot()["waiting"] == 0
+
+
+def test_token_bucket_refund_is_capped():
+    bucket = TokenBucket(rate=1, capacity=10)
+    bucket.take(4)
+    bucket.refund(100)
+
+    assert bucket.tokens == 10
@@ -0,0 +1,57 @@
+import os
+import sys
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError, InternalServerError, RateLimitError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.retry import Deadline, DeadlineExceeded, LatencyTracker, RetryPolicy, is_retryable
+
+_REQUEST = httpx.Request("POST", "https://ark.example/chat/completions")
+
+
+def _status_error(cls, status):
+    return cls("error", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+def test_retryable_classification():
+    assert is_retryable(_status_error(RateLimitError, 429))
+    assert is_retryable(_status_error(InternalServerError, 503))
+    assert is_retryable(APIConnectionError(request=_REQUEST))
+    assert not is_retryable(_status_error(BadRequestError, 400))
+    assert not is_retryable(ValueError("bad json"))
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+    policy = RetryPolicy(max_retries=5, base_delay=0.1, max_delay=1.0)
+    delay = None
+    for _ in range(50):
+        previous = delay or policy.base_delay
+        delay = policy.next_delay(delay)
+        assert policy.base_delay <= delay <= min(policy.max_delay, previous * 3)
+
+
+def test_hedge_threshold_uses_p95_once_warmed_up():
+    tracker = LatencyTracker(min_samples=20, default=1.5, floor=0.2)
+    for i in range(10):
+        tracker.record(0.5)
+    # 样本不足时使用默认值
+    assert tracker.hedge_threshold() == 1.5
+
+    for i in range(1, 101):
+        tracker.record(i / 100)
+    assert tracker.hedge_threshold() == pytest.approx(0.96, abs=0.02)
+
+    fast = LatencyTracker(min_samples=1, floor=0.2)
+    fast.record(0.01)
+    assert fast.hedge_threshold() == 0.2
+
+
+@pytest.mark.asyncio
+async def test_deadline_run():
+    assert await Deadline(None).run(asyncio.sleep(0, result="ok")) == "ok"
+    with pytest.raises(DeadlineExceeded):
+        await Deadline(0.01).run(asyncio.sleep(1))
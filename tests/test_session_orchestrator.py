@@ -0,0 +1,246 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from agents.session_orchestrator import SessionOrchestrator
+from backend.services.session_manager import SessionLimitError, SessionManager
+from utils.llm_client import LLMClient
+
+
+def _state(notice, **extra):
+    return {"interview_session": {"system_notice": notice}, "missing_info": [], **extra}
+
+
+@pytest.fixture
+def session():
+    llm = MagicMock(spec=LLMClient)
+    llm.chat_completion = AsyncMock(return_value="好的，请继续。")
+    events = []
+    orchestrator = SessionOrchestrator(
+        session_id="s1", llm_client=llm, summary_interval=2,
+        on_event=lambda kind, payload: events.append(kind),
+    )
+    orchestrator.analyst.analyze_turn = AsyncMock(side_effect=[_state(f"notice-{i}") for i in range(10)])
+    orchestrator.judge.evaluate_turn = AsyncMock(return_value={"judge_notice": "先确认使用场景", "next_questions": []})
+    orchestrator.summary_agent.update_from_history = AsyncMock(return_value="用户是摄影师")
+    orchestrator.events = events
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_reply_uses_notice_from_previous_analysis(session):
+    await session.start()
+    assert session.system_notice == "notice-0"
+
+    await session.handle_user_turn("我想做一个作品集网站")
+    # 回复使用的是上一轮的 Notice，本轮分析在后台进行
+    assert session.llm.chat_completion.call_args.kwargs["messages"][-1]["content"].endswith("notice-0")
+    assert session.analysis_pending or session._analysis_task.done()
+
+    await session.sync()
+    assert session.system_notice == "notice-1"
+    assert session.current_state == _state("notice-1")
+
+
+@pytest.mark.asyncio
+async def test_judge_gate_and_summary_interval(session):
+    await session.start()
+    await session.handle_user_turn("第一轮")
+    await session.handle_user_turn("第二轮")
+    await session.sync()
+
+    # Initial Gate 在第 2 轮触发一次，Judge 的警告拼进 Notice
+    session.judge.evaluate_turn.assert_awaited_once()
+    assert "[JUDGE WARNING]: 先确认使用场景" in session.system_notice
+    # 每 2 轮更新一次摘要，并交给 Interviewer
+    assert session.memory["summary"] == "用户是摄影师"
+    assert session.interviewer.context_summary == "用户是摄影师"
+    assert {"analysis", "judge", "summary", "notice"} <= set(session.events)
+
+
+# 摘要之后整条回复都没播出：截断不能让后续消息落在摘要高水位之下
+@pytest.mark.asyncio
+async def test_truncating_unheard_reply_keeps_summary_high_water_mark(session):
+    del session.summary_agent.update_from_history
+    session.summary_agent._merge = AsyncMock(return_value=True)
+    await session.start()
+    await session.handle_user_turn("第一轮")
+    await session.handle_user_turn("第二轮")
+    await session.sync()
+    covers = session.memory["covers"]
+
+    assert session.truncate_reply("")
+    await session.handle_user_turn("第三轮")
+    await session.handle_user_turn("第四轮")
+    await session.sync()
+
+    chunk = session.summary_agent._merge.call_args.args[0]
+    assert [m["content"] for m in chunk if m["role"] == "user"] == ["第三轮", "第四轮"]
+    assert session.memory["covers"] == covers + 4
+
+
+@pytest.mark.asyncio
+async def test_failed_analysis_keeps_previous_state(session):
+    await session.start()
+    session.analyst.analyze_turn = AsyncMock(side_effect=RuntimeError("boom"))
+
+    await session.handle_user_turn("第一轮")
+    await session.sync()
+
+    assert session.current_state == _state("notice-0")
+    assert session.memory_stats()["turns"] == 1
+
+
+# 同一会话上并发提交的两个轮次依次执行，历史不交错
+@pytest.mark.asyncio
+async def test_concurrent_turns_are_serialized(session):
+    await session.start()
+
+    async def slow_reply(**kwargs):
+        await asyncio.sleep(0.01)
+        return f"回复：{kwargs['messages'][-2]['content']}"
+    session.llm.chat_completion = AsyncMock(side_effect=slow_reply)
+
+    await asyncio.gather(session.handle_user_turn("第一轮"), session.handle_user_turn("第二轮"))
+
+    visible = session.interviewer.get_visible_history()
+    assert [m["role"] for m in visible[-4:]] == ["user", "assistant", "user", "assistant"]
+    assert visible[-4]["content"] == "第一轮" and visible[-2]["content"] == "第二轮"
+    assert session.turn_count == 2
+
+
+def _stream_llm(session, deltas):
+    async def stream(**kwargs):
+        for delta in deltas:
+            await asyncio.sleep(0)
+            yield delta
+
+    session.llm.chat_completion_stream = MagicMock(side_effect=stream)
+
+
+@pytest.mark.asyncio
+async def test_speculative_reply_adopted_when_final_matches(session):
+    await session.start()
+    _stream_llm(session, ["好的，", "请继续。"])
+
+    speculation = session.speculate_user_turn("我想做网站")
+    await asyncio.sleep(0.01)
+    # 最终结果只差标点，沿用推测结果，不重新生成
+    assert speculation.matches("我想做网站。")
+    reply = "".join([d async for d in speculation.stream()])
+
+    assert reply == "好的，请继续。"
+    # 采纳后才启动本轮的后台分析
+    assert session._analysis_task is not None
+    assert session.llm.chat_completion_stream.call_count == 1
+    assert session.turn_count == 1
+    assert session.interviewer.get_visible_history()[-2:] == [
+        {"role": "user", "content": "我想做网站"},
+        {"role": "assistant", "content": "好的，请继续。"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_speculation_rolls_back_turn(session):
+    await session.start()
+    history = list(session.interviewer.history)
+    _stream_llm(session, ["好的，", "请继续。"])
+
+    speculation = session.speculate_user_turn("我想做")
+    await asyncio.sleep(0.01)
+    assert not speculation.matches("我想做一个网站")
+    await speculation.cancel()
+
+    assert session.turn_count == 0
+    assert session.interviewer.history == history
+    assert session.interviewer.interruptions == 0
+    assert not session.analysis_pending
+
+    await session.handle_user_turn("我想做一个网站")
+    assert session.turn_count == 1
+
+
+# 推测回复已生成完毕、用户却还在说：被丢弃的推测不能消耗 Judge 门控或写入摘要
+@pytest.mark.asyncio
+async def test_finished_speculation_cancelled_leaves_no_analysis(session):
+    await session.start()
+    await session.handle_user_turn("第一轮")
+    _stream_llm(session, ["好的，", "请继续。"])
+
+    speculation = session.speculate_user_turn("第二轮")
+    await asyncio.sleep(0.05)
+    assert speculation._task.done()
+    assert not session.analysis_pending
+    await speculation.cancel()
+
+    await session.handle_user_turn("第二轮，我想做网站")
+    await session.sync()
+
+    # start + 第一轮 + 真正的第二轮，推测轮次没有分析
+    assert session.analyst.analyze_turn.await_count == 3
+    assert session.judge_gate_counts["initial"] == 1
+    session.judge.evaluate_turn.assert_awaited_once()
+    history = session.judge.evaluate_turn.call_args.args[0]
+    assert {"role": "user", "content": "第二轮"} not in history
+    assert session.summary_agent.update_from_history.call_args.args[0] == history
+
+
+@pytest.mark.asyncio
+async def test_cancelled_sync_keeps_pending_analysis(session):
+    await session.start()
+    await session.handle_user_turn("第一轮")
+    gate = asyncio.Event()
+    pending = session._analysis_task
+
+    async def blocked():
+        await gate.wait()
+        return await pending
+
+    session._analysis_task = asyncio.create_task(blocked())
+    waiter = asyncio.create_task(session.sync())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    # 被取消的是调用方，分析仍留给下一次 sync
+    gate.set()
+    await session.sync()
+    assert session.system_notice == "notice-1"
+
+
+class _FakeSession:
+    def __init__(self, session_id=None):
+        self.session_id = session_id or f"fake-{id(self)}"
+        self.last_active = time.monotonic()
+        self.analysis_pending = False
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+    def memory_stats(self):
+        return {"history_messages": 3, "history_bytes": 100}
+
+
+@pytest.mark.asyncio
+async def test_session_manager_limits_and_reaps_idle():
+    manager = SessionManager(max_sessions=2, idle_timeout=60, factory=_FakeSession)
+    first = await manager.create("a")
+    await manager.create("b")
+    first.last_active -= 120  # a 已空闲超过 idle_timeout
+
+    # 已满：空闲的 a 被回收，为新会话让位
+    await manager.create("c")
+    assert first.closed
+    assert manager.get("a") is None
+    assert manager.snapshot()["evicted"] == 1
+
+    with pytest.raises(SessionLimitError):
+        await manager.create("d")
+
+    snapshot = manager.snapshot()
+    assert snapshot["active"] == 2
+    assert snapshot["memory"]["history_messages"] == 6
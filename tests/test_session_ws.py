@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from agents.session_orchestrator import SessionOrchestrator
+from backend.routers import session as session_router
+from backend.services.session_manager import SessionManager
+from utils.llm_client import LLMClient
+
+
+async def _fake_stream(*args, **kwargs):
+    for delta in ["你好", "，请说说", "你的需求。"]:
+        yield delta
+
+
+def _factory(session_id=None, on_event=None):
+    llm = MagicMock(spec=LLMClient)
+    llm.chat_completion = AsyncMock(return_value="欢迎！")
+    llm.chat_completion_stream = MagicMock(side_effect=_fake_stream)
+    orchestrator = SessionOrchestrator(session_id=session_id, llm_client=llm, on_event=on_event)
+    orchestrator.analyst.analyze_turn = AsyncMock(
+        return_value={"interview_session": {"system_notice": "Ask about users."}, "missing_info": []}
+    )
+    return orchestrator
+
+
+@pytest.fixture
+def client(monkeypatch):
+    manager = SessionManager(max_sessions=4, factory=_factory)
+    monkeypatch.setattr(session_router, "session_manager", manager)
+    app = FastAPI()
+    app.include_router(session_router.router)
+    return TestClient(app)
+
+
+def _receive_until(ws, event_type):
+    events = []
+    while True:
+        event = json.loads(ws.receive_text())
+        events.append(event)
+        if event["type"] == event_type:
+            return events
+
+
+def test_session_socket_multiplexes_tokens_and_state(client):
+    with client.websocket_connect("/ws/session") as ws:
+        opening = _receive_until(ws, "reply")
+        assert opening[0]["type"] == "session"
+        assert opening[-1] == {"type": "reply", "turn": 0, "content": "欢迎！"}
+
+        ws.send_text(json.dumps({"type": "turn", "text": "我想做一个作品集网站"}))
+        events = _receive_until(ws, "reply")
+        tokens = [e["content"] for e in events if e["type"] == "token"]
+        assert tokens == ["你好", "，请说说", "你的需求。"]
+        assert events[-1]["content"] == "".join(tokens)
+
+        # 后台分析完成后推送状态
+        ws.send_text(json.dumps({"type": "ping"}))
+        events = _receive_until(ws, "state")
+        assert events[-1]["turn"] == 1
+
+
+def test_resume_and_unknown_session(client):
+    with client.websocket_connect("/ws/session") as ws:
+        session_id = _receive_until(ws, "session")[-1]["session_id"]
+
+    with client.websocket_connect(f"/ws/session?session_id={session_id}") as ws:
+        event = json.loads(ws.receive_text())
+        assert event == {"type": "session", "session_id": session_id, "resumed": True}
+        ws.send_text(json.dumps({"type": "bogus"}))
+        assert json.loads(ws.receive_text())["type"] == "error"
+
+    with pytest.raises(Exception):
+        with client.websocket_connect("/ws/session?session_id=missing") as ws:
+            ws.receive_text()
+
+
+def test_failed_start_reports_error_and_closes_session(monkeypatch):
+    def failing_factory(session_id=None, on_event=None):
+        session = _factory(session_id=session_id, on_event=on_event)
+        session.analyst.analyze_turn = AsyncMock(side_effect=RuntimeError("LLM down"))
+        return session
+
+    manager = SessionManager(max_sessions=4, factory=failing_factory)
+    monkeypatch.setattr(session_router, "session_manager", manager)
+    app = FastAPI()
+    app.include_router(session_router.router)
+
+    with TestClient(app).websocket_connect("/ws/session") as ws:
+        events = _receive_until(ws, "error")
+
+    assert "LLM down" in events[-1]["content"]
+    # 启动失败的会话不能留在管理器里等空闲回收
+    assert len(manager) == 0
+    assert manager.snapshot()["closed"] == 1
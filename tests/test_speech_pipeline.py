@@ -0,0 +1,75 @@
+import pytest
+import asyncio
+from unittest.mock import MagicMock
+
+from agents.interviewer_agent import InterviewerAgent
+from backend.services.speech_pipeline import SentenceSpeechPipeline
+from backend.utils.sentence_splitter import SentenceSplitter
+from utils.llm_client import LLMClient
+
+
+def test_splitter_handles_chinese_punctuation():
+    splitter = SentenceSplitter()
+    sentences = []
+    for delta in ["你好", "！我是 Maia", "。今天想聊", "点什么？Version 1.8 ", "is out. Sounds good", "\n好的"]:
+        sentences += splitter.feed(delta)
+
+    # "你好！" 太短，会与下一句合并；"1.8" 不应被切开
+    assert sentences == ["你好！我是 Maia。", "今天想聊点什么？", "Version 1.8 is out.", "Sounds good"]
+    assert splitter.flush() == "好的"
+
+
+def test_splitter_forces_break_on_long_sentence():
+    splitter = SentenceSplitter(max_chars=10)
+    sentences = splitter.feed("这是一个很长的句子，没有句号但是一直在说")
+
+    assert sentences[0] == "这是一个很长的句子，"
+
+
+class FakeTTS:
+    def __init__(self):
+        self.requests = []
+
+    async def stream_tts(self, text, format="pcm"):
+        self.requests.append(text)
+        yield f"<{text}>".encode()
+
+
+@pytest.fixture
+def streaming_llm():
+    client = MagicMock(spec=LLMClient)
+
+    async def fake_stream(**kwargs):
+        for delta in ["第一句话。", "第二句", "话！尾巴"]:
+            await asyncio.sleep(0)
+            yield delta
+
+    client.chat_completion_stream = MagicMock(side_effect=fake_stream)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_pipeline_speaks_sentences_in_order(streaming_llm):
+    interviewer = InterviewerAgent(llm_client=streaming_llm)
+    tts = FakeTTS()
+    pipeline = SentenceSpeechPipeline(tts)
+
+    events = [e async for e in pipeline.run(interviewer.generate_reply_stream("你好"))]
+
+    assert tts.requests == ["第一句话。", "第二句话！", "尾巴"]
+    assert [e.type for e in events] == ["sentence", "audio"] * 3 + ["done"]
+    assert "first_audio" in events[-1].timings
+    # 流结束后完整回复写入历史
+    assert interviewer.get_visible_history()[-1] == {"role": "assistant", "content": "第一句话。第二句话！尾巴"}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_propagates_llm_errors():
+    async def broken_stream():
+        yield "半句话。"
+        raise RuntimeError("LLM down")
+
+    pipeline = SentenceSpeechPipeline(FakeTTS())
+    with pytest.raises(RuntimeError):
+        async for _ in pipeline.run(broken_stream()):
+            pass
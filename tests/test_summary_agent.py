@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from agents.summary_agent import SummaryAgent
+from utils.llm_client import LLMClient
+
+
+@pytest.fixture
+def mock_llm_client():
+    client = MagicMock(spec=LLMClient)
+    client.chat_completion = AsyncMock(return_value="摘要")
+    return client
+
+
+def _turns(n, start=0):
+    return [{"role": "user", "content": f"消息{i}"} for i in range(start, start + n)]
+
+
+def _user_input(client):
+    return client.chat_completion.call_args.kwargs["messages"][1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_only_unseen_messages_are_sent(mock_llm_client):
+    agent = SummaryAgent(llm_client=mock_llm_client)
+    history = _turns(6)
+    await agent.update_from_history(history)
+    assert agent.summarized_upto == 6
+
+    history += _turns(3, start=6)
+    await agent.update_from_history(history)
+
+    sent = _user_input(mock_llm_client)
+    assert "消息5" not in sent
+    assert "消息6" in sent and "消息8" in sent
+    assert agent.summarized_upto == 9
+
+
+@pytest.mark.asyncio
+async def test_failed_update_keeps_high_water_mark(mock_llm_client):
+    agent = SummaryAgent(llm_client=mock_llm_client)
+    await agent.update_from_history(_turns(4))
+
+    mock_llm_client.chat_completion.side_effect = RuntimeError("timeout")
+    summary = await agent.update_from_history(_turns(6))
+
+    assert summary == "摘要"
+    assert agent.summarized_upto == 4
+
+
+@pytest.mark.asyncio
+async def test_no_call_without_new_messages(mock_llm_client):
+    agent = SummaryAgent(llm_client=mock_llm_client)
+    history = _turns(2)
+    await agent.update_from_history(history)
+
+    await agent.update_from_history(history)
+
+    assert mock_llm_client.chat_completion.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_rollup_when_summary_exceeds_budget(mock_llm_client):
+    mock_llm_client.chat_completion.side_effect = ["很长的摘要" * 50, "归并摘要", "新摘要"]
+    agent = SummaryAgent(llm_client=mock_llm_client, max_summary_tokens=100)
+
+    await agent.update_from_history(_turns(3))
+
+    assert agent.rollups == 1
+    assert agent.rollup_summary == "归并摘要"
+    assert agent.current_summary == ""
+
+    # 之后的合并只携带最近一层摘要
+    summary = await agent.update_from_history(_turns(5))
+    assert "很长的摘要" not in _user_input(mock_llm_client)
+    assert summary == "归并摘要\n新摘要"
@@ -0,0 +1,148 @@
+import pytest
+import asyncio
+import struct
+
+from websockets.protocol import State
+
+from backend.services.tts_pool import TTSConnectionPool
+from backend.services.tts_service import VolcTTSService
+from backend.utils.volc_protocol import EventType, Message, MsgType, MsgTypeFlagBits
+
+
+def _server_frame(msg_type, event, session_id="", payload=b"{}"):
+    """按服务端格式构造带事件号的下行帧"""
+    frame = bytearray([0x11, (msg_type << 4) | MsgTypeFlagBits.WithEvent, 0x10, 0x00])
+    frame += struct.pack(">i", event)
+    if event in (EventType.ConnectionStarted, EventType.ConnectionFinished):
+        frame += struct.pack(">I", 0)  # connect_id
+    else:
+        sid = session_id.encode()
+        frame += struct.pack(">I", len(sid)) + sid
+    frame += struct.pack(">I", len(payload)) + payload
+    return bytes(frame)
+
+
+class FakeVolcSocket:
+    """模拟火山 v3 双向 TTS 服务端"""
+
+    def __init__(self):
+        self.state = State.OPEN
+        self.inbox = asyncio.Queue()
+        self.sent_events = []
+
+    async def send(self, data):
+        msg = Message.from_bytes(data)
+        self.sent_events.append(msg.event)
+        if msg.event == EventType.StartConnection:
+            await self.inbox.put(_server_frame(MsgType.FullServerResponse, EventType.ConnectionStarted))
+        elif msg.event == EventType.StartSession:
+            await self.inbox.put(_server_frame(MsgType.FullServerResponse, EventType.SessionStarted, msg.session_id))
+        elif msg.event == EventType.FinishSession:
+            await self.inbox.put(_server_frame(MsgType.AudioOnlyServer, EventType.TTSResponse, msg.session_id, b"PCM"))
+            await self.inbox.put(_server_frame(MsgType.FullServerResponse, EventType.SessionFinished, msg.session_id))
+
+    async def recv(self):
+        return await self.inbox.get()
+
+    async def ping(self):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    async def close(self):
+        self.state = State.CLOSED
+
+
+@pytest.fixture
+def fake_connect():
+    sockets = []
+
+    async def connect(endpoint, **kwargs):
+        ws = FakeVolcSocket()
+        sockets.append(ws)
+        return ws
+
+    connect.sockets = sockets
+    return connect
+
+
+@pytest.mark.asyncio
+async def test_sessions_reuse_one_connection(fake_connect):
+    service = VolcTTSService()
+    service.pool = TTSConnectionPool("wss://fake", "app", "token", connect=fake_connect)
+
+    for text in ["第一句。", "第二句。", "第三句。"]:
+        chunks = [c async for c in service.stream_tts(text)]
+        assert chunks == [b"PCM"]
+
+    assert len(fake_connect.sockets) == 1
+    assert service.pool.stats["connects"] == 1
+    assert service.pool.stats["reuses"] == 2
+    assert fake_connect.sockets[0].sent_events.count(EventType.StartSession) == 3
+
+    await service.pool.close()
+    assert fake_connect.sockets[0].sent_events[-1] == EventType.FinishConnection
+
+
+@pytest.mark.asyncio
+async def test_abandoned_session_discards_connection(fake_connect):
+    pool = TTSConnectionPool("wss://fake", "app", "token", connect=fake_connect)
+
+    with pytest.raises(RuntimeError):
+        async with pool.connection("res", "voice"):
+            raise RuntimeError("client went away")
+
+    assert pool.idle_count() == 0
+    assert fake_connect.sockets[0].state == State.CLOSED
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_evicted(fake_connect):
+    pool = TTSConnectionPool("wss://fake", "app", "token", idle_timeout=0.0, connect=fake_connect)
+    await pool.warm("res", "voice", count=2)
+    assert pool.idle_count() == 2
+
+    await asyncio.sleep(0.01)
+    await pool.evict_idle()
+
+    assert pool.idle_count() == 0
+    assert pool.stats["evictions"] == 2
+    await pool.close()
+
+
+class InterruptibleVolcSocket(FakeVolcSocket):
+    """合成中途不结束，直到收到 CancelSession"""
+
+    async def send(self, data):
+        msg = Message.from_bytes(data)
+        if msg.event == EventType.FinishSession:
+            self.sent_events.append(msg.event)
+            for _ in range(2):
+                await self.inbox.put(_server_frame(MsgType.AudioOnlyServer, EventType.TTSResponse, msg.session_id, b"PCM"))
+        elif msg.event == EventType.CancelSession:
+            self.sent_events.append(msg.event)
+            await self.inbox.put(_server_frame(MsgType.FullServerResponse, EventType.SessionCanceled, msg.session_id))
+        else:
+            await super().send(data)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_session_is_cancelled_and_connection_reused():
+    sockets = []
+
+    async def connect(endpoint, **kwargs):
+        sockets.append(InterruptibleVolcSocket())
+        return sockets[-1]
+
+    service = VolcTTSService()
+    service.pool = TTSConnectionPool("wss://fake", "app", "token", connect=connect)
+
+    stream = service.stream_tts("很长的一句话。")
+    assert await stream.__anext__() == b"PCM"
+    await stream.aclose()
+
+    assert sockets[0].sent_events[-1] == EventType.CancelSession
+    assert service.pool.stats["cancel_reuses"] == 1
+    assert service.pool.idle_count() == 1
+    await service.pool.close()
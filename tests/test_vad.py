@@ -0,0 +1,106 @@
+import pytest
+import numpy as np
+
+from backend.utils.vad import VADConfig, VoiceActivityDetector, classify_frames
+
+RATE = 16000
+
+
+def tone(ms, amplitude=0.3):
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * amplitude * 32767).astype("<i2").tobytes()
+
+
+def silence(ms, noise=0.0005):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(RATE * ms // 1000) * noise * 32767).astype("<i2").tobytes()
+
+
+def test_classify_frames_vectorized():
+    samples = np.frombuffer(silence(100) + tone(100), dtype="<i2")
+
+    decisions = classify_frames(samples, VADConfig())
+
+    assert decisions.tolist() == [False] * 5 + [True] * 5
+
+
+def test_gate_drops_long_silence():
+    vad = VoiceActivityDetector(VADConfig(mode="gate", pre_roll_ms=100, hangover_ms=200))
+    audio = silence(1000) + tone(500) + silence(2000) + tone(500)
+
+    out, done = vad.process(audio)
+
+    # 语音 + 每段前 100 ms pre-roll + 第一段后 200 ms hangover
+    assert len(out) == (500 + 100 + 200 + 500 + 100) * RATE // 1000 * 2
+    assert not done
+
+
+def test_compress_marks_each_gap_with_short_silence():
+    vad = VoiceActivityDetector(VADConfig(mode="compress", pre_roll_ms=0, hangover_ms=0, compressed_silence_ms=100))
+    audio = tone(200) + silence(1000) + tone(200)
+
+    out, _ = vad.process(audio)
+
+    assert len(out) == (200 + 100 + 200) * RATE // 1000 * 2
+
+
+def test_trim_drops_only_leading_silence():
+    vad = VoiceActivityDetector(VADConfig(mode="trim", pre_roll_ms=0))
+
+    out, _ = vad.process(silence(500) + tone(200) + silence(500))
+
+    assert len(out) == 700 * RATE // 1000 * 2
+
+
+@pytest.mark.asyncio
+async def test_end_of_utterance_ends_stream():
+    vad = VoiceActivityDetector(VADConfig(end_of_utterance_ms=400))
+    notified = []
+
+    async def source():
+        yield tone(300)
+        for _ in range(10):
+            yield silence(100)
+        pytest.fail("stream should have ended at end of utterance")
+
+    async def on_eou():
+        notified.append(True)
+
+    chunks = [c async for c in vad.filter(source(), on_end_of_utterance=on_eou)]
+
+    assert chunks
+    assert vad.end_of_utterance
+    assert notified == [True]
+
+
+@pytest.mark.asyncio
+async def test_pause_reported_once_per_silence_gap():
+    vad = VoiceActivityDetector(VADConfig(pause_ms=200, end_of_utterance_ms=1000))
+    pauses = []
+
+    async def source():
+        yield tone(300)
+        for _ in range(4):
+            yield silence(100)
+        yield tone(300)
+        for _ in range(3):
+            yield silence(100)
+
+    async def on_pause():
+        pauses.append(vad.paused)
+
+    chunks = [c async for c in vad.filter(source(), on_pause=on_pause)]
+
+    assert chunks
+    # 两段停顿各报告一次，说话恢复后清除
+    assert pauses == [True, True]
+    assert not vad.end_of_utterance
+
+
+def test_odd_chunk_sizes_are_buffered():
+    vad = VoiceActivityDetector(VADConfig(mode="gate", pre_roll_ms=0, hangover_ms=0))
+    audio = tone(200)
+
+    out = b"".join(vad.process(audio[i : i + 86])[0] for i in range(0, len(audio), 86))
+
+    assert out == audio
@@ -0,0 +1,241 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+
+from agents.session_orchestrator import SessionOrchestrator
+from backend.services.voice_loop import TurnTimeline, VoiceLoop, voice_totals
+from backend.utils.vad import VADConfig
+from utils.llm_client import LLMClient
+
+
+class FakeASR:
+    vad_config = VADConfig(mode="off")
+
+    def __init__(self, partials):
+        self.partials = partials
+        self.audio = b""
+
+    async def stream_asr_results(self, audio):
+        async for chunk in audio:
+            self.audio += chunk
+        for index, text in enumerate(self.partials):
+            yield {"result": {"text": text}}, index == len(self.partials) - 1
+
+
+class FakeTTS:
+    async def stream_tts(self, text, format="pcm"):
+        yield f"<{text}>".encode()
+
+
+class FakeSession:
+    def __init__(self):
+        self.turns = []
+        self.truncated = []
+
+    def truncate_reply(self, heard):
+        self.truncated.append(heard)
+        return True
+
+    async def stream_user_turn(self, text):
+        self.turns.append(text)
+        for delta in ["好的，", "请继续说。"]:
+            await asyncio.sleep(0)
+            yield delta
+
+
+async def _audio(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_voice_turn_runs_asr_agents_and_tts():
+    asr = FakeASR(["我想", "我想做网站"])
+    session = FakeSession()
+    loop = VoiceLoop(asr, FakeTTS(), session)
+    timeline = TurnTimeline()
+
+    events = [e async for e in loop.run_turn(_audio([b"\x01\x00" * 160, b"\x02\x00" * 160]), timeline)]
+    types = [e.type for e in events]
+
+    assert asr.audio == b"\x01\x00" * 160 + b"\x02\x00" * 160
+    assert session.turns == ["我想做网站"]
+    assert types[:3] == ["asr", "asr", "transcript"]
+    assert "sentence" in types and "audio" in types
+    assert types[-1] == "done"
+
+    timings = events[-1].timings
+    # 阶段时间戳按发生顺序单调递增，且都以本轮首帧音频为原点
+    # （FakeASR 读完全部音频后才产出结果）
+    ordered = ["speech_end", "asr_first_partial", "asr_final", "reply_start", "first_token", "first_audio"]
+    assert [timings[k] for k in ordered] == sorted(timings[k] for k in ordered)
+    assert timings["speech_end_to_first_audio"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_empty_transcript_skips_reply():
+    session = FakeSession()
+    loop = VoiceLoop(FakeASR(["  "]), FakeTTS(), session)
+
+    events = [e async for e in loop.run_turn(_audio([b"\x00\x00" * 160]))]
+
+    assert session.turns == []
+    assert [e.type for e in events] == ["asr", "done"]
+
+
+@pytest.mark.asyncio
+async def test_reply_waits_for_previous_turn():
+    session = FakeSession()
+    loop = VoiceLoop(FakeASR(["第二句"]), FakeTTS(), session)
+    previous_done = asyncio.Event()
+    previous = asyncio.create_task(previous_done.wait())
+
+    events = loop.run_turn(_audio([b"\x00\x00" * 160]), before_reply=previous)
+    assert (await events.__anext__()).type == "asr"
+    assert (await events.__anext__()).type == "transcript"
+
+    next_event = asyncio.create_task(events.__anext__())
+    await asyncio.sleep(0.01)
+    assert not next_event.done() and session.turns == []
+
+    previous_done.set()
+    await next_event
+    assert session.turns == ["第二句"]
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_speech_detected_once_on_first_recognized_text():
+    detected = []
+
+    async def on_speech():
+        detected.append(True)
+
+    loop = VoiceLoop(FakeASR(["", "我", "我想"]), FakeTTS(), FakeSession())
+    events = [e async for e in loop.run_turn(_audio([b"\x00\x00" * 160]), on_speech=on_speech)]
+
+    assert detected == [True]
+    assert "speech_detected" in events[-1].timings
+
+
+# 插话取消回复：历史只保留已经发出音频的句子
+@pytest.mark.asyncio
+async def test_interrupted_reply_is_truncated_to_played_sentences():
+    session = FakeSession()
+    loop = VoiceLoop(FakeASR(["你好"]), FakeTTS(), session)
+
+    events = loop.run_turn(_audio([b"\x00\x00" * 160]))
+    async for event in events:
+        if event.type == "audio":
+            break
+    await events.aclose()
+
+    assert session.truncated == ["好的，请继续说。"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_before_reply_leaves_history_alone():
+    session = FakeSession()
+    loop = VoiceLoop(FakeASR(["你好"]), FakeTTS(), session)
+    blocker = asyncio.create_task(asyncio.Event().wait())
+
+    async def consume():
+        async for _ in loop.run_turn(_audio([b"\x00\x00" * 160]), before_reply=blocker):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    blocker.cancel()
+
+    assert session.turns == [] and session.truncated == []
+
+
+def _tone(ms):
+    t = np.arange(16 * ms) / 16000
+    return (np.sin(2 * np.pi * 220 * t) * 0.3 * 32767).astype("<i2").tobytes()
+
+
+def _silence(ms):
+    return b"\x00\x00" * 16 * ms
+
+
+class ScriptedASR:
+    """每收到一段（VAD 放行的）音频产出一个中间结果，音频结束后产出最终结果。"""
+
+    vad_config = VADConfig(mode="gate", hangover_ms=0, pause_ms=200)
+
+    def __init__(self, partials, final):
+        self.partials = partials  # [(text, definite)]
+        self.final = final
+
+    async def stream_asr_results(self, audio):
+        index = 0
+        async for _ in audio:
+            if index < len(self.partials):
+                text, definite = self.partials[index]
+                index += 1
+                yield {"result": {"text": text, "utterances": [{"text": text, "definite": definite}]}}, False
+        yield {"result": {"text": self.final, "utterances": [{"text": self.final, "definite": True}]}}, True
+
+
+def _orchestrator():
+    llm = MagicMock(spec=LLMClient)
+
+    async def stream(**kwargs):
+        for delta in ["好的，", "请继续说。"]:
+            await asyncio.sleep(0)
+            yield delta
+
+    llm.chat_completion_stream = MagicMock(side_effect=stream)
+    session = SessionOrchestrator(session_id="voice", llm_client=llm)
+    session.analyst.analyze_turn = AsyncMock(return_value={"interview_session": {"system_notice": "Go on."}})
+    return session
+
+
+# 停顿 + 稳定中间结果：回复在最终结果之前开始，最终结果只差标点时直接采纳
+@pytest.mark.asyncio
+async def test_speculative_reply_starts_before_final():
+    session = _orchestrator()
+    asr = ScriptedASR([("我想做网站", True)], final="我想做网站。")
+    loop = VoiceLoop(asr, FakeTTS(), session, speculative=True)
+    hits = voice_totals["speculation_hits"]
+
+    audio = [_tone(300)] + [_silence(100)] * 4
+    events = [e async for e in loop.run_turn(_audio(audio))]
+
+    timings = events[-1].timings
+    assert timings["speculation_start"] < timings["asr_final"]
+    assert voice_totals["speculation_hits"] == hits + 1
+    assert session.llm.chat_completion_stream.call_count == 1
+    assert "audio" in [e.type for e in events]
+    assert session.interviewer.get_visible_history() == [
+        {"role": "user", "content": "我想做网站"},
+        {"role": "assistant", "content": "好的，请继续说。"},
+    ]
+
+
+# 用户停顿后继续说：推测回复被取消，会话回滚后按最终结果重新生成
+@pytest.mark.asyncio
+async def test_speculation_restarted_when_user_keeps_talking():
+    session = _orchestrator()
+    asr = ScriptedASR([("我想做", True), ("我想做一个网站", False)], final="我想做一个网站")
+    loop = VoiceLoop(asr, FakeTTS(), session, speculative=True)
+    misses = voice_totals["speculation_misses"]
+
+    audio = [_tone(300)] + [_silence(100)] * 3 + [_tone(300)] + [_silence(100)] * 2
+    events = [e async for e in loop.run_turn(_audio(audio))]
+
+    assert "speculation_start" in events[-1].timings
+    assert voice_totals["speculation_misses"] == misses + 1
+    messages = session.llm.chat_completion_stream.call_args.kwargs["messages"]
+    assert messages[-2] == {"role": "user", "content": "我想做一个网站"}
+    assert session.turn_count == 1
+    assert session.interviewer.get_visible_history() == [
+        {"role": "user", "content": "我想做一个网站"},
+        {"role": "assistant", "content": "好的，请继续说。"},
+    ]
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routers import voice as voice_router
+
+
+class SlowTTS:
+    """每段音频之间等待，模拟长句合成，记录被取消的请求。"""
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def stream_tts(self, text, format="pcm"):
+        try:
+            for i in range(100):
+                await asyncio.sleep(0.01)
+                yield f"{text}:{i}".encode()
+        except (GeneratorExit, asyncio.CancelledError):
+            self.cancelled.append(text)
+            raise
+
+
+def test_tts_request_can_be_cancelled(monkeypatch):
+    tts = SlowTTS()
+    monkeypatch.setattr(voice_router, "tts_service", tts)
+    app = FastAPI()
+    app.include_router(voice_router.router)
+
+    with TestClient(app).websocket_connect("/ws/tts") as ws:
+        ws.send_text(json.dumps({"text": "很长的一句话"}))
+        assert ws.receive_bytes().startswith("很长的一句话".encode())
+        ws.send_text(json.dumps({"type": "cancel"}))
+
+        message = ws.receive()
+        while "bytes" in message and message["bytes"] is not None:
+            message = ws.receive()
+        assert json.loads(message["text"]) == {"type": "status", "content": "cancelled"}
+
+        # 取消后连接仍可继续使用
+        ws.send_text("下一句")
+        assert ws.receive_bytes() == "下一句:0".encode()
+
+    assert tts.cancelled[0] == "很长的一句话"
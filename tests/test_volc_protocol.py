@@ -0,0 +1,151 @@
+import pytest
+import logging
+
+from backend.utils import volc_protocol
+from backend.utils.volc_protocol import (
+    CompressionBits,
+    EventType,
+    HeaderSizeBits,
+    Message,
+    MsgType,
+    MsgTypeFlagBits,
+    PayloadCodec,
+    ProtocolMetrics,
+    SerializationBits,
+    audio_only_client,
+    decode_message,
+    encode_message,
+    receive_message,
+    register_payload_codec,
+)
+
+# 覆盖各类帧：音频、带序号、带事件/会话、错误帧、扩展头
+SAMPLE_MESSAGES = [
+    Message(type=MsgType.AudioOnlyClient, flag=MsgTypeFlagBits.NoSeq, payload=b"\x01\x02" * 1600),
+    Message(type=MsgType.AudioOnlyClient, flag=MsgTypeFlagBits.LastNoSeq),
+    Message(type=MsgType.AudioOnlyClient, flag=MsgTypeFlagBits.NegativeSeq, sequence=-7, payload=b"pcm"),
+    Message(type=MsgType.FullServerResponse, flag=MsgTypeFlagBits.PositiveSeq, sequence=3, payload='{"text": "你好"}'.encode()),
+    Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent, event=EventType.StartConnection, payload=b"{}"),
+    Message(type=MsgType.FullClientRequest, flag=MsgTypeFlagBits.WithEvent, event=EventType.StartSession, session_id="会话-1", payload=b'{"a": 1}'),
+    Message(type=MsgType.AudioOnlyServer, flag=MsgTypeFlagBits.WithEvent, event=EventType.TTSResponse, session_id="sid", payload=b"audio"),
+    Message(type=MsgType.Error, flag=MsgTypeFlagBits.NoSeq, error_code=45000001, payload=b"bad request"),
+    Message(type=MsgType.FullClientRequest, header_size=HeaderSizeBits.HeaderSize8, serialization=SerializationBits.Raw, compression=CompressionBits.Gzip, payload=b"x"),
+]
+
+
+@pytest.mark.parametrize("msg", SAMPLE_MESSAGES)
+def test_encode_matches_reference_marshal(msg):
+    assert bytes(encode_message(msg)) == msg.marshal()
+
+
+@pytest.mark.parametrize("msg", SAMPLE_MESSAGES)
+def test_decode_matches_reference_unmarshal(msg):
+    data = msg.marshal()
+    reference = Message.from_bytes(data)
+
+    fast = decode_message(data, zero_copy=False)
+
+    assert fast == reference
+
+
+def test_decode_payload_is_zero_copy():
+    data = Message(type=MsgType.AudioOnlyServer, flag=MsgTypeFlagBits.NoSeq, payload=b"abc" * 100).marshal()
+
+    msg = decode_message(data)
+
+    assert isinstance(msg.payload, memoryview)
+    assert msg.payload.obj is data
+    assert msg.payload.tobytes() == b"abc" * 100
+
+
+def test_decode_rejects_truncated_frames():
+    data = Message(type=MsgType.AudioOnlyServer, flag=MsgTypeFlagBits.PositiveSeq, sequence=1, payload=b"abcdef").marshal()
+
+    with pytest.raises(ValueError):
+        decode_message(data[:-2])
+    with pytest.raises(ValueError):
+        decode_message(data[:6])
+    with pytest.raises(ValueError):
+        decode_message(data + b"zz")
+
+
+class LoopbackSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send(self, data):
+        self.frames.append(bytes(data))
+
+    async def recv(self):
+        return self.frames.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_session_stats_count_frames_without_formatting(monkeypatch, caplog):
+    # INFO 级别下不应格式化任何帧
+    monkeypatch.setattr(Message, "__str__", lambda self: pytest.fail("frame formatted on hot path"))
+    metrics = ProtocolMetrics()
+    stats = metrics.open_session("asr")
+    ws = LoopbackSocket()
+
+    with caplog.at_level(logging.INFO, logger=volc_protocol.__name__):
+        for _ in range(3):
+            await audio_only_client(ws, b"\x00" * 320, MsgTypeFlagBits.NoSeq, stats=stats)
+        msg = await receive_message(ws, stats=stats)
+
+    assert msg.payload == b"\x00" * 320
+    assert stats.frames_sent == 3
+    assert stats.bytes_sent == 3 * 328
+    assert stats.frames_received == 1
+    assert stats.decode_seconds > 0
+    assert caplog.records == []
+
+    metrics.close_session(stats)
+    snapshot = metrics.snapshot()["asr"]
+    assert snapshot["active_sessions"] == 0
+    assert snapshot["finished_sessions"] == 1
+    assert snapshot["frames_sent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_debug_trace_samples_audio_frames(monkeypatch, caplog):
+    monkeypatch.setattr(volc_protocol, "TRACE_SAMPLE_EVERY", 10)
+    stats = ProtocolMetrics().open_session("tts")
+    ws = LoopbackSocket()
+
+    with caplog.at_level(logging.DEBUG, logger=volc_protocol.__name__):
+        for _ in range(25):
+            await audio_only_client(ws, b"pcm", MsgTypeFlagBits.NoSeq, stats=stats)
+
+    assert len(caplog.records) == 2
+
+
+def test_gzip_payload_is_transparent():
+    payload = ('{"result": {"text": "%s"}}' % ("你好世界" * 200)).encode()
+    msg = Message(type=MsgType.FullServerResponse, flag=MsgTypeFlagBits.PositiveSeq, sequence=2,
+                  compression=CompressionBits.Gzip, payload=payload)
+
+    data = encode_message(msg)
+
+    assert len(data) < len(payload) / 5
+    assert bytes(data) == msg.marshal()
+    assert decode_message(data).payload == payload
+    assert Message.from_bytes(bytes(data)).payload == payload
+
+
+def test_custom_codec_slot(monkeypatch):
+    monkeypatch.setitem(volc_protocol.PAYLOAD_CODECS, CompressionBits.Custom, None)
+    register_payload_codec(CompressionBits.Custom, PayloadCodec(lambda d: bytes(d)[::-1], lambda d: bytes(d)[::-1]))
+    msg = Message(type=MsgType.FullClientRequest, compression=CompressionBits.Custom, payload=b"abc")
+
+    data = encode_message(msg)
+
+    assert data.endswith(b"cba")
+    assert decode_message(data).payload == b"abc"
+
+
+def test_unknown_codec_is_rejected():
+    msg = Message(type=MsgType.FullClientRequest, compression=CompressionBits.Custom, payload=b"abc")
+
+    with pytest.raises(ValueError):
+        encode_message(msg)
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import logging
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from openai import APIStatusError, AsyncOpenAI, DefaultAsyncHttpxClient
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    进程级 AsyncOpenAI 客户端注册表，按 (api_key, base_url) 复用。
+
+    所有 LLMClient / Agent / 会话共用同一个 httpx 连接池：
+    HTTP/2 时多路复用一条连接，否则复用 keep-alive 连接，避免每个 Agent 各做一次 TLS 握手。
+    HTTP/2 依赖可选的 h2 包（pip install httpx[http2]），未安装时退回 HTTP/1.1。
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 32,
+        max_keepalive: int = 16,
+        keepalive_expiry: float = 120.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 600.0
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("LLM_HTTP2 is on but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        # 对话间隔常有几十秒，keepalive 过期时间要明显长于 httpx 默认的 5 秒
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+        self.stats = {"clients": 0, "prewarms": 0, "prewarm_failures": 0}
+
+    def get(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        key = (api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            http_client = DefaultAsyncHttpxClient(http2=self.http2, limits=self.limits, timeout=self.timeout)
+            # 关闭 SDK 自带的重试，统一由 LLMClient 的 RetryPolicy 控制
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+            self._clients[key] = client
+            self.stats["clients"] += 1
+        return client
+
+    async def prewarm(self, api_key: str, base_url: str, connections: int = 1) -> bool:
+        """
+        预先建立连接（DNS + TCP + TLS），让首个用户请求不必承担握手时延。
+        HTTP/2 下一条连接即可多路复用，connections 只对 HTTP/1.1 有意义。
+        """
+        client = self.get(api_key, base_url)
+        count = 1 if self.http2 else max(1, connections)
+
+        async def touch() -> None:
+            try:
+                await client.get("/models", cast_to=object)
+            except APIStatusError:
+                # 任意 HTTP 响应（包括 404）都说明连接已建立并进入连接池
+                pass
+
+        results = await asyncio.gather(*(touch() for _ in range(count)), return_exceptions=True)
+        failures = [r for r in results if isinstance(r, Exception)]
+        self.stats["prewarms"] += count - len(failures)
+        self.stats["prewarm_failures"] += len(failures)
+        if failures:
+            logger.warning(f"LLM connection pre-warm failed: {failures[0]}")
+            return False
+        logger.info(f"Pre-warmed {count} LLM connection(s) (http2={self.http2})")
+        return True
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+        }
+
+
+_default_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """
+    进程内共享的注册表，由环境变量配置连接池。
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ClientRegistry(
+            http2=os.getenv("LLM_HTTP2", "1") == "1",
+            max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "32")),
+            max_keepalive=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_S", "120")),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT_S", "5")),
+        )
+    return _default_registry
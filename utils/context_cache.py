@@ -0,0 +1,154 @@
+import os
+import time
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedContext:
+    """
+    服务端缓存的一段公共前缀（Ark Context API 的 context_id）。
+    """
+    context_id: str
+    prefix_hash: str
+    expires_at: float
+
+
+def _prefix_hash(messages: List[Dict[str, str]]) -> str:
+    encoded = json.dumps(messages, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ContextCacheManager:
+    """
+    管理 Ark 的前缀缓存 (POST /context/create, mode=common_prefix)。
+
+    每个 scope（"<agent>:<session>"）登记一段前缀消息（通常是 System Prompt）。
+    context 按前缀内容寻址：前缀相同的 scope 共用同一个 context_id，
+    前缀变化或临近过期时重新创建。创建失败（如账号未开通）后进入冷却期，
+    期间直接走普通请求。
+    """
+
+    def __init__(self, ttl: int = 3600, refresh_margin: float = 60, failure_cooldown: float = 300):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.failure_cooldown = failure_cooldown
+        self._contexts: Dict[str, CachedContext] = {}  # prefix_hash -> context
+        self._scopes: "OrderedDict[str, str]" = OrderedDict()  # scope -> prefix_hash
+        self.max_scopes = 1024
+        self._disabled_until = 0.0
+        self.stats = {
+            "creates": 0,
+            "reuses": 0,
+            "refreshes": 0,
+            "failures": 0,
+            "requests": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+        }
+
+    async def get_context_id(
+        self,
+        client: Any,
+        model_id: str,
+        scope: str,
+        prefix: List[Dict[str, str]]
+    ) -> Optional[str]:
+        """
+        返回 scope 当前前缀的 context_id，必要时创建/刷新；不可用时返回 None。
+
+        Args:
+            client: AsyncOpenAI 客户端（base_url 指向 Ark）
+            model_id: 模型/接入点 ID
+            scope: 缓存作用域，如 "analyst:<session_id>"
+            prefix: 需要缓存的前缀消息
+        """
+        now = time.time()
+        if not prefix or now < self._disabled_until:
+            return None
+
+        prefix_hash = _prefix_hash(prefix)
+        self._scopes[scope] = prefix_hash
+        self._scopes.move_to_end(scope)
+        if len(self._scopes) > self.max_scopes:
+            self._scopes.popitem(last=False)
+        cached = self._contexts.get(prefix_hash)
+        if cached and cached.expires_at - self.refresh_margin > now:
+            self.stats["reuses"] += 1
+            return cached.context_id
+
+        try:
+            response = await client.post(
+                "/context/create",
+                cast_to=object,
+                body={
+                    "model": model_id,
+                    "mode": "common_prefix",
+                    "messages": prefix,
+                    "ttl": self.ttl,
+                },
+            )
+            context_id = response["id"]
+        except Exception as e:
+            self.stats["failures"] += 1
+            self._disabled_until = now + self.failure_cooldown
+            logger.warning(f"Context cache unavailable, falling back to plain requests: {e}")
+            return None
+
+        if cached:
+            self.stats["refreshes"] += 1
+        self.stats["creates"] += 1
+        self._contexts[prefix_hash] = CachedContext(context_id, prefix_hash, now + self.ttl)
+        logger.debug(f"Created cached context for {scope}: {context_id}")
+        return context_id
+
+    def forget(self, scope: str) -> None:
+        """
+        丢弃 scope 当前前缀的 context（例如服务端报告 context 已失效）。
+        """
+        prefix_hash = self._scopes.get(scope)
+        if prefix_hash:
+            self._contexts.pop(prefix_hash, None)
+
+    def record_usage(self, usage: Any) -> None:
+        """
+        记录一次请求的 usage，统计前缀缓存命中的输入 token。
+        """
+        if usage is None:
+            return
+        self.stats["requests"] += 1
+        self.stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.stats["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["creates"] + self.stats["reuses"]
+        prompt_tokens = self.stats["prompt_tokens"]
+        return {
+            **self.stats,
+            "scopes": len(self._scopes),
+            "contexts": len(self._contexts),
+            "hit_rate": round(self.stats["reuses"] / lookups, 3) if lookups else 0.0,
+            "cached_token_ratio": round(self.stats["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0,
+        }
+
+
+_default_manager: Optional[ContextCacheManager] = None
+
+
+def get_default_context_cache() -> Optional[ContextCacheManager]:
+    """
+    进程内共享的前缀缓存管理器；LLM_CONTEXT_CACHE=0 时返回 None。
+    """
+    global _default_manager
+    if os.getenv("LLM_CONTEXT_CACHE", "1") != "1":
+        return None
+    if _default_manager is None:
+        _default_manager = ContextCacheManager(ttl=int(os.getenv("LLM_CONTEXT_CACHE_TTL", "3600")))
+    return _default_manager
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.tokens import estimate_tokens
+
+# 每条消息的格式开销（role、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "### Conversation Summary (earlier turns)"
+TRUNCATION_MARK = "\n…（中间内容过长已省略）…\n"
+
+
+class MessageTokenCache:
+    """
+    按 (role, content) 缓存单条消息的 token 数。
+    历史消息的字符串对象每轮复用，其 hash 由 Python 缓存，
+    因此每轮只有新消息需要重新计数。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, message: Dict[str, str]) -> int:
+        key = (message.get("role", ""), message.get("content") or "")
+        tokens = self._cache.get(key)
+        if tokens is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return tokens
+
+        self.misses += 1
+        tokens = estimate_tokens(key[1]) + MESSAGE_OVERHEAD_TOKENS
+        self._cache[key] = tokens
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return tokens
+
+
+# 各 Agent 共享的计数缓存
+message_tokens = MessageTokenCache()
+
+
+@dataclass
+class ContextWindow:
+    """
+    在 token 预算内选出的上下文。
+    """
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    evicted: int = 0  # 未放入窗口的旧消息数量
+    summary: Optional[str] = None  # 覆盖被淘汰部分的摘要（无淘汰时为 None）
+    tokens: int = 0  # 窗口（含摘要）的估算 token 数
+
+    def as_messages(self) -> List[Dict[str, str]]:
+        """
+        以对话消息形式返回，摘要作为一条 system 消息放在最前。
+        """
+        if not self.summary:
+            return list(self.messages)
+        return [{"role": "system", "content": f"{SUMMARY_HEADER}\n{self.summary}"}] + self.messages
+
+
+def _truncate_middle(content: str, tokens: int, budget: int) -> str:
+    """
+    按比例截掉过长消息的中间部分，保留开头和结尾。
+    """
+    keep_chars = max(0, int(len(content) * budget / max(tokens, 1)) - len(TRUNCATION_MARK))
+    head = keep_chars // 2
+    tail = keep_chars - head
+    return content[:head] + TRUNCATION_MARK + (content[-tail:] if tail else "")
+
+
+def build_context(
+    history: List[Dict[str, str]],
+    budget_tokens: int,
+    summary: Optional[str] = None,
+    cache: Optional[MessageTokenCache] = None,
+    summary_covers: int = 0,
+    keep_recent: int = 4
+) -> ContextWindow:
+    """
+    从最新到最旧填充 token 预算，返回按时间顺序排列的上下文窗口。
+
+    - 有消息被淘汰且提供了 summary 时，摘要拼接在窗口最前（计入预算）。
+    - 压缩模式（summary_covers > 0）：摘要已覆盖的前 summary_covers 条消息
+      即使预算充足也不再放入窗口，只保留最近 keep_recent 条以维持对话连贯。
+    - 最新一条消息总会保留；若它单条就超出预算，则截掉中间部分。
+
+    Args:
+        history: 对话历史（不含 system prompt）
+        budget_tokens: token 预算
+        summary: SummaryAgent 的摘要，覆盖被淘汰的旧消息
+        cache: token 计数缓存，默认使用全局 message_tokens
+        summary_covers: 摘要已覆盖的消息数（history 的前缀长度）
+        keep_recent: 压缩模式下始终保留的最近消息数
+    """
+    cache = cache or message_tokens
+    if not history:
+        return ContextWindow()
+
+    summary_tokens = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+    # 压缩模式下窗口最多从这里开始
+    start = min(summary_covers, max(len(history) - keep_recent, 0)) if summary else 0
+
+    selected: List[Dict[str, str]] = []
+    used = 0
+    for index in range(len(history) - 1, start - 1, -1):
+        message = history[index]
+        tokens = cache.count(message)
+        # 若后面还会淘汰消息，需要为摘要留出空间
+        reserve = summary_tokens if index > 0 else 0
+        if used + tokens + reserve > budget_tokens:
+            if not selected:
+                allowed = max(budget_tokens - reserve - MESSAGE_OVERHEAD_TOKENS, 1)
+                content = _truncate_middle(message.get("content") or "", tokens, allowed)
+                selected.append({**message, "content": content})
+                used += estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            break
+        selected.append(message)
+        used += tokens
+
+    selected.reverse()
+    evicted = len(history) - len(selected)
+    window = ContextWindow(messages=selected, evicted=evicted, tokens=used)
+    if evicted and summary:
+        window.summary = summary
+        window.tokens += summary_tokens
+    return window
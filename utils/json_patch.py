@@ -0,0 +1,122 @@
+import copy
+from typing import Any, Dict, List, Tuple
+
+
+class JsonPatchError(Exception):
+    """
+    Patch 操作非法或无法应用。
+    """
+
+
+def _parse_pointer(pointer: str) -> List[str]:
+    """
+    解析 RFC 6901 JSON Pointer，如 "/user_profile/skills/0"。
+    """
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"Invalid pointer: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Pointer must start with '/': {pointer}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _list_index(container: List[Any], token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _resolve_parent(doc: Any, pointer: str) -> Tuple[Any, str]:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise JsonPatchError("Operations on the document root are not supported")
+    node = doc
+    for token in tokens[:-1]:
+        node = _get_child(node, token)
+    return node, tokens[-1]
+
+
+def _get_child(node: Any, token: str) -> Any:
+    if isinstance(node, dict):
+        if token not in node:
+            raise JsonPatchError(f"Path not found: {token}")
+        return node[token]
+    if isinstance(node, list):
+        return node[_list_index(node, token, allow_end=False)]
+    raise JsonPatchError(f"Cannot traverse into {type(node).__name__} at {token}")
+
+
+def _get(doc: Any, pointer: str) -> Any:
+    node = doc
+    for token in _parse_pointer(pointer):
+        node = _get_child(node, token)
+    return node
+
+
+def _add(doc: Any, pointer: str, value: Any) -> None:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to {type(parent).__name__}: {pointer}")
+
+
+def _remove(doc: Any, pointer: str) -> Any:
+    parent, token = _resolve_parent(doc, pointer)
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token, allow_end=False))
+    raise JsonPatchError(f"Cannot remove from {type(parent).__name__}: {pointer}")
+
+
+def apply_patch(doc: Any, operations: List[Dict[str, Any]]) -> Any:
+    """
+    按 RFC 6902 应用 JSON Patch，返回新文档（不修改原文档）。
+    支持 add / remove / replace / move / copy / test；任一操作失败则整体失败。
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("Patch must be a list of operations")
+
+    result = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise JsonPatchError(f"Malformed operation: {operation!r}")
+        op = operation["op"]
+        path = operation["path"]
+
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JsonPatchError(f"Operation '{op}' requires a value: {path}")
+
+        if op == "add":
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "move":
+            source = operation.get("from")
+            if source is not None and path.startswith(source + "/"):
+                raise JsonPatchError(f"Cannot move {source} into itself")
+            _add(result, path, _remove(result, source))
+        elif op == "copy":
+            _add(result, path, copy.deepcopy(_get(result, operation.get("from"))))
+        elif op == "test":
+            if _get(result, path) != operation["value"]:
+                raise JsonPatchError(f"Test failed at {path}")
+        else:
+            raise JsonPatchError(f"Unknown operation: {op}")
+
+    return result
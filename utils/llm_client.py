@@ -1,9 +1,22 @@
 import os
+import re
 import json
+import time
+import asyncio
 import logging
-from typing import List, Dict, Any, Union, Optional
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Dict, Any, Union, Optional, AsyncIterator, Awaitable, Callable, Tuple
 from dotenv import load_dotenv
-from openai import AsyncOpenAI, OpenAIError
+from openai import AsyncOpenAI, AsyncStream, BadRequestError, NotFoundError, OpenAIError, RateLimitError
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from utils.client_registry import get_client_registry
+from utils.context_cache import ContextCacheManager, get_default_context_cache
+from utils.rate_limiter import PRIORITY_BACKGROUND, PriorityLimiter, get_default_limiter
+from utils.response_cache import ResponseCache, get_default_cache
+from utils.retry import Deadline, DeadlineExceeded, LatencyTracker, RetryPolicy, is_retryable, retry_stats, ttft_tracker
+from utils.tokens import estimate_tokens
 
 # 加载 .env
 load_dotenv()
@@ -12,13 +25,58 @@ load_dotenv()
 logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")))
 logger = logging.getLogger(__name__)
 
+@dataclass
+class StreamMetrics:
+    """
+    单次流式请求的耗时统计。
+    """
+    ttft: Optional[float] = None  # 首 token 时延 (秒)
+    total_time: float = 0.0  # 整体耗时 (秒)
+    chunks: int = 0  # 收到的非空增量数量
+    chars: int = 0  # 输出字符数
+    retries: int = 0  # 首 token 前的重试次数
+    hedged: bool = False  # 是否发出了对冲请求
+    queue_wait: float = 0.0  # 胜出请求在调度队列中的等待时间 (秒)
+
+
+# 按调用上下文（asyncio Task）记录，共享同一 LLMClient 的并发会话互不覆盖
+_last_stream_metrics: ContextVar[Optional[StreamMetrics]] = ContextVar("last_stream_metrics", default=None)
+_last_queue_wait: ContextVar[float] = ContextVar("last_queue_wait", default=0.0)
+
+
+@dataclass
+class _OpenedStream:
+    """
+    已收到首个文本增量的流式响应（首 token 之前的块已缓冲）。
+    """
+    response: Any
+    iterator: Any
+    buffered: List[Any]
+    slot: Any
+
+
 class LLMClient:
     """
     封装 Doubao (OpenAI Compatible) API 的客户端。
     支持文本生成、JSON Mode 和流式输出。
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        context_cache: Optional[ContextCacheManager] = None,
+        limiter: Optional[PriorityLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        latency_tracker: Optional[LatencyTracker] = None
+    ):
+        """
+        Args:
+            cache: 响应缓存，默认使用进程内共享缓存 (LLM_CACHE=0 关闭)
+            context_cache: 服务端前缀缓存管理器，默认使用进程内共享实例 (LLM_CONTEXT_CACHE=0 关闭)
+            limiter: 并发/限流调度器，默认使用进程内共享实例
+            retry_policy: 429/5xx 的重试策略，默认由 LLM_MAX_RETRIES 等环境变量配置
+            latency_tracker: 首 token 时延统计 (决定对冲阈值)，默认使用进程内共享实例
+        """
         self.api_key = os.getenv("ARK_API_KEY")
         self.model_id = os.getenv("LLM_MODEL_ID")
         self.base_url = "https://ark.cn-beijing.volces.com/api/v3"
@@ -27,13 +85,39 @@ class LLMClient:
             logger.error("ARK_API_KEY or LLM_MODEL_ID not found in environment variables.")
             raise ValueError("Missing LLM configuration.")
 
-        # 初始化 AsyncOpenAI 客户端
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
+        # 所有 Agent 共用一个 AsyncOpenAI 客户端及其 HTTP 连接池
+        self.client = get_client_registry().get(self.api_key, self.base_url)
+        self.limiter = limiter if limiter is not None else get_default_limiter()
+        self.cache = cache if cache is not None else get_default_cache()
+        # 默认只缓存近似确定性的调用 (Analyst 0.1 / Judge 0.0)
+        self.cache_max_temperature = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+        self.context_cache = context_cache if context_cache is not None else get_default_context_cache()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy.from_env()
+        self.ttft_tracker = latency_tracker if latency_tracker is not None else ttft_tracker
         logger.info(f"LLMClient initialized with Model ID: {self.model_id}")
 
+    @property
+    def last_queue_wait(self) -> float:
+        """
+        当前任务最近一次请求在调度队列中的等待时间 (秒)。
+        """
+        return _last_queue_wait.get()
+
+    @property
+    def last_stream_metrics(self) -> Optional[StreamMetrics]:
+        """
+        当前任务最近一次流式请求的耗时统计。
+        """
+        return _last_stream_metrics.get()
+
+    async def prewarm(self, connections: Optional[int] = None) -> bool:
+        """
+        预热共享连接池，建议在进程启动时调用一次。
+        """
+        if connections is None:
+            connections = int(os.getenv("LLM_PREWARM_CONNECTIONS", "2"))
+        return await get_client_registry().prewarm(self.api_key, self.base_url, connections)
+
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -42,7 +126,13 @@ class LLMClient:
         top_p: float = 0.9,
         reasoning_effort: Optional[str] = None,
         json_mode: bool = False,
-        stream: bool = False
+        stream: bool = False,
+        cache: Optional[bool] = None,
+        cache_scope: Optional[str] = None,
+        cache_prefix: int = 1,
+        priority: str = PRIORITY_BACKGROUND,
+        deadline: Optional[float] = None,
+        hedge: bool = False
     ) -> Union[str, Dict[str, Any]]:
         """
         发送聊天请求。
@@ -54,63 +144,468 @@ class LLMClient:
             top_p: 核采样概率
             reasoning_effort: 推理强度 (minimal/low/medium/high) - 适配 Doubao 1.8
             json_mode: 是否强制输出 JSON 格式
-            stream: 是否流式输出 (暂不支持, 这里仅预留接口)
+            stream: 是否走流式通道 (内部拼接为完整文本后返回; 逐段消费请用 chat_completion_stream)
+            cache: 是否使用响应缓存。None 表示 temperature <= cache_max_temperature 时使用，
+                False 为本次绕过缓存，True 为强制使用
+            cache_scope: 服务端前缀缓存的作用域 (如 "analyst:<session_id>")，None 表示不使用
+            cache_prefix: 作为公共前缀缓存的消息条数 (通常为 System Prompt)
+            priority: 调度优先级，interactive (面向用户) 优先于 background (后台分析)
+            deadline: 整个调用 (排队 + 重试 + 生成) 的截止时间 (秒)，超时抛出 DeadlineExceeded；None 表示不限
+            hedge: 仅流式通道有效，首 token 迟迟未到时发出对冲请求，见 chat_completion_stream
             
         Returns:
             生成的文本内容 或 解析后的 JSON 对象
         """
-        try:
-            response_format = {"type": "json_object"} if json_mode else None
-            
-            # 构建额外参数，适配 Doubao API 的 reasoning_effort
-            extra_body = {}
-            if reasoning_effort:
-                # 注意：具体字段名需参考火山引擎文档，此处假设为 reasoning_effort
-                # 同时也尝试通过 thinking_level 传递以防万一，通常多传不报错
-                extra_body["reasoning_effort"] = reasoning_effort
-            
-            logger.debug(f"Sending request to LLM (json_mode={json_mode}, reasoning={reasoning_effort})...")
-            
-            # 准备参数字典
-            kwargs = {
-                "model": self.model_id,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-                "response_format": response_format,
-                "stream": stream
-            }
-            
-            # 只有当 extra_body 不为空时才添加，避免某些 SDK 版本报错
-            if extra_body:
-                kwargs["extra_body"] = extra_body
+        kwargs = self._build_kwargs(
+            messages, temperature, max_tokens, top_p, reasoning_effort, json_mode
+        )
+        use_cache = self.cache is not None and (
+            cache if cache is not None else temperature <= self.cache_max_temperature
+        )
+        cache_key = None
+        if use_cache:
+            cache_key = ResponseCache.make_key(kwargs)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("LLM response served from cache")
+                return self._parse_json(cached) if json_mode else cached
 
-            response = await self.client.chat.completions.create(**kwargs)
+        try:
+            if stream:
+                # 复用流式接口，拼接后返回完整文本
+                chunks = []
+                async for delta in self.chat_completion_stream(
+                    messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    reasoning_effort=reasoning_effort,
+                    json_mode=json_mode,
+                    cache_scope=cache_scope,
+                    cache_prefix=cache_prefix,
+                    priority=priority,
+                    deadline=deadline,
+                    hedge=hedge,
+                ):
+                    chunks.append(delta)
+                content = "".join(chunks)
+            else:
+                logger.debug(f"Sending request to LLM (json_mode={json_mode}, reasoning={reasoning_effort})...")
+                response, queue_wait = await self._with_retry(
+                    lambda: self._complete_once(kwargs, cache_scope, cache_prefix, priority),
+                    Deadline(deadline),
+                )
+                # 截止时间与重试会把请求放进子任务执行，排队时间回到调用方的上下文再记录
+                _last_queue_wait.set(queue_wait)
+                content = response.choices[0].message.content
 
-            content = response.choices[0].message.content
-            
-            if json_mode:
-                try:
-                    return json.loads(content)
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse JSON response: {content}")
-                    # 简单的容错：尝试在 ```json 和 ``` 之间提取
-                    if "```json" in content:
-                        import re
-                        match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-                        if match:
-                            return json.loads(match.group(1))
-                    raise ValueError("LLM response is not valid JSON.")
-            
-            return content
+            result = self._parse_json(content) if json_mode else content
+            # 解析成功后才写入缓存，避免缓存坏响应
+            if cache_key is not None and content:
+                self.cache.set(cache_key, content)
+            return result
 
         except OpenAIError as e:
             logger.error(f"OpenAI API Error: {str(e)}")
             raise
+        except DeadlineExceeded:
+            logger.error(f"LLM call exceeded its {deadline}s deadline")
+            raise
         except Exception as e:
             logger.error(f"Unexpected Error: {str(e)}")
             raise
 
-# 单例模式 (可选)
-# client = LLMClient()
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        reasoning_effort: Optional[str] = None,
+        json_mode: bool = False,
+        cache_scope: Optional[str] = None,
+        cache_prefix: int = 1,
+        priority: str = PRIORITY_BACKGROUND,
+        deadline: Optional[float] = None,
+        hedge: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        流式发送聊天请求，按到达顺序逐段产出文本增量。
+        
+        结束后可由当前任务的 `self.last_stream_metrics` 读取耗时统计 (含首 token 时延 TTFT)。
+        重试与对冲只发生在首 token 之前；已产出内容后出错直接抛出。
+        
+        Args:
+            与 chat_completion 相同 (不含 stream)
+            hedge: 超过首 token 时延 p95 仍无输出时，再发一个相同请求，
+                取先出首 token 的一路，取消另一路
+            
+        Yields:
+            文本增量 (delta.content)
+        """
+        kwargs = self._build_kwargs(
+            messages, temperature, max_tokens, top_p, reasoning_effort, json_mode
+        )
+        kwargs["stream"] = True
+        if self.context_cache is not None:
+            # 末尾附带 usage 块，用于统计前缀缓存命中
+            kwargs["stream_options"] = {"include_usage": True}
+
+        metrics = StreamMetrics()
+        _last_stream_metrics.set(metrics)
+        start = time.perf_counter()
+        call_deadline = Deadline(deadline)
+
+        def open_stream() -> Awaitable[_OpenedStream]:
+            if hedge:
+                return self._open_hedged(kwargs, cache_scope, cache_prefix, priority, metrics)
+            return self._open_stream(kwargs, cache_scope, cache_prefix, priority)
+
+        logger.debug(f"Sending streaming request to LLM (json_mode={json_mode}, reasoning={reasoning_effort})...")
+        try:
+            opened = await self._with_retry(open_stream, call_deadline, metrics)
+        except OpenAIError as e:
+            logger.error(f"OpenAI API Error (stream): {str(e)}")
+            raise
+        except DeadlineExceeded:
+            logger.error(f"LLM stream exceeded its {deadline}s deadline before the first token")
+            raise
+        metrics.queue_wait = opened.slot.queue_wait
+        _last_queue_wait.set(metrics.queue_wait)
+
+        # 整个流期间占用一个并发名额
+        actual_tokens = None
+        finished = False
+        try:
+            buffered = list(opened.buffered)
+            while True:
+                if buffered:
+                    chunk = buffered.pop(0)
+                else:
+                    try:
+                        chunk = await call_deadline.run(opened.iterator.__anext__())
+                    except StopAsyncIteration:
+                        finished = True
+                        break
+                # 末尾的 usage 块可能不带 choices
+                if not chunk.choices:
+                    usage = getattr(chunk, "usage", None)
+                    actual_tokens = getattr(usage, "total_tokens", None)
+                    if self.context_cache is not None:
+                        self.context_cache.record_usage(usage)
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if metrics.ttft is None:
+                    metrics.ttft = time.perf_counter() - start
+                    logger.debug(f"LLM time to first token: {metrics.ttft * 1000:.0f} ms")
+                metrics.chunks += 1
+                metrics.chars += len(delta)
+                yield delta
+        except OpenAIError as e:
+            logger.error(f"OpenAI API Error (stream): {str(e)}")
+            raise
+        except DeadlineExceeded:
+            retry_stats["deadline_exceeded"] += 1
+            logger.error(f"LLM stream exceeded its {deadline}s deadline")
+            raise
+        finally:
+            self.limiter.release(opened.slot, actual_tokens)
+            if not finished:
+                await self._close_stream(opened.response)
+            metrics.total_time = time.perf_counter() - start
+
+    async def _complete_once(
+        self,
+        kwargs: Dict[str, Any],
+        cache_scope: Optional[str],
+        cache_prefix: int,
+        priority: str
+    ) -> Tuple[Any, float]:
+        """
+        一次非流式请求：申请名额 → 发送 → 归还名额。返回 (响应, 排队等待秒数)。
+        """
+        slot = await self._acquire(kwargs, priority)
+        actual_tokens = None
+        try:
+            response = await self._create(kwargs, cache_scope, cache_prefix)
+            actual_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+            return response, slot.queue_wait
+        finally:
+            self.limiter.release(slot, actual_tokens)
+
+    async def _open_stream(
+        self,
+        kwargs: Dict[str, Any],
+        cache_scope: Optional[str],
+        cache_prefix: int,
+        priority: str
+    ) -> _OpenedStream:
+        """
+        申请名额并发起流式请求，读到首个文本增量为止。
+        失败或被取消时归还名额并关闭连接；成功时名额随 _OpenedStream 交给调用方。
+        """
+        slot = await self._acquire(kwargs, priority)
+        response = None
+        attempt_start = time.perf_counter()
+        try:
+            response = await self._create(kwargs, cache_scope, cache_prefix)
+            iterator = response.__aiter__()
+            buffered = []
+            while True:
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                buffered.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    self.ttft_tracker.record(time.perf_counter() - attempt_start)
+                    break
+            return _OpenedStream(response, iterator, buffered, slot)
+        except BaseException:
+            self.limiter.release(slot)
+            if response is not None:
+                await self._close_stream(response)
+            raise
+
+    async def _open_hedged(
+        self,
+        kwargs: Dict[str, Any],
+        cache_scope: Optional[str],
+        cache_prefix: int,
+        priority: str,
+        metrics: StreamMetrics
+    ) -> _OpenedStream:
+        """
+        对冲请求：主请求在阈值 (首 token 时延 p95) 内没有输出时发出第二个请求，
+        先拿到首 token 的一路胜出，另一路被取消并归还名额。
+        """
+        primary = asyncio.ensure_future(self._open_stream(kwargs, cache_scope, cache_prefix, priority))
+        pending = {primary}
+        try:
+            threshold = self.ttft_tracker.hedge_threshold()
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                pending = set()
+                return primary.result()
+
+            metrics.hedged = True
+            retry_stats["hedges"] += 1
+            logger.info(f"No first token after {threshold * 1000:.0f} ms, sending a hedged request")
+            secondary = asyncio.ensure_future(self._open_stream(kwargs, cache_scope, cache_prefix, priority))
+            pending.add(secondary)
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        # 两路同时完成：多余的一路直接丢弃
+                        await self._discard(task.result())
+                if winner is not None:
+                    if winner is secondary:
+                        retry_stats["hedge_wins"] += 1
+                    return winner.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, _OpenedStream):
+                    await self._discard(result)
+
+    async def _discard(self, opened: _OpenedStream) -> None:
+        self.limiter.release(opened.slot)
+        await self._close_stream(opened.response)
+
+    @staticmethod
+    async def _close_stream(response: Any) -> None:
+        close = getattr(response, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.debug(f"Failed to close LLM stream: {e}")
+
+    async def _with_retry(
+        self,
+        attempt: Callable[[], Awaitable[Any]],
+        deadline: Deadline,
+        metrics: Optional[StreamMetrics] = None
+    ) -> Any:
+        """
+        在截止时间内执行 attempt，429/5xx/连接错误按 Decorrelated Jitter 退避重试。
+        服务端给出 Retry-After 时至少等待该时长；剩余时间不够下一次尝试时直接抛出最后的错误。
+        """
+        delay = None
+        retries = 0
+        while True:
+            try:
+                return await deadline.run(attempt())
+            except DeadlineExceeded:
+                retry_stats["deadline_exceeded"] += 1
+                raise
+            except Exception as e:
+                if not is_retryable(e) or retries >= self.retry_policy.max_retries:
+                    raise
+                delay = self.retry_policy.next_delay(delay)
+                wait = max(delay, self._retry_after(e) or 0.0)
+                remaining = deadline.remaining()
+                if remaining is not None and wait >= remaining:
+                    raise
+                retries += 1
+                retry_stats["retries"] += 1
+                if metrics is not None:
+                    metrics.retries = retries
+                logger.warning(
+                    f"LLM request failed ({type(e).__name__}), retry {retries}/{self.retry_policy.max_retries} "
+                    f"in {wait * 1000:.0f} ms"
+                )
+                await asyncio.sleep(wait)
+
+    async def _acquire(self, kwargs: Dict[str, Any], priority: str) -> Any:
+        """
+        向共享调度器申请发送许可，预估 token = 输入估算 + max_tokens。
+        """
+        estimated = kwargs.get("max_tokens", 0) + sum(
+            estimate_tokens(m.get("content") or "") for m in kwargs["messages"]
+        )
+        return await self.limiter.acquire(priority, estimated)
+
+    async def _create(self, kwargs: Dict[str, Any], cache_scope: Optional[str], cache_prefix: int) -> Any:
+        """
+        发送请求；指定 cache_scope 时前 cache_prefix 条消息走服务端前缀缓存
+        (POST /context/chat/completions)，不可用或失效时回退为普通请求。
+        """
+        stream = kwargs.get("stream", False)
+        context_id = None
+        if cache_scope and self.context_cache is not None and len(kwargs["messages"]) > cache_prefix:
+            context_id = await self.context_cache.get_context_id(
+                self.client, self.model_id, cache_scope, kwargs["messages"][:cache_prefix]
+            )
+
+        if context_id is not None:
+            body = {k: v for k, v in kwargs.items() if k != "extra_body" and v is not None}
+            body.update(kwargs.get("extra_body") or {})
+            body["context_id"] = context_id
+            body["messages"] = kwargs["messages"][cache_prefix:]
+            try:
+                if stream:
+                    return await self.client.post(
+                        "/context/chat/completions",
+                        body=body,
+                        cast_to=ChatCompletionChunk,
+                        stream=True,
+                        stream_cls=AsyncStream[ChatCompletionChunk],
+                    )
+                response = await self.client.post(
+                    "/context/chat/completions", body=body, cast_to=ChatCompletion
+                )
+                self.context_cache.record_usage(response.usage)
+                return response
+            except RateLimitError as e:
+                self.limiter.penalize(self._retry_after(e) or 1.0)
+                raise
+            except (NotFoundError, BadRequestError) as e:
+                # context 过期或被清理：丢弃后走普通请求，下次调用重新创建。
+                # 429/5xx/超时不在此回退，交给重试策略与调度器退避
+                logger.warning(f"Cached context request failed, retrying without it: {e}")
+                self.context_cache.forget(cache_scope)
+
+        try:
+            response = await self.client.chat.completions.create(**kwargs)
+        except RateLimitError as e:
+            # 429：让共享调度器整体退让，避免所有会话同时重试
+            self.limiter.penalize(self._retry_after(e) or 1.0)
+            raise
+        if not stream and self.context_cache is not None:
+            self.context_cache.record_usage(getattr(response, "usage", None))
+        return response
+
+    @staticmethod
+    def _retry_after(error: OpenAIError) -> Optional[float]:
+        """
+        读取 429/503 响应的 Retry-After (秒)，缺失或非数字时返回 None。
+        """
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+
+    def _build_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        reasoning_effort: Optional[str],
+        json_mode: bool
+    ) -> Dict[str, Any]:
+        """
+        构建 chat.completions.create 的参数字典。
+        """
+        response_format = {"type": "json_object"} if json_mode else None
+
+        # 构建额外参数，适配 Doubao API 的 reasoning_effort
+        extra_body = {}
+        if reasoning_effort:
+            # 注意：具体字段名需参考火山引擎文档，此处假设为 reasoning_effort
+            # 同时也尝试通过 thinking_level 传递以防万一，通常多传不报错
+            extra_body["reasoning_effort"] = reasoning_effort
+
+        kwargs = {
+            "model": self.model_id,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "response_format": response_format,
+            "stream": False
+        }
+
+        # 只有当 extra_body 不为空时才添加，避免某些 SDK 版本报错
+        if extra_body:
+            kwargs["extra_body"] = extra_body
+
+        return kwargs
+
+    @staticmethod
+    def _parse_json(content: str) -> Dict[str, Any]:
+        """
+        解析 JSON Mode 的输出，兼容 ```json 包裹的情况。
+        """
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse JSON response: {content}")
+            # 简单的容错：尝试在 ```json 和 ``` 之间提取
+            if "```json" in content:
+                match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+                if match:
+                    return json.loads(match.group(1))
+            raise ValueError("LLM response is not valid JSON.")
+
+_default_client: Optional[LLMClient] = None
+
+
+def get_default_llm_client() -> LLMClient:
+    """
+    进程内共享的 LLMClient，Agent 未传入客户端时使用。
+    last_stream_metrics / last_queue_wait 按调用所在的任务记录，并发会话互不覆盖。
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient()
+    return _default_client
@@ -0,0 +1,85 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from utils.tokens import estimate_tokens
+
+
+@dataclass
+class PromptState:
+    """
+    序列化后的 State 以及压缩前后的 token 估算。
+    """
+    text: str
+    tokens_before: int  # 投影后按 indent=2 序列化的 token 数
+    tokens_after: int  # 压缩后的 token 数
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.tokens_before:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == {} or value == []
+
+
+def prune_empty(value: Any) -> Any:
+    """
+    递归删除空字段（None / "" / {} / []）。0 和 False 属于有效信息，保留。
+    列表元素原位保留（只清理其内部字段）：JSON Patch 按下标定位，删除元素会让
+    Analyst 看到的下标与真实 State 错位。
+    """
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            item = prune_empty(item)
+            if not _is_empty(item):
+                pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [prune_empty(item) for item in value]
+    return value
+
+
+def project_sections(
+    state: Dict[str, Any],
+    sections: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    只保留 Agent 需要的顶层字段。sections 为 None 表示全部字段。
+    """
+    keys = list(state) if sections is None else [key for key in sections if key in state]
+    excluded = set(exclude)
+    return {key: state[key] for key in keys if key not in excluded}
+
+
+def dumps_compact(value: Any) -> str:
+    """
+    最小化 JSON（无缩进、无多余空格，保留中文）。
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def render_state(
+    state: Dict[str, Any],
+    sections: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+    prune: bool = True
+) -> PromptState:
+    """
+    将 State 序列化为 Prompt 文本：按需投影字段、删除空字段、最小化。
+
+    Args:
+        state: 完整 JSON State
+        sections: 需要保留的顶层字段（None 为全部）
+        exclude: 需要排除的顶层字段
+        prune: 是否删除空字段
+    """
+    projected = project_sections(state, sections, exclude)
+    compact = prune_empty(projected) if prune else projected
+    text = dumps_compact(compact)
+    before = estimate_tokens(json.dumps(projected, ensure_ascii=False, indent=2))
+    return PromptState(text=text, tokens_before=before, tokens_after=estimate_tokens(text))
@@ -0,0 +1,254 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越先调度
+PRIORITY_INTERACTIVE = "interactive"  # 面向用户的 Interviewer
+PRIORITY_BACKGROUND = "background"  # Analyst / Judge / Summary / Architect
+PRIORITIES = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 1}
+
+
+class TokenBucket:
+    """
+    令牌桶：以 rate 个/秒匀速补充，最多积累 capacity 个。rate <= 0 表示不限。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        取走 amount 还需等待的秒数（0 表示现在即可）。超过容量的请求按容量计算。
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    seq: int
+    priority: str = field(compare=False)
+    tokens: int = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+@dataclass
+class Slot:
+    """
+    一次已获准的请求；结束时交给 release() 归还并结算实际 token 用量。
+    """
+    priority: str
+    tokens: int
+    queue_wait: float
+
+
+class PriorityLimiter:
+    """
+    进程级 LLM 请求调度器：并发上限 + 请求数令牌桶 (RPM) + token 令牌桶 (TPM)。
+
+    等待中的请求按优先级出队：interactive 永远排在 background 之前，
+    并且为 interactive 预留 interactive_reserve 个并发名额，
+    后台任务占满其余名额时用户请求依然可以立即发出。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        rpm: float = 0,
+        tpm: float = 0,
+        interactive_reserve: int = 2
+    ):
+        self.max_concurrency = max_concurrency
+        self.interactive_reserve = min(interactive_reserve, max_concurrency - 1)
+        self.requests = TokenBucket(rpm / 60.0, max(rpm / 60.0 * 5, 1))  # 允许约 5 秒的突发
+        self.tokens = TokenBucket(tpm / 60.0, max(tpm / 60.0 * 5, 1))
+        self.in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 429 之后暂停发送直到此时刻（monotonic），与是否配置令牌桶无关
+        self._paused_until = 0.0
+        self.stats: Dict[str, Dict[str, float]] = {
+            name: {"requests": 0, "queued": 0, "wait_total": 0.0, "wait_max": 0.0} for name in PRIORITIES
+        }
+        self.rate_limited = 0
+
+    def _can_run(self, priority: str) -> bool:
+        limit = self.max_concurrency
+        if priority != PRIORITY_INTERACTIVE:
+            limit -= self.interactive_reserve
+        return self.in_flight < limit
+
+    async def acquire(self, priority: str = PRIORITY_BACKGROUND, tokens: int = 0) -> Slot:
+        """
+        等待发送许可。
+
+        Args:
+            priority: interactive / background
+            tokens: 预估 token 用量（输入 + max_tokens），用于 TPM 限流
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        stats = self.stats[priority]
+        stats["requests"] += 1
+        start = time.monotonic()
+
+        if not self._waiters and self._can_run(priority) and self._budget_wait(tokens) == 0:
+            self._grant(tokens)
+            return Slot(priority, tokens, 0.0)
+
+        stats["queued"] += 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters, _Waiter(PRIORITIES[priority], next(self._seq), priority, tokens, future, start)
+        )
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已获准但调用方被取消：归还名额
+                self.release(Slot(priority, tokens, 0.0))
+            else:
+                self._waiters = [w for w in self._waiters if w.future is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+        wait = time.monotonic() - start
+        stats["wait_total"] += wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+        if wait > 1.0:
+            logger.debug(f"LLM request ({priority}) waited {wait * 1000:.0f} ms for a slot")
+        return Slot(priority, tokens, wait)
+
+    def release(self, slot: Slot, actual_tokens: Optional[int] = None) -> None:
+        """
+        归还并发名额；若已知实际 token 用量，退还多预估的部分。
+        """
+        self.in_flight -= 1
+        if actual_tokens is not None and actual_tokens < slot.tokens:
+            self.tokens.refund(slot.tokens - actual_tokens)
+        self._dispatch()
+
+    def penalize(self, retry_after: float = 1.0) -> None:
+        """
+        收到 429 时暂停发送 retry_after 秒（未配置 RPM/TPM 时同样生效），
+        并清空令牌桶，让恢复后的请求按限速重新积累。
+        """
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.requests.drain()
+        self.tokens.drain()
+        self._schedule(retry_after)
+
+    def _budget_wait(self, tokens: int) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+        )
+
+    def _grant(self, tokens: int) -> None:
+        self.in_flight += 1
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            head = self._waiters[0]
+            if head.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_run(head.priority):
+                return
+            wait = self._budget_wait(head.tokens)
+            if wait > 0:
+                self._schedule(wait)
+                return
+            heapq.heappop(self._waiters)
+            self._grant(head.tokens)
+            head.future.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        queue_wait = {}
+        for name, stats in self.stats.items():
+            queue_wait[name] = {
+                **stats,
+                "wait_avg": round(stats["wait_total"] / stats["requests"], 4) if stats["requests"] else 0.0,
+            }
+        return {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rate_limited": self.rate_limited,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "queue_wait": queue_wait,
+        }
+
+
+_default_limiter: Optional[PriorityLimiter] = None
+
+
+def get_default_limiter() -> PriorityLimiter:
+    """
+    进程内共享的调度器，由环境变量配置（LLM_RPM / LLM_TPM 为 0 表示不限）。
+    """
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = PriorityLimiter(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            rpm=float(os.getenv("LLM_RPM", "0")),
+            tpm=float(os.getenv("LLM_TPM", "0")),
+            interactive_reserve=int(os.getenv("LLM_INTERACTIVE_RESERVE", "2")),
+        )
+    return _default_limiter
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 参与缓存 key 的请求参数（决定输出内容的全部字段）
+_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "top_p", "response_format", "extra_body")
+
+
+class ResponseCache:
+    """
+    LLM 响应的内容寻址缓存。
+
+    key = sha256(model, messages, 采样参数)；两级存储：
+    内存 LRU（进程内）+ 可选 SQLite（跨进程/跨会话复用，例如测试与回放）。
+    缓存的是模型原始文本，JSON Mode 的解析在命中后重新进行，避免共享可变对象。
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "stores": 0, "expired": 0}
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """
+        由请求参数计算缓存 key。
+        """
+        material = {field: request.get(field) for field in _KEY_FIELDS}
+        encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, content = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return content
+            del self._memory[key]
+            self.stats["expired"] += 1
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                content, expires_at = row
+                if expires_at > now:
+                    self._remember(key, content, expires_at)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return content
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["expired"] += 1
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, content: str, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, content, expires_at)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, content, expires_at) VALUES (?, ?, ?)",
+                (key, content, expires_at),
+            )
+            self._db.commit()
+        self.stats["stores"] += 1
+
+    def _remember(self, key: str, content: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, content)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._memory),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    进程内共享的缓存，由环境变量配置；LLM_CACHE=0 时返回 None。
+    """
+    global _default_cache
+    if os.getenv("LLM_CACHE", "1") != "1":
+        return None
+    if _default_cache is None:
+        _default_cache = ResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            sqlite_path=os.getenv("LLM_CACHE_PATH") or None,
+        )
+    return _default_cache
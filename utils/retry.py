@@ -0,0 +1,124 @@
+import os
+import random
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    调用超过了调用方给定的截止时间（含排队、重试与退避）。
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    429、5xx、连接错误与超时可重试；4xx 参数错误等不重试。
+    """
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+@dataclass
+class RetryPolicy:
+    """
+    重试策略：Decorrelated Jitter 退避，delay = min(max_delay, U(base_delay, prev * 3))。
+    """
+    max_retries: int = 2
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+
+    def next_delay(self, previous: Optional[float] = None) -> float:
+        previous = previous or self.base_delay
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_MS", "250")) / 1000,
+            max_delay=float(os.getenv("LLM_RETRY_MAX_MS", "4000")) / 1000,
+        )
+
+
+class Deadline:
+    """
+    绝对截止时间；None 表示不限。
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    async def run(self, awaitable):
+        """
+        在剩余时间内等待 awaitable，超时抛出 DeadlineExceeded。
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return await awaitable
+        if remaining <= 0:
+            close = getattr(awaitable, "close", None)
+            if close is not None:
+                close()
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("LLM call deadline exceeded") from e
+
+
+class LatencyTracker:
+    """
+    记录最近的首 token 时延，用于计算对冲 (hedging) 阈值。
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, default: float = 1.5, floor: float = 0.2):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default = default
+        self.floor = floor
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_threshold(self) -> float:
+        """
+        样本足够时取 p95，否则用默认值；不低于 floor。
+        """
+        if len(self.samples) < self.min_samples:
+            return self.default
+        return max(self.floor, self.quantile(0.95))
+
+
+# 进程内共享的首 token 时延统计
+ttft_tracker = LatencyTracker(default=float(os.getenv("LLM_HEDGE_DEFAULT_MS", "1500")) / 1000)
+
+# 进程内累计：重试、超时与对冲次数
+retry_stats: Dict[str, int] = {"retries": 0, "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0}
+
+
+def retry_snapshot() -> Dict[str, Any]:
+    return {
+        **retry_stats,
+        "ttft_p50": ttft_tracker.quantile(0.5),
+        "ttft_p95": ttft_tracker.quantile(0.95),
+        "hedge_threshold": ttft_tracker.hedge_threshold(),
+    }
@@ -0,0 +1,16 @@
+import re
+
+# CJK 字符（含全角标点）在 Doubao 等中文分词器里大多单独成 token
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数（无需加载分词器）。
+    CJK 字符按 1 token/字，其余字符按约 4 字符/token 计算。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4